@@ -0,0 +1,243 @@
+"""
+Offline benchmarks for the schedule pipeline.
+
+Replays the recorded kinoprogramm page from tests/fixtures (plus copies
+scaled to 10x/100x as many films) and times each stage separately:
+parse_schedule (every available backend and the streaming parser),
+filter_by_week (list scan and SessionIndex), filter_ov_sessions,
+normalize_title (memoized, cold and uncached), enrich_films against
+src.fake_upstream, and format_message.
+
+    python -m benchmarks.run                      # compare with baseline
+    python -m benchmarks.run --update-baseline    # record a new baseline
+
+Exits with status 1 when a stage is slower than the baseline by more than
+--tolerance (relative; like timeit, the fastest of --repeat runs is
+compared, since slower runs mostly measure noise from the machine).
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FIXTURE_PATH = REPO_ROOT / "tests" / "fixtures" / "kinoprogramm_konstanz.html"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+# The fixture page was recorded on Friday of the 19.03.2026 cinema week.
+FIXTURE_NOW = datetime(2026, 3, 20, 12, 0)
+TIMEZONE = "Europe/Berlin"
+# Sub-millisecond stages are repeated until one sample takes this long,
+# otherwise timer noise alone trips the regression check.
+MIN_SAMPLE_SECONDS = 0.1
+OV_MARKERS = ["OV", "OmU", "Originalfassung", "Originalversion", "OmeU"]
+
+def _time(func, repeat: int, min_seconds: float = MIN_SAMPLE_SECONDS) -> dict:
+    """Median/min seconds per call. Fast functions are looped so each sample lasts `min_seconds`."""
+    started = time.perf_counter()
+    result = func()
+    first = time.perf_counter() - started
+    number = max(1, math.ceil(min_seconds / first)) if first > 0 else 1000
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            result = func()
+        timings.append((time.perf_counter() - started) / number)
+    return {"median": statistics.median(timings), "min": min(timings), "result": result}
+
+
+def _chunks(html: str, size: int = 16 * 1024):
+    return (html[i:i + size] for i in range(0, len(html), size))
+
+
+def _cold_enrichment_caches() -> None:
+    from src import cinestar_link, tmdb_match
+    from src.state import get_session
+    session = get_session()
+    with session.lock:
+        for name in ("tmdb_cache", "tmdb_details", "tmdb_search_cache", "cinestar_cache", "cache_access"):
+            session.data[name] = {}
+    tmdb_match._details_memo.clear()
+    cinestar_link._indexes.clear()
+
+
+def run_benchmarks(scales: list[int], enrich_scales: list[int], repeat: int, latency: float) -> dict:
+    import yaml
+
+    from src import state, tmdb_match
+    from src.enrich import TmdbLookups, enrich_films
+    from src.format_message_ru import format_message
+    from src.ov_filter import filter_ov_sessions
+    from src.parse_schedule import available_backends, iter_sessions, parse_schedule
+    from src.week_interval import SessionIndex, compute_week_window, filter_by_week
+    from src.fake_upstream import FakeUpstream, FakeUpstreamConfig, fake_settings, scale_schedule_html
+    from src.fetch_kinoprogramm import DEFAULT_SETTINGS_PATH, load_settings
+
+    base_html = FIXTURE_PATH.read_text(encoding="utf-8")
+    week_start, week_end = compute_week_window(FIXTURE_NOW)
+    results = {}
+
+    upstream = FakeUpstream(FakeUpstreamConfig(latency=latency, schedule_html=base_html))
+    # Benchmarks never touch the real state file or the real APIs.
+    with upstream as upstream_url, tempfile.TemporaryDirectory(prefix="cinestar-bench-") as tmp:
+        workdir = Path(tmp)
+        settings_path = workdir / "settings.yaml"
+        settings = fake_settings(load_settings(DEFAULT_SETTINGS_PATH), upstream_url)
+        # Time our code, not the client-side TMDb budget (rate 0 = only
+        # server 429s throttle); the fake upstream has no limit here.
+        settings["tmdb_rate_limit"] = {"rate": 0}
+        settings_path.write_text(yaml.safe_dump(settings, allow_unicode=True))
+        os.environ["CINESTAR_SETTINGS"] = str(settings_path)
+        os.environ["TMDB_API_KEY"] = "benchmark"
+        state.STATE_PATH = workdir / "state.json"
+        cinestar_base_url = settings["cinestar_base_url"]
+
+        for factor in scales:
+            html = scale_schedule_html(base_html, factor)
+            label = f"{factor}x"
+
+            sessions = None
+            for backend in available_backends():
+                timing = _time(lambda: parse_schedule(html, TIMEZONE, backend=backend), repeat)
+                results[f"parse_{backend}@{label}"] = timing
+                sessions = timing["result"]
+            results[f"parse_stream@{label}"] = _time(lambda: list(iter_sessions(_chunks(html), TIMEZONE)), repeat)
+
+            results[f"filter_week@{label}"] = _time(lambda: filter_by_week(sessions, week_start, week_end), repeat)
+            index = SessionIndex(sessions)
+            results[f"filter_week_index@{label}"] = _time(lambda: filter_by_week(index, week_start, week_end), repeat)
+
+            timing = _time(lambda: filter_ov_sessions(sessions, OV_MARKERS), repeat)
+            results[f"filter_ov@{label}"] = timing
+            ov_sessions = timing["result"]
+
+            def group():
+                grouped = {}
+                for s in ov_sessions:
+                    grouped.setdefault(tmdb_match.normalize_title(s.title), []).append(s)
+                return grouped
+
+            def group_cold():
+                tmdb_match.normalize_title.cache_clear()
+                return group()
+
+            titles = sorted({s.title for s in sessions})
+
+            def normalize_uncached():
+                return [tmdb_match.normalize_title.__wrapped__(title) for title in titles]
+
+            timing = _time(group, repeat)
+            results[f"normalize@{label}"] = timing
+            grouped = timing["result"]
+            # Cold memo: one normalization per distinct title, plus lookups.
+            results[f"normalize_cold@{label}"] = _time(group_cold, repeat)
+            # The single-pass normalizer alone, once per distinct title.
+            results[f"normalize_uncached@{label}"] = _time(normalize_uncached, repeat)
+
+            if factor in enrich_scales:
+                def enrich():
+                    _cold_enrichment_caches()
+                    return enrich_films(
+                        {title: list(s) for title, s in grouped.items()},
+                        cinestar_base_url=cinestar_base_url,
+                        tmdb_lookups=TmdbLookups(),
+                    )[0]
+
+                timing = _time(enrich, repeat, min_seconds=0)
+                results[f"enrich@{label}"] = timing
+                items = timing["result"]
+            else:
+                items = [
+                    {"title": title, "session": s[0], "sessions": s, "tmdb_id": None, "cinestar_url": s[0].film_url}
+                    for title, s in grouped.items()
+                ]
+
+            results[f"format@{label}"] = _time(lambda: format_message(week_start, week_end, items), repeat)
+            logging.getLogger(__name__).info(
+                f"{label}: {len(sessions)} sessions, {len(ov_sessions)} OV, {len(grouped)} films"
+            )
+
+        # Flush while the workdir exists; the exit-time flush then has nothing to write.
+        state.get_session().flush()
+
+    return {name: {"median": t["median"], "min": t["min"]} for name, t in results.items()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, timing in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = timing["min"] / reference["min"] if reference["min"] else 1.0
+        marker = ""
+        if ratio > 1 + tolerance:
+            marker = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"{name:32s} {timing['min'] * 1000:10.2f} ms  baseline {reference['min'] * 1000:10.2f} ms  x{ratio:.2f}{marker}")
+    for name in sorted(set(results) - set(baseline)):
+        print(f"{name:32s} {results[name]['min'] * 1000:10.2f} ms  (no baseline)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated page scale factors")
+    parser.add_argument("--enrich-scales", default="1,10", help="Scales at which enrichment is benchmarked")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark (the fastest is compared)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake upstream latency per request")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON path")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed relative slowdown vs. baseline (1.0 = twice as slow)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger(__name__).setLevel(logging.INFO)
+    # The fixture contains a deliberately broken date; one warning per parse
+    # would drown the table.
+    logging.getLogger("src").setLevel(logging.ERROR)
+
+    results = run_benchmarks(
+        scales=[int(x) for x in args.scales.split(",") if x],
+        enrich_scales=[int(x) for x in args.enrich_scales.split(",") if x],
+        repeat=args.repeat,
+        latency=args.latency_ms / 1000,
+    )
+    payload = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "latency_ms": args.latency_ms,
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --update-baseline first.")
+        for name, timing in results.items():
+            print(f"{name:32s} {timing['min'] * 1000:10.2f} ms")
+        return
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
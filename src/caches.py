@@ -0,0 +1,142 @@
+import datetime
+import threading
+import time
+from typing import Iterator, Optional
+
+from src.state import StateSession, get_session
+
+# Default limits per persistent cache: (max_entries, max_idle_days).
+# Override per cache under `caches:` in settings.
+DEFAULT_LIMITS = {
+    # title -> TMDb id: tiny entries, and a title may come back as a re-release.
+    "tmdb_cache": (5000, 365),
+    # /movie/{id} fields, one per matched film.
+    "tmdb_details": (5000, 365),
+    # Several per title (variants x languages); only useful while fresh.
+    "tmdb_search_cache": (5000, 30),
+    # Resolved CineStar links per (title, year).
+    "cinestar_cache": (500, 90),
+}
+
+
+def _today() -> str:
+    return datetime.date.fromtimestamp(time.time()).isoformat()
+
+
+class BoundedCache:
+    """
+    One persistent cache in the state (e.g. tmdb_cache), capped by size
+    and age.
+
+    get() and set() record the day of last access in
+    state["cache_access"]. Days, not timestamps: an entry is only marked
+    dirty when its recorded day changes, so a key costs the state file at
+    most one rewrite a day however often it is read. Entries not accessed
+    for `max_idle_days` are evicted, then the least recently accessed
+    ones beyond `max_entries`. Eviction runs when the cache is first used
+    in a process and whenever set() goes over the cap, so the state stays
+    the same size however many years of runs it has seen.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_idle_days: float, session: Optional[StateSession] = None):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.max_idle_days = max_idle_days
+        self.session = session or get_session()
+        self._evicted = False
+
+    def _touch(self, key: str) -> None:
+        self.session.cache_touch(self.name, key, _today())
+
+    def _first_use(self) -> None:
+        if not self._evicted:
+            with self.session.lock:
+                if not self._evicted:
+                    self._evicted = True
+                    self.evict()
+
+    def get(self, key: str, default=None):
+        self._first_use()
+        with self.session.lock:
+            value = self.session.cache_get(self.name, key)
+            if value is None:
+                return default
+            self._touch(key)
+            return value
+
+    def peek(self, key: str, default=None):
+        """get() without counting as an access."""
+        return self.session.cache_get(self.name, key, default)
+
+    def set(self, key: str, value) -> None:
+        self._first_use()
+        with self.session.lock:
+            self.session.cache_set(self.name, key, value)
+            self._touch(key)
+            if len(self.session.cache(self.name)) > self.max_entries:
+                self._evict_lru(self.max_entries)
+
+    def delete(self, key: str) -> None:
+        self.session.cache_delete(self.name, key)
+
+    def keys(self) -> list[str]:
+        with self.session.lock:
+            return list(self.session.cache(self.name))
+
+    def __len__(self) -> int:
+        with self.session.lock:
+            return len(self.session.cache(self.name))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def evict(self) -> int:
+        """Drop idle and surplus entries. Returns how many were removed."""
+        today = _today()
+        with self.session.lock:
+            entries = self.session.cache(self.name)
+            access = self.session.cache_access(self.name)
+            # Entries from before access tracking count as used today.
+            for key in entries:
+                if key not in access:
+                    self.session.cache_touch(self.name, key, today)
+            removed = 0
+            if self.max_idle_days is not None:
+                cutoff = (datetime.date.fromisoformat(today) - datetime.timedelta(days=self.max_idle_days)).isoformat()
+                for key in [k for k in entries if access[k] < cutoff]:
+                    self.session.cache_delete(self.name, key)
+                    removed += 1
+            return removed + self._evict_lru(self.max_entries)
+
+    def _evict_lru(self, limit: int) -> int:
+        entries = self.session.cache(self.name)
+        surplus = len(entries) - limit
+        if surplus <= 0:
+            return 0
+        access = self.session.cache_access(self.name)
+        for key in sorted(entries, key=lambda k: access.get(k, ""))[:surplus]:
+            self.session.cache_delete(self.name, key)
+        return surplus
+
+
+_caches: dict[str, BoundedCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> BoundedCache:
+    """The BoundedCache `name` of the current state session, limits from settings."""
+    session = get_session()
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None or cache.session is not session:
+            from src.fetch_kinoprogramm import get_setting
+            max_entries, max_idle_days = DEFAULT_LIMITS.get(name, (5000, 365))
+            limits = (get_setting("caches") or {}).get(name) or {}
+            cache = BoundedCache(
+                name,
+                limits.get("max_entries", max_entries),
+                limits.get("max_idle_days", max_idle_days),
+                session,
+            )
+            _caches[name] = cache
+        return cache
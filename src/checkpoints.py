@@ -0,0 +1,346 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import pytz
+
+from src.instrumentation import record_cache
+from src.parse_schedule import Session
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in run order; --from-stage names one of them.
+STAGES = ("fetch", "parse", "window", "filter", "enrich", "format", "send")
+# CINESTAR_CHECKPOINTS moves the checkpoints (tests, throwaway runs).
+CHECKPOINT_DIR = Path(
+    os.environ.get("CINESTAR_CHECKPOINTS") or Path.home() / ".cache" / "cinestar-tracker" / "checkpoints"
+)
+# Part of every page's config fingerprint: bump it when a stage's output
+# changes for the same input, so older checkpoints are not resumed.
+CHECKPOINT_VERSION = 1
+# A rerun resumes from checkpoints of the same page up to this old
+# (settings: checkpoint_max_age_hours; 0 turns resuming off).
+DEFAULT_MAX_AGE_HOURS = 24
+# Pages (html hashes) kept per cinema; older ones are deleted.
+KEEP_PAGES = 3
+LATEST_FILE = "latest"
+# A streamed fetch checkpoint while the page is still downloading.
+PART_SUFFIX = ".part"
+
+
+class CheckpointMissing(Exception):
+    """--from-stage was given but there is no fetched page to resume from."""
+
+
+def html_sha256(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def config_fingerprint(settings: dict, cinema, overrides_path: str = "config/overrides.yaml") -> str:
+    """
+    Hash of everything besides the page that stage outputs depend on:
+    CHECKPOINT_VERSION, the settings, the cinema (OV markers etc.) and the
+    TMDb overrides file.
+    """
+    try:
+        overrides = Path(overrides_path).read_text(encoding="utf-8")
+    except OSError:
+        overrides = None
+    blob = json.dumps(
+        {"version": CHECKPOINT_VERSION, "settings": settings, "cinema": vars(cinema), "overrides": overrides},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_sessions(sessions: list[Session]) -> dict:
+    """Parsed sessions as a film table plus (film, epoch) pairs."""
+    films: dict[tuple, int] = {}
+    rows = []
+    for s in sessions:
+        key = (s.title, s.film_url, s.tags)
+        rows.append([films.setdefault(key, len(films)), s.epoch])
+    return {"films": [list(key) for key in films], "sessions": rows}
+
+
+def decode_sessions(payload: dict, timezone_str: str) -> list[Session]:
+    tz = pytz.timezone(timezone_str)
+    films = payload["films"]
+    return [
+        Session(films[film][0], datetime.fromtimestamp(epoch, tz), films[film][1], films[film][2])
+        for film, epoch in payload["sessions"]
+    ]
+
+
+class PageCheckpoints:
+    """
+    Checkpoints of one cinema for one schedule page (sha256 of its HTML).
+
+    The page itself is `fetch.json`; every other stage is a JSON file in
+    a subdirectory per config fingerprint, so a settings, overrides or
+    CHECKPOINT_VERSION change starts over from the parse of the same page:
+    `parse.json`, and per cinema week `window-<week>.json` etc. Sessions
+    are stored once, in the
+    parse checkpoint; later stages refer to them by position in that list.
+
+    Stages only resume in a chain: once a stage of a week (or parse, which
+    every week depends on) is computed in this run, the later stages of
+    that week are computed too, and once one is not checkpointed (`keep`),
+    the later ones are not either. A message is never reused or saved for
+    an enrichment other than the one it was formatted from.
+    """
+
+    def __init__(self, path: Path, html_sha256: str, reuse: Callable[[str], bool], fingerprint: str = ""):
+        self.path = path
+        self.stage_path = path / fingerprint if fingerprint else path
+        self.html_sha256 = html_sha256
+        self._reuse = reuse
+        self.sessions: list[Session] = []
+        self._positions: dict[int, int] = {}
+        # Weeks (None: every week) with a stage computed / left unsaved in this run.
+        self._computed: set[Optional[str]] = set()
+        self._unsaved: set[Optional[str]] = set()
+
+    def _file(self, stage: str, week: Optional[str]) -> Path:
+        if stage == "fetch":
+            return self.path / "fetch.json"
+        return self.stage_path / (f"{stage}-{week}.json" if week else f"{stage}.json")
+
+    def load(self, stage: str, week: Optional[str] = None):
+        try:
+            data = json.loads(self._file(stage, week).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self._file(stage, week)}: {e}")
+            return None
+        if data.get("version") != CHECKPOINT_VERSION:
+            return None
+        return data["payload"]
+
+    def save(self, stage: str, payload, week: Optional[str] = None) -> None:
+        data = {"version": CHECKPOINT_VERSION, "stage": stage, "week": week,
+                "saved_at": int(time.time()), "payload": payload}
+        directory = self._file(stage, week).parent
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", delete=False, dir=str(directory), encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+                tmp = f.name
+            os.replace(tmp, self._file(stage, week))
+        except OSError as e:
+            # A run without checkpoints is only slower to resume.
+            logger.warning(f"Could not write checkpoint {self._file(stage, week)}: {e}")
+
+    def stage(self, stage: str, compute, encode=None, decode=None, week: Optional[str] = None, keep=None):
+        """
+        The result of `stage`: from its checkpoint when this run may reuse
+        it, else computed and checkpointed. `encode`/`decode` convert to and
+        from JSON (default: stored as is). `keep(value)` False (e.g. an
+        enrichment cut short by the deadline) computes without saving, so
+        the next run tries again.
+        """
+        if self._reuse(stage) and not self._affected(self._computed, week):
+            payload = self.load(stage, week)
+            record_cache("checkpoint", payload is not None)
+            if payload is not None:
+                logger.info(f"Resuming {stage}{f' {week}' if week else ''} from checkpoint {self.html_sha256[:12]}.")
+                return decode(payload) if decode else payload
+        value = compute()
+        self._computed.add(week)
+        if self._affected(self._unsaved, week) or not (keep is None or keep(value)):
+            self._unsaved.add(week)
+        else:
+            self.save(stage, encode(value) if encode else value, week)
+        return value
+
+    def record(self, stage: str, payload, week: Optional[str] = None) -> None:
+        """Checkpoint a stage computed outside stage() (e.g. while streaming)."""
+        self._computed.add(week)
+        self.save(stage, payload, week)
+
+    @staticmethod
+    def _affected(weeks: set, week: Optional[str]) -> bool:
+        return None in weeks or week in weeks
+
+    def set_sessions(self, sessions: list[Session]) -> None:
+        self.sessions = sessions
+        self._positions = {id(s): i for i, s in enumerate(sessions)}
+
+    def positions(self, sessions: list[Session]) -> list[int]:
+        return [self._positions[id(s)] for s in sessions]
+
+    def pick(self, positions: list[int]) -> list[Session]:
+        return [self.sessions[i] for i in positions]
+
+
+class CinemaCheckpoints:
+    """
+    Checkpoint directory of one cinema:
+    <CHECKPOINT_DIR>/<cinema id>/<html sha256>/<config fingerprint>/.
+
+    A normal run fetches the page and reuses whatever stages an earlier run
+    already finished for the same HTML and `fingerprint` (see
+    config_fingerprint) within `max_age_hours`. With
+    `from_stage`, stages before it come from the latest page's checkpoints
+    (the page is not downloaded again; an earlier stage without a
+    checkpoint is computed) and `from_stage` and everything after it are
+    recomputed.
+    """
+
+    def __init__(self, cinema_id: str, from_stage: Optional[str] = None,
+                 max_age_hours: float = DEFAULT_MAX_AGE_HOURS, root: Optional[Path] = None,
+                 fingerprint: str = ""):
+        if from_stage is not None and from_stage not in STAGES:
+            raise ValueError(f"Unknown stage: {from_stage}")
+        self.path = Path(root or CHECKPOINT_DIR) / cinema_id
+        self.from_stage = from_stage
+        self.max_age_hours = max_age_hours
+        self.fingerprint = fingerprint
+
+    def _reuse(self, page_path: Path) -> Callable[[str], bool]:
+        if self.from_stage is not None:
+            first = STAGES.index(self.from_stage)
+            return lambda stage: STAGES.index(stage) < first
+        # The page's age counts from its first fetch (fetch.json is never rewritten).
+        try:
+            age = time.time() - (page_path / "fetch.json").stat().st_mtime
+        except FileNotFoundError:
+            age = None
+        fresh = age is not None and self.max_age_hours > 0 and age <= self.max_age_hours * 3600
+        return lambda stage: fresh
+
+    def _page(self, digest: str) -> PageCheckpoints:
+        page_path = self.path / digest
+        return PageCheckpoints(page_path, digest, self._reuse(page_path), self.fingerprint)
+
+    def _make_latest(self, digest: str) -> None:
+        try:
+            (self.path / LATEST_FILE).write_text(digest, encoding="utf-8")
+            self._prune(keep=digest)
+        except OSError as e:
+            logger.warning(f"Could not update checkpoints in {self.path}: {e}")
+
+    def begin(self, html: str, url: str) -> PageCheckpoints:
+        """Checkpoints for a freshly fetched page; becomes the latest page."""
+        digest = html_sha256(html)
+        page = self._page(digest)
+        if page.load("fetch") is None:
+            page.save("fetch", {"url": url, "html": html})
+        self._make_latest(digest)
+        return page
+
+    def begin_stream(self, url: str) -> "StreamedFetch":
+        """begin() for a page that is still downloading; see StreamedFetch."""
+        return StreamedFetch(self, url)
+
+    def _finish_stream(self, digest: str, part: Optional[str]) -> PageCheckpoints:
+        page = self._page(digest)
+        if part is not None:
+            try:
+                if page.load("fetch") is None:
+                    page.path.mkdir(parents=True, exist_ok=True)
+                    os.replace(part, page.path / "fetch.json")
+                else:
+                    os.unlink(part)
+            except OSError as e:
+                logger.warning(f"Could not write checkpoint {page.path / 'fetch.json'}: {e}")
+        self._make_latest(digest)
+        return page
+
+    def latest(self) -> tuple[PageCheckpoints, str]:
+        """(checkpoints, html) of the last fetched page, for --from-stage."""
+        try:
+            digest = (self.path / LATEST_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            raise CheckpointMissing(f"no checkpoints in {self.path}") from None
+        page = PageCheckpoints(self.path / digest, digest, self._reuse(self.path / digest), self.fingerprint)
+        fetched = page.load("fetch")
+        if fetched is None:
+            raise CheckpointMissing(f"no fetch checkpoint for page {digest[:12]}")
+        return page, fetched["html"]
+
+    def _prune(self, keep: str) -> None:
+        pages = sorted(
+            (p for p in self.path.iterdir() if p.is_dir() and p.name != keep),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for old in pages[KEEP_PAGES - 1:]:
+            shutil.rmtree(old, ignore_errors=True)
+        # Streamed fetches of runs that died before the page was complete.
+        for part in self.path.glob(f"*{PART_SUFFIX}"):
+            part.unlink(missing_ok=True)
+        # Stages of the kept page under an earlier config are never resumed.
+        for old in (self.path / keep).iterdir():
+            if old.is_dir() and old.name != self.fingerprint:
+                shutil.rmtree(old, ignore_errors=True)
+
+
+class StreamedFetch:
+    """
+    Fetch checkpoint of a page that is parsed while it downloads: every
+    chunk goes into an incremental sha256 and, JSON-escaped, straight into
+    a temporary file, so the page is never held in memory as a whole.
+    finish() names the page by its hash and moves the file into place;
+    abort() drops it.
+    """
+
+    def __init__(self, checkpoints: CinemaCheckpoints, url: str):
+        self._checkpoints = checkpoints
+        self._digest = hashlib.sha256()
+        self._file = None
+        header = json.dumps({"version": CHECKPOINT_VERSION, "stage": "fetch", "week": None,
+                             "saved_at": int(time.time())}, ensure_ascii=False)
+        try:
+            checkpoints.path.mkdir(parents=True, exist_ok=True)
+            self._file = tempfile.NamedTemporaryFile(
+                "w", delete=False, dir=str(checkpoints.path), suffix=PART_SUFFIX, encoding="utf-8",
+            )
+            # Same document as PageCheckpoints.save(), with "html" left open.
+            self._file.write(f'{header[:-1]}, "payload": {{"url": {json.dumps(url, ensure_ascii=False)}, "html": "')
+        except OSError as e:
+            self._fail(e)
+
+    def write(self, chunk: str) -> None:
+        self._digest.update(chunk.encode("utf-8"))
+        if self._file is not None:
+            try:
+                self._file.write(json.dumps(chunk, ensure_ascii=False)[1:-1])
+            except OSError as e:
+                self._fail(e)
+
+    def finish(self) -> PageCheckpoints:
+        """Checkpoints of the completed page; it becomes the latest page."""
+        part = None
+        if self._file is not None:
+            try:
+                self._file.write('"}}')
+                self._file.close()
+                part = self._file.name
+            except OSError as e:
+                self._fail(e)
+        self._file = None
+        return self._checkpoints._finish_stream(self._digest.hexdigest(), part)
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            Path(self._file.name).unlink(missing_ok=True)
+            self._file = None
+
+    def _fail(self, error: OSError) -> None:
+        # The stages can still be checkpointed; only --from-stage loses the page.
+        logger.warning(f"Could not write the fetch checkpoint in {self._checkpoints.path}: {error}")
+        if self._file is not None:
+            try:
+                self.abort()
+            except OSError:
+                self._file = None
@@ -0,0 +1,100 @@
+import os
+from typing import Optional
+
+from src.cinestar_link import CINESTAR_BASE_URL
+
+DEFAULT_CINEMA_ID = "konstanz"
+DEFAULT_CINEMA_NAME = "CineStar Konstanz"
+DEFAULT_CHAT_ID_ENV = "TELEGRAM_CHAT_ID"
+
+
+class Cinema:
+    """
+    One tracked cinema: where its schedule lives, how to read it and where
+    to announce it.
+
+    `state_key` names the sub-dict of state["cinemas"] holding this cinema's
+    send history. It is None for the legacy single-cinema setup, whose
+    history lives in the top-level state keys.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        kinoprogramm_url: str,
+        timezone: str = "Europe/Berlin",
+        ov_markers: Optional[list[str]] = None,
+        cinestar_base_url: Optional[str] = None,
+        chat_id: Optional[str] = None,
+        chat_id_env: str = DEFAULT_CHAT_ID_ENV,
+        state_key: Optional[str] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.kinoprogramm_url = kinoprogramm_url
+        self.timezone = timezone
+        self.ov_markers = list(ov_markers or [])
+        self.cinestar_base_url = cinestar_base_url
+        self.chat_id = chat_id
+        self.chat_id_env = chat_id_env
+        self.state_key = state_key
+
+    def resolve_chat_id(self) -> Optional[str]:
+        if self.chat_id:
+            return str(self.chat_id)
+        return os.environ.get(self.chat_id_env)
+
+    def __repr__(self):
+        return f"<Cinema {self.id}>"
+
+
+def load_cinemas(settings: dict) -> list[Cinema]:
+    """
+    Build the list of cinemas from settings.
+
+    Without a `cinemas:` list the top-level keys describe a single cinema
+    (CineStar Konstanz) that keeps using the top-level state history.
+    Each `cinemas:` entry needs `id` and `kinoprogramm_url`; `timezone` and
+    `ov_markers` default to the top-level values. Set `legacy_state: true`
+    on the entry that should keep the existing top-level send history.
+    """
+    timezone = settings.get("timezone", "Europe/Berlin")
+    ov_markers = settings.get("ov_markers", [])
+
+    entries = settings.get("cinemas")
+    if not entries:
+        return [
+            Cinema(
+                id=DEFAULT_CINEMA_ID,
+                name=settings.get("cinema_name", DEFAULT_CINEMA_NAME),
+                kinoprogramm_url=settings["kinoprogramm_url"],
+                timezone=timezone,
+                ov_markers=ov_markers,
+                cinestar_base_url=settings.get("cinestar_base_url", CINESTAR_BASE_URL),
+            )
+        ]
+
+    cinemas = []
+    seen_ids = set()
+    for entry in entries:
+        cinema_id = entry.get("id")
+        if not cinema_id or not entry.get("kinoprogramm_url"):
+            raise ValueError(f"Cinema entry needs id and kinoprogramm_url: {entry}")
+        if cinema_id in seen_ids:
+            raise ValueError(f"Duplicate cinema id: {cinema_id}")
+        seen_ids.add(cinema_id)
+        cinemas.append(
+            Cinema(
+                id=cinema_id,
+                name=entry.get("name", cinema_id),
+                kinoprogramm_url=entry["kinoprogramm_url"],
+                timezone=entry.get("timezone", timezone),
+                ov_markers=entry.get("ov_markers", ov_markers),
+                cinestar_base_url=entry.get("cinestar_base_url"),
+                chat_id=entry.get("chat_id"),
+                chat_id_env=entry.get("chat_id_env", DEFAULT_CHAT_ID_ENV),
+                state_key=None if entry.get("legacy_state") else cinema_id,
+            )
+        )
+    return cinemas
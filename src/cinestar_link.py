@@ -1,22 +1,52 @@
 from typing import Optional
 import re
 import datetime
-import requests
+import html
 import logging
+import threading
+import time
 import unicodedata
+from urllib.parse import urlparse
+
+from src import http_client
+from src.instrumentation import record_cache
+from src.caches import get_cache
+from src.tmdb_match import TITLE_SEPARATOR_REGEX
 
 logger = logging.getLogger(__name__)
-TITLE_SEPARATOR_REGEX = re.compile(r"\s[-–—]\s")
+# Film pages of CineStar Konstanz; other CineStar houses use their own slug.
+CINESTAR_BASE_URL = "https://www.cinestar.de/kino-konstanz/film"
 # "<b>Produktionsjahr</b><span>2011</span>" on CineStar film pages.
 PRODUKTIONSJAHR_REGEX = re.compile(
     r"Produktionsjahr\s*</b>\s*<span[^>]*>\s*(\d{4})\s*</span>",
     re.IGNORECASE,
 )
+PRODUKTIONSJAHR_BYTES_REGEX = re.compile(PRODUKTIONSJAHR_REGEX.pattern.encode("ascii"), re.IGNORECASE)
 # How old a CineStar film page may be (vs. current year) when we have no
 # TMDb year to compare against. CineStar leaves old film detail pages live
 # forever, so without this guard a zombie page like /film/michael (2011)
 # would be accepted just because its slug collides with a new release.
 MAX_PAGE_AGE_NO_EXPECTED_YEAR = 4
+# Resolutions are cached in state["cinestar_cache"] per (title, year).
+# A confirmed page rarely moves, so it is trusted for two weeks. A miss
+# (every slug 404 or rejected) is retried sooner, because CineStar often
+# publishes the film page a few days after kinoprogramm lists the film.
+CINESTAR_CACHE_HIT_TTL = 14 * 24 * 3600
+CINESTAR_CACHE_MISS_TTL = 2 * 24 * 3600
+# Statuses that mean "this slug is not the film"; anything else is transient.
+NOT_FOUND_STATUSES = {404, 410}
+# Film pages are streamed only until the Produktionsjahr block. A page
+# without one in its first CINESTAR_PAGE_BYTE_BUDGET bytes counts as
+# having none.
+CINESTAR_PAGE_BYTE_BUDGET = 256 * 1024
+CINESTAR_PAGE_CHUNK_SIZE = 16 * 1024
+# A block split across two chunks is found by rescanning this many bytes.
+PRODUKTIONSJAHR_MAX_MATCH = 512
+# Programme page listing every film the house currently plays, next to its
+# film directory: /kino-konstanz/film -> /kino-konstanz/programm. Fetched
+# once per run; films are then resolved from it instead of probing slugs.
+CINESTAR_PROGRAMME_PATH = "programm"
+ANCHOR_TEXT_TAGS_REGEX = re.compile(r"<[^>]+>")
 
 def slugify_cinestar(title: str) -> str:
     """
@@ -84,6 +114,50 @@ def _parse_produktionsjahr(html: str) -> Optional[int]:
         return None
 
 
+def _stream_produktionsjahr(resp) -> tuple[Optional[int], int]:
+    """Read a streamed film page up to its Produktionsjahr. Returns (year, bytes read)."""
+    buffer = bytearray()
+    nbytes = 0
+    for chunk in resp.iter_content(chunk_size=CINESTAR_PAGE_CHUNK_SIZE):
+        nbytes += len(chunk)
+        scan_from = max(0, len(buffer) - PRODUKTIONSJAHR_MAX_MATCH)
+        buffer += chunk[:CINESTAR_PAGE_BYTE_BUDGET - len(buffer)]
+        m = PRODUKTIONSJAHR_BYTES_REGEX.search(buffer, scan_from)
+        if m:
+            return int(m.group(1)), nbytes
+        if len(buffer) >= CINESTAR_PAGE_BYTE_BUDGET:
+            break
+    return None, nbytes
+
+
+def _fetch_page_year(url: str, headers: dict) -> tuple[int, Optional[int]]:
+    """
+    (status, Produktionsjahr) of a CineStar film page, downloading as
+    little of it as possible: a HEAD turns away missing slugs
+    (NOT_FOUND_STATUSES) without a body, then the GET asks for the first
+    CINESTAR_PAGE_BYTE_BUDGET bytes and is streamed only until the
+    Produktionsjahr block. Any other HEAD answer (405, a CDN's 403, ...)
+    leaves the decision to the GET. A 206 (range honoured) is reported
+    as 200.
+    """
+    resp = http_client.head(url, headers=headers, allow_redirects=True)
+    if resp.status_code in NOT_FOUND_STATUSES:
+        return resp.status_code, None
+    range_headers = {**headers, "Range": f"bytes=0-{CINESTAR_PAGE_BYTE_BUDGET - 1}"}
+    resp = http_client.get(url, headers=range_headers, allow_redirects=True, stream=True)
+    try:
+        if resp.status_code not in (200, 206):
+            return resp.status_code, None
+        page_year, nbytes = _stream_produktionsjahr(resp)
+    finally:
+        resp.close()
+    logger.info(
+        f"CineStar {url}: read {nbytes} bytes, "
+        f"Produktionsjahr {page_year if page_year is not None else 'not found'}"
+    )
+    return 200, page_year
+
+
 def _year_confirms_page(
     page_year: Optional[int], expected_year: Optional[int]
 ) -> bool:
@@ -106,21 +180,135 @@ def _year_confirms_page(
     return (current_year - page_year) <= MAX_PAGE_AGE_NO_EXPECTED_YEAR
 
 
+class CinestarIndex:
+    """
+    slug -> {"title", "year"} for the films on a CineStar programme page.
+
+    `year` is the Produktionsjahr when the listing shows it next to the
+    film link, else None (the film page then has to be fetched to confirm
+    it). Films are found by their slug or by the slug of their listed title.
+    """
+
+    def __init__(self, films: dict[str, dict]):
+        self.films = films
+        self._by_title_slug: dict[str, str] = {}
+        for slug, film in films.items():
+            for title_slug in (slugify_cinestar(film["title"]), slugify_cinestar_loose(film["title"])):
+                self._by_title_slug.setdefault(title_slug, slug)
+
+    def __len__(self) -> int:
+        return len(self.films)
+
+    @classmethod
+    def parse(cls, page_html: str, film_path: str) -> "CinestarIndex":
+        """Collect every link to `film_path`/<slug> on the page."""
+        link_regex = re.compile(
+            rf'<a\b[^>]*href="(?:https?://[^/"]+)?{re.escape(film_path.rstrip("/"))}/([a-z0-9-]+)/?"[^>]*>(.*?)</a>',
+            re.IGNORECASE | re.DOTALL,
+        )
+        matches = list(link_regex.finditer(page_html))
+        films: dict[str, dict] = {}
+        for i, m in enumerate(matches):
+            slug = m.group(1).lower()
+            title = html.unescape(ANCHOR_TEXT_TAGS_REGEX.sub(" ", m.group(2)))
+            title = " ".join(title.split())
+            # The film's block runs up to the next film link.
+            block_end = matches[i + 1].start() if i + 1 < len(matches) else len(page_html)
+            year = _parse_produktionsjahr(page_html[m.end():block_end])
+            film = films.setdefault(slug, {"title": title or slug.replace("-", " "), "year": year})
+            if film["year"] is None:
+                film["year"] = year
+        return cls(films)
+
+    def lookup(self, slug_candidates: list[str]) -> list[str]:
+        """Index slugs matching the candidates, in candidate order."""
+        found = []
+        for cand in slug_candidates:
+            slug = cand if cand in self.films else self._by_title_slug.get(cand)
+            if slug and slug not in found:
+                found.append(slug)
+        return found
+
+    def year(self, slug: str) -> Optional[int]:
+        film = self.films.get(slug)
+        return film["year"] if film else None
+
+
+_indexes: dict[str, Optional[CinestarIndex]] = {}
+_index_locks: dict[str, threading.Lock] = {}
+_indexes_lock = threading.Lock()
+
+
+def programme_url(base_url: str) -> str:
+    return f"{base_url.rstrip('/').rsplit('/', 1)[0]}/{CINESTAR_PROGRAMME_PATH}"
+
+
+def _fetch_cinestar_index(base_url: str) -> Optional[CinestarIndex]:
+    url = programme_url(base_url)
+    try:
+        resp = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"}, allow_redirects=True)
+        if resp.status_code != 200:
+            logger.info(f"CineStar programme {url} returned {resp.status_code}; probing film pages instead.")
+            return None
+        index = CinestarIndex.parse(resp.text, urlparse(base_url).path)
+    except Exception as e:
+        logger.warning(f"CineStar programme {url} failed: {e}; probing film pages instead.")
+        return None
+    if not index:
+        # e.g. a page rendered client-side; nothing to look films up in.
+        logger.info(f"CineStar programme {url} lists no films; probing film pages instead.")
+        return None
+    logger.info(f"CineStar programme index: {len(index)} films from {url}")
+    return index
+
+
+def get_cinestar_index(base_url: str) -> Optional[CinestarIndex]:
+    """
+    The programme index for `base_url`, fetched once per process. Concurrent
+    callers wait for the first fetch; None (no usable listing) is remembered
+    too, so films fall back to probing without retrying the listing.
+    """
+    with _indexes_lock:
+        if base_url in _indexes:
+            return _indexes[base_url]
+        lock = _index_locks.setdefault(base_url, threading.Lock())
+    with lock:
+        with _indexes_lock:
+            if base_url in _indexes:
+                return _indexes[base_url]
+        index = _fetch_cinestar_index(base_url)
+        with _indexes_lock:
+            _indexes[base_url] = index
+        return index
+
+
 def resolve_cinestar_url(
     title_norm: str,
     kinoprogramm_film_url: Optional[str],
     original_title: Optional[str] = None,
     expected_year: Optional[int] = None,
+    base_url: str = CINESTAR_BASE_URL,
 ) -> Optional[str]:
     """
-    Resolve a CineStar Konstanz film URL by slug-guessing from the title.
+    Resolve a CineStar film URL by slug-guessing from the title. `base_url`
+    is the cinema's film directory (CineStar Konstanz by default).
 
     A plain `HEAD 200` check is not enough: CineStar keeps old film detail
     pages online indefinitely, so a slug like `/film/michael` can collide
     with a decade-old page for an unrelated film. To avoid that, we GET the
     page and compare its 'Produktionsjahr' to `expected_year` (typically the
     TMDb release year). If it doesn't line up, we reject the candidate and
-    fall back to the kinoprogramm URL which is always correct.
+    fall back to the kinoprogramm URL which is always correct. The HEAD
+    still comes first, so a 404 slug costs no body, and the GET is streamed
+    only until the Produktionsjahr block (see _fetch_page_year).
+
+    Candidates are first looked up in the programme index (one listing
+    fetch per run): a listed Produktionsjahr confirms or rejects the film
+    without fetching its page. Slugs are only probed one by one when the
+    film is not in the index or the index is unavailable.
+
+    Outcomes are cached in state["cinestar_cache"] (hits for two weeks,
+    definite misses for two days), so steady-state runs skip the probing.
 
     Example of a correct resolution:
       https://www.cinestar.de/kino-konstanz/film/avatar-fire-and-ash
@@ -128,8 +316,11 @@ def resolve_cinestar_url(
       /film/michael → a 2011 Austrian film, not the 2025 release playing now.
     """
 
-    # Base URL for CineStar Konstanz
-    base_url = "https://www.cinestar.de/kino-konstanz/film"
+    cache_key = _cache_key(title_norm, expected_year, base_url)
+    cached = _get_cached_resolution(cache_key)
+    record_cache("cinestar_cache", cached is not None)
+    if cached is not None:
+        return cached["url"] or kinoprogramm_film_url
 
     candidates = build_cinestar_slug_candidates(title_norm, original_title)
 
@@ -137,21 +328,83 @@ def resolve_cinestar_url(
         "User-Agent": "Mozilla/5.0",
     }
 
+    rejected = []
+    index = get_cinestar_index(base_url)
+    if index is not None:
+        indexed = index.lookup(candidates)
+        record_cache("cinestar_index", bool(indexed))
+        if indexed:
+            # Only listed slugs are worth a request, and only if undated.
+            candidates = []
+            for slug in indexed:
+                page_year = index.year(slug)
+                if page_year is None:
+                    candidates.append(slug)
+                    continue
+                url = f"{base_url}/{slug}"
+                if _year_confirms_page(page_year, expected_year):
+                    _store_resolution(cache_key, url, rejected)
+                    return url
+                rejected.append(slug)
+                logger.info(
+                    "Rejecting CineStar URL %s: listed year=%s, expected_year=%s",
+                    url, page_year, expected_year,
+                )
+
+    had_transient_error = False
     for cand in candidates:
         url = f"{base_url}/{cand}"
         try:
-            resp = requests.get(url, headers=headers, timeout=3, allow_redirects=True)
-            if resp.status_code != 200:
+            status, page_year = _fetch_page_year(url, headers)
+            if status != 200:
+                if status in NOT_FOUND_STATUSES:
+                    rejected.append(cand)
+                else:
+                    had_transient_error = True
                 continue
-            page_year = _parse_produktionsjahr(resp.text)
             if _year_confirms_page(page_year, expected_year):
+                _store_resolution(cache_key, url, rejected)
                 return url
+            rejected.append(cand)
             logger.info(
                 "Rejecting CineStar URL %s: page_year=%s, expected_year=%s",
                 url, page_year, expected_year,
             )
         except Exception:
-            pass  # Ignore connection errors
+            had_transient_error = True  # Ignore connection errors
+
+    # Only remember a miss when every candidate gave a definite answer;
+    # a timeout today says nothing about the page tomorrow.
+    if not had_transient_error:
+        _store_resolution(cache_key, None, rejected)
 
     # Fallback
     return kinoprogramm_film_url
+
+
+def _cache_key(title_norm: str, expected_year: Optional[int], base_url: str = CINESTAR_BASE_URL) -> str:
+    key = f"{title_norm}|{expected_year if expected_year is not None else ''}"
+    # Konstanz entries predate multi-cinema support and keep the short key.
+    if base_url != CINESTAR_BASE_URL:
+        key = f"{base_url}|{key}"
+    return key
+
+
+def _get_cached_resolution(cache_key: str) -> Optional[dict]:
+    """Return the cached entry for `cache_key` if it is still fresh."""
+    entry = get_cache("cinestar_cache").get(cache_key)
+    if not isinstance(entry, dict):
+        return None
+    ttl = CINESTAR_CACHE_HIT_TTL if entry.get("url") else CINESTAR_CACHE_MISS_TTL
+    if time.time() - entry.get("checked_at", 0) > ttl:
+        return None
+    return entry
+
+
+def _store_resolution(cache_key: str, url: Optional[str], rejected: list[str]) -> None:
+    # Size and age of the cache are capped by get_cache (settings: caches).
+    get_cache("cinestar_cache").set(cache_key, {
+        "url": url,
+        "rejected": rejected,
+        "checked_at": int(time.time()),
+    })
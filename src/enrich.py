@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional
+
+from src.cinestar_link import CINESTAR_BASE_URL, resolve_cinestar_url
+from src.instrumentation import stage
+from src.tmdb_match import (
+    get_tmdb_original_title,
+    get_tmdb_release_year,
+    resolve_tmdb_id,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+# The CI job is killed after 5 minutes; leave room for fetch, parse and send.
+DEFAULT_DEADLINE_SECONDS = 180
+# Missing reasons that say "not resolved yet" rather than "no match".
+INCOMPLETE_REASONS = {"enrich_deadline", "enrich_error", "rate_limited"}
+
+
+class TmdbLookups:
+    """
+    Per-run memo of TMDb lookups, shared by every cinema in the run.
+
+    A film playing in several cinemas is resolved once: the first caller
+    does the lookup, concurrent callers for the same title wait for its
+    result instead of issuing their own requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: dict[str, Future] = {}
+
+    def lookup(self, norm_title: str) -> tuple[Optional[int], str, Optional[str], Optional[int]]:
+        """Return (tmdb_id, reason, original_title, release_year)."""
+        with self._lock:
+            future = self._results.get(norm_title)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._results[norm_title] = future
+        if owner:
+            try:
+                future.set_result(_lookup_tmdb(norm_title))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def _lookup_tmdb(norm_title: str) -> tuple[Optional[int], str, Optional[str], Optional[int]]:
+    tmdb_id, reason = resolve_tmdb_id(norm_title)
+    tmdb_original_title = get_tmdb_original_title(tmdb_id) if tmdb_id else None
+    tmdb_year = get_tmdb_release_year(tmdb_id) if tmdb_id else None
+    return tmdb_id, reason, tmdb_original_title, tmdb_year
+
+
+def _fallback_item(norm_title: str, sessions_list: list) -> dict:
+    """Item used when a film could not be enriched (deadline or error)."""
+    earliest_session = sessions_list[0]
+    return {
+        'title': norm_title,
+        'session': earliest_session,
+        'sessions': list(sessions_list),
+        'tmdb_id': None,
+        'cinestar_url': earliest_session.film_url,
+    }
+
+
+def _enrich_one(
+    norm_title: str,
+    sessions_list: list,
+    tmdb_lookups: TmdbLookups,
+    cinestar_base_url: Optional[str],
+) -> tuple[dict, Optional[str]]:
+    earliest_session = sessions_list[0]
+
+    # TMDb
+    with stage("tmdb_lookup"):
+        tmdb_id, reason, tmdb_original_title, tmdb_year = tmdb_lookups.lookup(norm_title)
+    missing_reason = None if tmdb_id else reason
+
+    # Link — pass the TMDb year so we reject CineStar pages whose
+    # Produktionsjahr doesn't match (zombie detail pages for unrelated
+    # older films with the same title slug). Cinemas without a CineStar
+    # site just link to kinoprogramm.
+    if cinestar_base_url:
+        with stage("cinestar_link"):
+            c_url = resolve_cinestar_url(
+                norm_title,
+                earliest_session.film_url,
+                tmdb_original_title,
+                expected_year=tmdb_year,
+                base_url=cinestar_base_url,
+            )
+    else:
+        c_url = earliest_session.film_url
+
+    item = {
+        'title': norm_title,
+        'session': earliest_session,
+        'sessions': list(sessions_list),
+        'tmdb_id': tmdb_id,
+        'cinestar_url': c_url
+    }
+    return item, missing_reason
+
+
+def enrich_films(
+    grouped: dict[str, list],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    deadline_seconds: float = DEFAULT_DEADLINE_SECONDS,
+    cinestar_base_url: Optional[str] = CINESTAR_BASE_URL,
+    tmdb_lookups: Optional[TmdbLookups] = None,
+) -> tuple[list[dict], dict[str, str]]:
+    """
+    Resolve TMDb ids and CineStar links for every film concurrently.
+
+    `grouped` maps normalized title -> sessions of that film. Returns
+    (final_items, missing_titles) exactly like the old serial loop did:
+    items are built in `grouped` order and then stably sorted by their
+    earliest session, so output order and content hash do not depend on
+    which worker finishes first. Per-host concurrency is capped by the
+    shared HTTP client. Films still unresolved when the deadline
+    passes get a plain kinoprogramm link and no TMDb id, and a missing
+    reason from INCOMPLETE_REASONS (main does not send such a week
+    without --force). Pass one
+    `tmdb_lookups` to every call of a run to share TMDb results between
+    cinemas.
+    """
+    if tmdb_lookups is None:
+        tmdb_lookups = TmdbLookups()
+    for sessions_list in grouped.values():
+        sessions_list.sort(key=lambda x: x.dt_local)
+
+    results: dict[str, tuple[dict, Optional[str]]] = {}
+    if grouped:
+        started = time.monotonic()
+        workers = max(1, min(max_workers, len(grouped)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+        try:
+            futures = {
+                executor.submit(_enrich_one, norm_title, sessions_list, tmdb_lookups, cinestar_base_url): norm_title
+                for norm_title, sessions_list in grouped.items()
+            }
+            done, not_done = wait(futures, timeout=deadline_seconds)
+            for future in done:
+                norm_title = futures[future]
+                try:
+                    results[norm_title] = future.result()
+                except Exception as e:
+                    logger.warning(f"Enrichment failed for {norm_title}: {e}")
+                    results[norm_title] = (
+                        _fallback_item(norm_title, grouped[norm_title]),
+                        "enrich_error",
+                    )
+            for future in not_done:
+                future.cancel()
+                logger.warning(f"Enrichment deadline exceeded for {futures[future]}")
+        finally:
+            # Return without waiting for stragglers. Queued films are
+            # cancelled; running ones still finish their current request
+            # (bounded by the per-host timeout and retries) and the
+            # interpreter joins them at exit.
+            executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(
+            f"Enriched {len(results)}/{len(grouped)} films with {workers} workers "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    final_items = []
+    missing_titles = {}
+    for norm_title, sessions_list in grouped.items():
+        if norm_title in results:
+            item, missing_reason = results[norm_title]
+        else:
+            item, missing_reason = _fallback_item(norm_title, sessions_list), "enrich_deadline"
+        if missing_reason:
+            missing_titles[norm_title] = missing_reason
+        final_items.append(item)
+
+    final_items.sort(key=lambda x: x['session'].dt_local)
+    return final_items, missing_titles
@@ -0,0 +1,527 @@
+"""
+Local stand-in for every upstream service the bot talks to, for load
+tests and offline runs:
+
+  * kinoprogramm: /kino/<city>/<cinema> schedule pages (generated for the
+    current cinema week, or a recorded page via --schedule-html) with
+    ETag/304 support, and /kino/<city> city pages for URL discovery
+  * TMDb: /3/search/movie and /3/movie/{id}
+  * CineStar: /kino-<house>/film/<slug> pages with a Produktionsjahr and a
+    /kino-<house>/programm listing of the films on the schedule page
+  * Telegram: /bot<token>/sendMessage
+
+Latency, error rate and a per-service rate limit (answered with 429 and
+Retry-After) are configurable. Answers are deterministic for a given seed.
+
+    python -m src.fake_upstream --port 8090 --write-settings /tmp/fake.yaml
+    CINESTAR_SETTINGS=/tmp/fake.yaml CINESTAR_STATE=/tmp/fake-state.json \\
+        TMDB_API_KEY=x TELEGRAM_BOT_TOKEN=x TELEGRAM_CHAT_ID=1 \\
+        python -m src.main --send --force
+"""
+import argparse
+import copy
+import hashlib
+import html
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+SERVICE_KINOPROGRAMM = "kinoprogramm"
+SERVICE_TMDB = "tmdb"
+SERVICE_CINESTAR = "cinestar"
+SERVICE_TELEGRAM = "telegram"
+SERVICES = (SERVICE_KINOPROGRAMM, SERVICE_TMDB, SERVICE_CINESTAR, SERVICE_TELEGRAM)
+
+CINEMA_PATH_REGEX = re.compile(r"^/kino/([^/]+)/([^/]+)$")
+CITY_PATH_REGEX = re.compile(r"^/kino/([^/]+)$")
+CINESTAR_PATH_REGEX = re.compile(r"^/(kino-[^/]+)/film/([^/]+)$")
+CINESTAR_PROGRAMME_REGEX = re.compile(r"^/(kino-[^/]+)/programm$")
+# Language/format tags after a listed title, dropped for the CineStar listing.
+TITLE_TAG_REGEX = re.compile(r"\s*(?:\([^)]*\)|\[[^\]]*\]|\bOmeU\b|\bOmU\b|\bOV\b)\s*$")
+TMDB_MOVIE_PATH_REGEX = re.compile(r"^/3/movie/(\d+)$")
+TELEGRAM_PATH_REGEX = re.compile(r"^/bot[^/]+/sendMessage$")
+
+BASE_TITLES = [
+    "The Long Night", "Paper Moon Harbor", "Silent Frequencies", "Der Astronaut",
+    "Northern Lights", "A Quiet Engine", "Kinder des Sturms", "Glass Orchard",
+    "Last Train to Lyon", "Die Vermessung", "Echo Valley", "Blue Hour",
+]
+# Tags cycled through the generated films; None is a dubbed (German) film.
+LANGUAGE_TAGS = ["(OV)", None, "(OmU)", "[Originalfassung]", None, "OmeU"]
+DAY_NAMES = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+DAY_NAMES_LONG = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+SHOW_TIMES = ["14:30", "17:00", "17:45", "20:00", "20:30", "22:45"]
+
+FILM_BLOCK_REGEX = re.compile(r'<div class="row mt-5">.*?(?=<div class="row mt-5">|</main>)', re.S)
+FILM_TITLE_REGEX = re.compile(r'title="Kinofilm ([^"]+)">([^<]+)</a>')
+FILM_HREF_REGEX = re.compile(r'href="/film/([^"]+)"')
+
+
+def _stable_int(text: str) -> int:
+    return zlib.crc32(text.lower().encode("utf-8"))
+
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def generated_titles(count: int) -> list[str]:
+    """`count` distinct film titles; sequels once the base list runs out."""
+    titles = []
+    for i in range(count):
+        base = BASE_TITLES[i % len(BASE_TITLES)]
+        part = i // len(BASE_TITLES)
+        titles.append(base if part == 0 else f"{base} {part + 1}")
+    return titles
+
+
+def build_schedule_html(week_start: date, film_count: int = 24, days: int = 14, seed: int = 0) -> str:
+    """
+    A kinoprogramm cinema page in the real layout with `film_count` films
+    playing from `week_start` for `days` days.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i, title in enumerate(generated_titles(film_count)):
+        tag = LANGUAGE_TAGS[i % len(LANGUAGE_TAGS)]
+        shown_title = html.escape(f"{title} {tag}" if tag else title)
+        href = f"/film/{_slug(title)}-{100000 + i}"
+        items = []
+        for offset in range(days):
+            if rng.random() < 0.4:
+                continue
+            day = week_start + timedelta(days=offset)
+            times = sorted(rng.sample(SHOW_TIMES, rng.randint(1, 3)))
+            items.append(
+                '      <div class="item">\n'
+                f'        <p class="mb-0 fw-bold">{DAY_NAMES[day.weekday()]}</p>\n'
+                f'        <p class="mb-2 fw-bold">{day:%d.%m.}</p>\n'
+                + "".join(f'        <p class="mb-1">{t}</p>\n' for t in times)
+                + "      </div>\n"
+            )
+        rows.append(
+            '<div class="row mt-5">\n'
+            f'  <div class="col-4 first"><a href="{href}"><img src="/poster.jpg" alt="Poster"></a></div>\n'
+            '  <div class="col-8">\n'
+            '    <div class="city_filmtitel">\n'
+            f'      <a class="h3" href="{href}" title="Kinofilm {shown_title}">{shown_title}</a>\n'
+            '      <p class="small">FSK 12 &middot; 120 Min.</p>\n'
+            "    </div>\n"
+            "  </div>\n"
+            "</div>\n"
+            '<div class="row">\n'
+            '  <div class="col-12">\n'
+            '    <div class="owl-carousel owl-movie-times">\n'
+            + "".join(items)
+            + "    </div>\n"
+            "  </div>\n"
+            "</div>\n"
+        )
+    return (
+        '<!DOCTYPE html>\n<html lang="de">\n<head>\n<meta charset="utf-8">\n'
+        "<title>Kinoprogramm</title>\n</head>\n<body>\n"
+        '<header class="container">\n  <div class="row">\n'
+        f'    <div class="col-12 today"><span class="text-white">{DAY_NAMES_LONG[week_start.weekday()]} '
+        f"{week_start:%d.%m.%Y}</span></div>\n"
+        "  </div>\n</header>\n"
+        '<main class="container cinema-program">\n'
+        + "".join(rows)
+        + "</main>\n</body>\n</html>\n"
+    )
+
+
+def scale_schedule_html(page: str, factor: int) -> str:
+    """Repeat every film block of a recorded page `factor` times as distinct films."""
+    if factor <= 1:
+        return page
+    blocks = FILM_BLOCK_REGEX.findall(page)
+    copies = []
+    for k in range(1, factor):
+        for block in blocks:
+            block = FILM_TITLE_REGEX.sub(rf'title="Kinofilm Vol {k} \1">Vol {k} \2</a>', block)
+            copies.append(FILM_HREF_REGEX.sub(rf'href="/film/\1-v{k}"', block))
+    end = page.index("</main>")
+    return page[:end] + "".join(copies) + page[end:]
+
+
+class FakeUpstreamConfig:
+    """
+    Behaviour of the fake services. `rate_limit` is requests per second per
+    service (0 = unlimited); `error_rate` is the share of requests answered
+    with 503. Without `schedule_html`, cinema pages are generated with
+    `films` films for the current cinema week.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        films: int = 24,
+        schedule_html: Optional[str] = None,
+        cinestar_miss_rate: float = 1 / 3,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.films = films
+        self.schedule_html = schedule_html
+        self.cinestar_miss_rate = cinestar_miss_rate
+        self.seed = seed
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    upstream: "FakeUpstream" = None
+
+    def do_GET(self):
+        self.upstream._handle(self, "GET")
+
+    def do_HEAD(self):
+        self.upstream._handle(self, "HEAD")
+
+    def do_POST(self):
+        self.upstream._handle(self, "POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstream:
+    """
+    The fake services on one local port, run in a background thread:
+
+        with FakeUpstream(FakeUpstreamConfig(latency=0.05)) as base_url:
+            ...
+    """
+
+    def __init__(self, config: Optional[FakeUpstreamConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeUpstreamConfig()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._buckets = {service: _TokenBucket(self.config.rate_limit) for service in SERVICES}
+        self._schedule_cache: dict[date, tuple[str, str]] = {}
+        self._tmdb_titles: dict[int, str] = {}
+        self.stats = {service: {"requests": 0, "errors": 0, "rate_limited": 0} for service in SERVICES}
+        self.messages: list[dict] = []
+
+        handler = type("Handler", (_Handler,), {"upstream": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> str:
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- request handling ---
+
+    def _service(self, path: str) -> Optional[str]:
+        if path.startswith("/3/"):
+            return SERVICE_TMDB
+        if CINESTAR_PATH_REGEX.match(path) or CINESTAR_PROGRAMME_REGEX.match(path):
+            return SERVICE_CINESTAR
+        if path.startswith("/kino/"):
+            return SERVICE_KINOPROGRAMM
+        if TELEGRAM_PATH_REGEX.match(path):
+            return SERVICE_TELEGRAM
+        return None
+
+    def _handle(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        parsed = urlparse(request.path)
+        if parsed.path == "/_stats":
+            self._send(request, method, 200, json.dumps(self.snapshot()), "application/json")
+            return
+        service = self._service(parsed.path)
+        if service is None:
+            self._send(request, method, 404, "not found", "text/plain")
+            return
+
+        config = self.config
+        with self._lock:
+            self.stats[service]["requests"] += 1
+            limited = config.rate_limit > 0 and not self._buckets[service].take()
+            failed = not limited and self._rng.random() < config.error_rate
+            delay = config.latency + (self._rng.uniform(0, config.jitter) if config.jitter else 0)
+            if limited:
+                self.stats[service]["rate_limited"] += 1
+            elif failed:
+                self.stats[service]["errors"] += 1
+        if delay:
+            time.sleep(delay)
+        if limited:
+            self._send(request, method, 429, '{"status_code": 25}', "application/json", {"Retry-After": "1"})
+            return
+        if failed:
+            self._send(request, method, 503, "service unavailable", "text/plain")
+            return
+
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        if service == SERVICE_TMDB:
+            self._handle_tmdb(request, method, parsed.path, query)
+        elif service == SERVICE_CINESTAR:
+            self._handle_cinestar(request, method, parsed.path)
+        elif service == SERVICE_KINOPROGRAMM:
+            self._handle_kinoprogramm(request, method, parsed.path)
+        else:
+            self._handle_telegram(request, method)
+
+    def _handle_kinoprogramm(self, request, method: str, path: str) -> None:
+        city_match = CITY_PATH_REGEX.match(path)
+        if city_match:
+            city = city_match.group(1)
+            links = "".join(
+                f'<a href="/kino/{city}/cinestar-{city}-{n}">CineStar {n}</a>\n' for n in range(1, 4)
+            )
+            self._send(request, method, 200, f"<html><body>{links}</body></html>", "text/html; charset=utf-8")
+            return
+        if not CINEMA_PATH_REGEX.match(path):
+            self._send(request, method, 404, "not found", "text/plain")
+            return
+        page, etag = self._schedule_page()
+        if request.headers.get("If-None-Match") == etag:
+            self._send(request, method, 304, "", None, {"ETag": etag})
+            return
+        self._send(request, method, 200, page, "text/html; charset=utf-8", {"ETag": etag})
+
+    def _schedule_page(self) -> tuple[str, str]:
+        today = date.today()
+        with self._lock:
+            cached = self._schedule_cache.get(today)
+            if cached is None:
+                if self.config.schedule_html is not None:
+                    page = self.config.schedule_html
+                else:
+                    week_start = today - timedelta(days=(today.weekday() - 3) % 7)
+                    page = build_schedule_html(week_start, self.config.films, seed=self.config.seed)
+                etag = f'"{hashlib.sha256(page.encode("utf-8")).hexdigest()[:16]}"'
+                cached = (page, etag)
+                self._schedule_cache = {today: cached}
+            return cached
+
+    def _handle_tmdb(self, request, method: str, path: str, query: dict) -> None:
+        if not query.get("api_key"):
+            self._send(request, method, 401, '{"status_code": 7, "status_message": "Invalid API key"}',
+                       "application/json")
+            return
+        current_year = datetime.now().year
+        if path == "/3/search/movie":
+            title = query.get("query", "")
+            results = []
+            # One in five queries finds nothing; the rest find the current
+            # film and an old namesake the matcher has to reject.
+            if title and _stable_int(title) % 5:
+                film_id = _stable_int(title) % 900000 + 1000
+                decoy_id = film_id + 1000000
+                with self._lock:
+                    self._tmdb_titles[film_id] = title
+                    self._tmdb_titles[decoy_id] = title
+                results = [
+                    {"id": decoy_id, "title": title, "original_title": title,
+                     "release_date": "1998-05-01", "vote_count": 4000},
+                    {"id": film_id, "title": title, "original_title": title,
+                     "release_date": f"{current_year}-01-15", "vote_count": 150},
+                ]
+            body = {"page": 1, "results": results, "total_results": len(results)}
+            self._send(request, method, 200, json.dumps(body), "application/json")
+            return
+        movie_match = TMDB_MOVIE_PATH_REGEX.match(path)
+        if movie_match:
+            film_id = int(movie_match.group(1))
+            with self._lock:
+                title = self._tmdb_titles.get(film_id, f"Film {film_id}")
+            year = 1998 if film_id > 1000000 else current_year
+            body = {"id": film_id, "title": title, "original_title": title, "release_date": f"{year}-01-15",
+                    "runtime": 110, "vote_average": 7.1, "poster_path": f"/{film_id}.jpg"}
+            self._send(request, method, 200, json.dumps(body), "application/json")
+            return
+        self._send(request, method, 404, '{"status_code": 34}', "application/json")
+
+    def _cinestar_missing(self, slug: str) -> bool:
+        return (_stable_int(slug) % 1000) / 1000 < self.config.cinestar_miss_rate
+
+    def _handle_cinestar(self, request, method: str, path: str) -> None:
+        programme = CINESTAR_PROGRAMME_REGEX.match(path)
+        if programme:
+            self._send(request, method, 200, self._cinestar_programme(programme.group(1)), "text/html; charset=utf-8")
+            return
+        slug = CINESTAR_PATH_REGEX.match(path).group(2)
+        if self._cinestar_missing(slug):
+            self._send(request, method, 404, "<html><body>Seite nicht gefunden</body></html>",
+                       "text/html; charset=utf-8")
+            return
+        page = (
+            "<html><body><h1>" + html.escape(slug) + "</h1>"
+            + "<p>" + "Lorem ipsum dolor sit amet. " * 200 + "</p>"
+            + f"<dl><b>Produktionsjahr</b><span>{datetime.now().year}</span></dl>"
+            + "</body></html>"
+        )
+        self._send(request, method, 200, page, "text/html; charset=utf-8")
+
+    def _cinestar_programme(self, house: str) -> str:
+        """Every film of the schedule page CineStar has a page for, with its Produktionsjahr."""
+        page, _ = self._schedule_page()
+        titles = []
+        for match in FILM_TITLE_REGEX.finditer(page):
+            title = TITLE_TAG_REGEX.sub("", html.unescape(match.group(2))).strip()
+            if title and title not in titles:
+                titles.append(title)
+        year = datetime.now().year
+        films = "".join(
+            f'<div class="film"><a href="/{house}/film/{_slug(title)}">{html.escape(title)}</a>'
+            f"<b>Produktionsjahr</b><span>{year}</span></div>\n"
+            for title in titles
+            if not self._cinestar_missing(_slug(title))
+        )
+        return f"<html><body><h1>Programm</h1>\n{films}</body></html>"
+
+    def _handle_telegram(self, request, method: str) -> None:
+        length = int(request.headers.get("Content-Length") or 0)
+        form = {key: values[0] for key, values in parse_qs(request.rfile.read(length).decode("utf-8")).items()}
+        if method != "POST" or not form.get("chat_id") or not form.get("text"):
+            self._send(request, method, 400, '{"ok": false, "description": "Bad Request: chat_id or text is empty"}',
+                       "application/json")
+            return
+        with self._lock:
+            self.messages.append(form)
+            message_id = len(self.messages)
+        body = {"ok": True, "result": {"message_id": message_id, "chat": {"id": form["chat_id"]},
+                                       "date": int(time.time()), "text": form["text"]}}
+        self._send(request, method, 200, json.dumps(body, ensure_ascii=False), "application/json")
+
+    def _send(self, request, method: str, status: int, body: str, content_type: Optional[str],
+              headers: Optional[dict] = None) -> None:
+        payload = body.encode("utf-8")
+        request.send_response(status)
+        if content_type:
+            request.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        if status != 304:
+            request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+        if method != "HEAD" and status != 304:
+            request.wfile.write(payload)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "services": copy.deepcopy(self.stats),
+                "messages_sent": len(self.messages),
+            }
+
+
+def fake_settings(settings: dict, base_url: str, cinemas: int = 1) -> dict:
+    """Copy of `settings` with every upstream URL pointed at the fake server."""
+    settings = copy.deepcopy(settings)
+    settings["tmdb_api_base"] = f"{base_url}/3"
+    settings["telegram_api_base"] = base_url
+    settings["kinoprogramm_url"] = f"{base_url}/kino/konstanz-universitaetsstadt/cinestar-konstanz-60996"
+    settings["cinestar_base_url"] = f"{base_url}/kino-konstanz/film"
+    settings.pop("cinemas", None)
+    if cinemas > 1:
+        settings["cinemas"] = [
+            {
+                "id": f"fake-{n}",
+                "name": f"Fake Cinema {n}",
+                "kinoprogramm_url": f"{base_url}/kino/fake-city-{n}/fake-cinema-{n}",
+                "cinestar_base_url": f"{base_url}/kino-fake-{n}/film",
+                "chat_id": str(-1000 - n),
+            }
+            for n in range(1, cinemas + 1)
+        ]
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake kinoprogramm/TMDb/CineStar/Telegram server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second per service before 429 (0 = off)")
+    parser.add_argument("--films", type=int, default=24, help="Films on each generated cinema page")
+    parser.add_argument("--schedule-html", help="Serve this recorded cinema page instead of a generated one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write-settings", metavar="PATH", help="Write a settings file pointing at this server")
+    parser.add_argument("--cinemas", type=int, default=1, help="Cinemas in the written settings file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config = FakeUpstreamConfig(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        films=args.films,
+        schedule_html=Path(args.schedule_html).read_text(encoding="utf-8") if args.schedule_html else None,
+        seed=args.seed,
+    )
+    upstream = FakeUpstream(config, host=args.host, port=args.port)
+    if args.write_settings:
+        from src.fetch_kinoprogramm import DEFAULT_SETTINGS_PATH, load_settings
+        settings = fake_settings(load_settings(DEFAULT_SETTINGS_PATH), upstream.base_url, args.cinemas)
+        Path(args.write_settings).write_text(yaml.safe_dump(settings, allow_unicode=True, sort_keys=False))
+        logger.info(f"Settings written to {args.write_settings} (use CINESTAR_SETTINGS or --settings)")
+
+    logger.info(f"Fake upstream listening on {upstream.base_url} (stats: {upstream.base_url}/_stats)")
+    try:
+        upstream.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        upstream.httpd.server_close()
+        logger.info(f"Final stats: {json.dumps(upstream.snapshot())}")
+
+
+if __name__ == "__main__":
+    main()
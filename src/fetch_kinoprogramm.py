@@ -1,18 +1,14 @@
+import codecs
+import hashlib
 import logging
+import os
 import requests
 import yaml
-import time
-import socket
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-import requests.packages.urllib3.util.connection as urllib3_cn
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
-# Force IPv4 to avoid "Network is unreachable" on GitHub Actions (IPv6 issues)
-def allowed_gai_family():
-    return socket.AF_INET
-
-urllib3_cn.allowed_gai_family = allowed_gai_family
+from src import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +23,7 @@ def _build_discovery_url(schedule_url: str) -> Optional[str]:
     return f"{parsed.scheme}://{parsed.netloc}/kino/{city_slug}"
 
 
-def _discover_updated_cinema_url(
-    original_url: str, headers: dict, timeout: int
-) -> Optional[str]:
+def _discover_updated_cinema_url(original_url: str, headers: dict) -> Optional[str]:
     """Try to find updated cinema link when old schedule URL returns 404."""
     parsed = urlparse(original_url)
     parts = [p for p in parsed.path.split("/") if p]
@@ -44,7 +38,7 @@ def _discover_updated_cinema_url(
 
     try:
         logger.info(f"Trying URL discovery via {discovery_url}")
-        response = requests.get(discovery_url, headers=headers, timeout=timeout)
+        response = http_client.get(discovery_url, headers=headers)
         response.raise_for_status()
     except requests.RequestException as e:
         logger.warning(f"URL discovery request failed: {e}")
@@ -59,49 +53,182 @@ def _discover_updated_cinema_url(
             return f"{parsed.scheme}://{parsed.netloc}{href}"
     return None
 
-def load_settings(path: str = "config/settings.yaml") -> dict:
+# CINESTAR_SETTINGS (or main's --settings) selects another settings file,
+# e.g. one written by src.fake_upstream for offline runs.
+DEFAULT_SETTINGS_PATH = "config/settings.yaml"
+
+
+def load_settings(path: Optional[str] = None) -> dict:
+    if path is None:
+        path = os.environ.get("CINESTAR_SETTINGS", DEFAULT_SETTINGS_PATH)
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
-def fetch_schedule_html() -> Optional[str]:
-    settings = load_settings()
-    url = settings["kinoprogramm_url"]
-    current_url = url
-    timeout = settings.get("request_timeout", 30)
-    retries = settings.get("request_retries", 3)
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-User": "?1",
-        "Cache-Control": "max-age=0"
+
+def get_setting(key: str, default=None):
+    """One top-level settings value; `default` if it or the file is missing."""
+    try:
+        return (load_settings() or {}).get(key, default)
+    except FileNotFoundError:
+        return default
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0"
+}
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Why fetch_schedule skipped an unchanged page.
+UNCHANGED_NOT_MODIFIED = "not_modified"
+UNCHANGED_SAME_BODY = "same_body_hash"
+
+
+class ScheduleFetch:
+    """
+    Result of fetch_schedule. `html` is None when the page is unchanged
+    since `previous` (then `unchanged_reason` says why). `validators` is
+    what to remember for the next conditional request: url, etag,
+    last_modified and body_sha256.
+    """
+
+    def __init__(self, html: Optional[str], validators: dict, unchanged_reason: Optional[str] = None):
+        self.html = html
+        self.validators = validators
+        self.unchanged_reason = unchanged_reason
+
+
+def _conditional_headers(url: str, previous: Optional[dict]) -> dict:
+    if not previous or previous.get("url") != url:
+        return {}
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+    return headers
+
+
+def _validators(url: str, response: requests.Response, body_sha256: Optional[str]) -> dict:
+    return {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "body_sha256": body_sha256,
     }
 
-    for attempt in range(retries + 1):
+
+def _request_schedule(url: str, stream: bool = False, extra_headers: Optional[dict] = None) -> Optional[requests.Response]:
+    headers = BROWSER_HEADERS
+    if extra_headers:
+        headers = {**BROWSER_HEADERS, **extra_headers}
+
+    # Transient failures (timeouts, 5xx, 429) are retried by the HTTP client.
+    # A 404 usually means kinoprogramm renamed the cinema slug, so we look
+    # for the new URL on the city page and try that once.
+    current_url = url
+    while True:
         try:
-            logger.info(f"Fetching {current_url}, attempt {attempt + 1}/{retries + 1}")
-            response = requests.get(current_url, headers=headers, timeout=timeout)
+            logger.info(f"Fetching {current_url}")
+            response = http_client.get(current_url, headers=headers, stream=stream)
             response.raise_for_status()
-            return response.text
+            return response
         except requests.RequestException as e:
             logger.warning(f"Request failed: {e}")
             status_code = getattr(getattr(e, "response", None), "status_code", None)
             if status_code == 404 and current_url == url:
-                discovered_url = _discover_updated_cinema_url(url, headers, timeout)
+                discovered_url = _discover_updated_cinema_url(url, BROWSER_HEADERS)
                 if discovered_url and discovered_url != current_url:
                     logger.info(f"Discovered updated cinema URL: {discovered_url}")
                     current_url = discovered_url
                     continue
-            if attempt < retries:
-                time.sleep(2)  # Simple backoff
-            else:
-                logger.error("All retries exhausted.")
-                return None
-    return None
+            logger.error("All retries exhausted.")
+            return None
+
+
+def fetch_schedule(url: Optional[str] = None, previous: Optional[dict] = None) -> Optional[ScheduleFetch]:
+    """
+    Fetch the schedule page, or None if the request failed.
+
+    With `previous` validators the request is conditional
+    (If-None-Match/If-Modified-Since), and a 304 or a body with the same
+    hash as last time comes back as unchanged, without html.
+    """
+    if url is None:
+        url = load_settings()["kinoprogramm_url"]
+    response = _request_schedule(url, extra_headers=_conditional_headers(url, previous))
+    if response is None:
+        return None
+
+    if response.status_code == 304:
+        validators = dict(previous)
+        # A 304 may carry fresher validators.
+        for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified")):
+            if response.headers.get(header):
+                validators[key] = response.headers[header]
+        return ScheduleFetch(None, validators, UNCHANGED_NOT_MODIFIED)
+
+    body_sha256 = hashlib.sha256(response.content).hexdigest()
+    validators = _validators(url, response, body_sha256)
+    if previous and previous.get("url") == url and previous.get("body_sha256") == body_sha256:
+        return ScheduleFetch(None, validators, UNCHANGED_SAME_BODY)
+    return ScheduleFetch(response.text, validators)
+
+
+def fetch_schedule_html(url: Optional[str] = None) -> Optional[str]:
+    result = fetch_schedule(url)
+    return result.html if result is not None else None
+
+
+def _iter_decoded(
+    response: requests.Response,
+    on_complete: Optional[Callable[[str], None]] = None,
+) -> Iterator[str]:
+    # Decode chunk by chunk with the charset from the headers. (response.text
+    # would sniff a missing charset from the body, which needs all of it.)
+    encoding = response.encoding or "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    digest = hashlib.sha256()
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            digest.update(chunk)
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+        if on_complete is not None:
+            on_complete(digest.hexdigest())
+    finally:
+        response.close()
+
+
+def open_schedule_stream(
+    url: Optional[str] = None,
+    on_validators: Optional[Callable[[dict], None]] = None,
+) -> Optional[Iterator[str]]:
+    """
+    Start downloading the schedule page and return an iterator of decoded
+    text chunks (for parse_schedule.iter_sessions), or None if the request
+    failed. The body is read lazily as the iterator is consumed; once it
+    has been read completely, `on_validators` gets the same validators
+    fetch_schedule would return.
+    """
+    if url is None:
+        url = load_settings()["kinoprogramm_url"]
+    response = _request_schedule(url, stream=True)
+    if response is None:
+        return None
+    on_complete = None
+    if on_validators is not None:
+        on_complete = lambda body_sha256: on_validators(_validators(url, response, body_sha256))
+    return _iter_decoded(response, on_complete)
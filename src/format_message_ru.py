@@ -45,8 +45,13 @@ def _format_sessions_ru(item: dict) -> str:
 
     return "; ".join(grouped_sessions)
 
-def format_message(week_start: datetime, week_end: datetime, items: list[dict]) -> str:
-    header = f"🎬 CineStar Konstanz — OV ({_week_range_compact(week_start, week_end)})"
+def format_message(
+    week_start: datetime,
+    week_end: datetime,
+    items: list[dict],
+    cinema_name: str = "CineStar Konstanz",
+) -> str:
+    header = f"🎬 {escape(cinema_name)} — OV ({_week_range_compact(week_start, week_end)})"
     lines = [header, ""]
 
     if not items:
@@ -0,0 +1,326 @@
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+import requests.packages.urllib3.util.connection as urllib3_cn
+from requests.adapters import HTTPAdapter
+
+from src.rate_limit import PRIORITY_NORMAL
+
+# Force IPv4 to avoid "Network is unreachable" on GitHub Actions (IPv6 issues)
+def allowed_gai_family():
+    return socket.AF_INET
+
+urllib3_cn.allowed_gai_family = allowed_gai_family
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+DEFAULT_POOL_MAXSIZE = 8
+DEFAULT_MAX_CONCURRENCY = 8
+# Statuses worth another attempt. Everything else (404 included) is final.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods that may be replayed after a read error. A POST to Telegram that
+# timed out may still have been delivered, so it is only retried when the
+# server explicitly asked for it (429) or the connection never opened.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Secrets that end up in request URLs: the Telegram bot token is a path
+# segment (/bot<token>/sendMessage), the TMDb api_key a query parameter.
+BOT_TOKEN_RE = re.compile(r"/bot[^/\s]+/")
+URL_RE = re.compile(r"https?://[^\s'\"<>]+")
+QUERY_RE = re.compile(r"\?[^\s'\"<>)]*")
+
+
+def redact_url(url: str) -> str:
+    """Host and path of `url` for logs, without the query and with the bot token masked."""
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{BOT_TOKEN_RE.sub('/bot***/', parsed.path)}"
+
+
+def redact_text(text: str) -> str:
+    """`text` (e.g. an exception message) with every URL in it passed through redact_url."""
+    text = URL_RE.sub(lambda m: redact_url(m.group(0)), text)
+    # urllib3 errors also quote the bare path ("with url: /bot.../sendMessage?...").
+    return QUERY_RE.sub("", BOT_TOKEN_RE.sub("/bot***/", text))
+
+
+# Called after every attempt as
+# hook(method, url, response, error, seconds, attempt, stream).
+_request_hooks: list = []
+
+
+def add_request_hook(hook) -> None:
+    if hook not in _request_hooks:
+        _request_hooks.append(hook)
+
+
+def _run_request_hooks(*args) -> None:
+    for hook in list(_request_hooks):
+        try:
+            hook(*args)
+        except Exception as e:
+            logger.debug(f"Request hook {hook} failed: {e}")
+
+
+class HttpClient:
+    """
+    Shared HTTP client: one keep-alive pool per host, per-host timeouts and
+    concurrency caps, and retries with exponential backoff plus full jitter.
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.timeout = config.get("timeout", DEFAULT_TIMEOUT)
+        self.retries = config.get("retries", DEFAULT_RETRIES)
+        self.backoff_base = config.get("backoff_base", DEFAULT_BACKOFF_BASE)
+        self.backoff_max = config.get("backoff_max", DEFAULT_BACKOFF_MAX)
+        self.max_concurrency = config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        self.hosts = config.get("hosts") or {}
+
+        pool_maxsize = config.get("pool_maxsize", DEFAULT_POOL_MAXSIZE)
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=max(len(self.hosts), 4),
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._retry_counts: dict[str, int] = {}
+        # (url prefix, limiter): requests under the prefix wait for a token.
+        self._rate_limiters: list[tuple[str, object]] = []
+
+    def host_setting(self, host: str, key: str, default=None):
+        host_config = self.hosts.get(host) or {}
+        if key in host_config:
+            return host_config[key]
+        return getattr(self, key, default)
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                limit = max(1, int(self.host_setting(host, "max_concurrency")))
+                sem = threading.BoundedSemaphore(limit)
+                self._semaphores[host] = sem
+            return sem
+
+    def set_rate_limiter(self, url_prefix: str, limiter) -> None:
+        """Schedule every request whose URL starts with `url_prefix` through `limiter` (a rate_limit.TokenBucket)."""
+        with self._lock:
+            self._rate_limiters = [(p, l) for p, l in self._rate_limiters if p != url_prefix]
+            self._rate_limiters.append((url_prefix, limiter))
+
+    def _rate_limiter(self, url: str):
+        with self._lock:
+            for prefix, limiter in self._rate_limiters:
+                if url.startswith(prefix):
+                    return limiter
+        return None
+
+    def rate_limit_stats(self) -> dict[str, dict]:
+        with self._lock:
+            limiters = list(self._rate_limiters)
+        return {prefix: limiter.stats() for prefix, limiter in limiters}
+
+    @staticmethod
+    def _retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        """Seconds the server asked to wait: Retry-After as delay-seconds or as an HTTP-date (RFC 9110)."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if not retry_after:
+            return None
+        retry_after = retry_after.strip()
+        if retry_after.isdigit():
+            return float(retry_after)
+        try:
+            when = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    def _backoff(self, host: str, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.host_setting(host, "backoff_max"), self.host_setting(host, "backoff_base") * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        priority: int = PRIORITY_NORMAL,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send a request and return the final response. Retryable statuses are
+        retried and the last response is returned once attempts run out;
+        network errors are re-raised after the last attempt. A Retry-After
+        is waited out in full, or, when longer than backoff_max, the
+        response is returned at once.
+
+        URLs with a rate limiter (set_rate_limiter) wait for a token before
+        every attempt, lower `priority` first; a 429 pauses the limiter for
+        all of its callers instead of just this one.
+        """
+        method = method.upper()
+        host = urlparse(url).netloc
+        if timeout is None:
+            timeout = self.host_setting(host, "timeout")
+        if retries is None:
+            retries = self.host_setting(host, "retries")
+        idempotent = method in IDEMPOTENT_METHODS
+        stream = bool(kwargs.get("stream"))
+        limiter = self._rate_limiter(url)
+
+        attempt = 0
+        while True:
+            response = None
+            if limiter is not None:
+                limiter.acquire(priority)
+            try:
+                with self._semaphore(host):
+                    started = time.perf_counter()
+                    try:
+                        response = self.session.request(method, url, timeout=timeout, **kwargs)
+                    except requests.RequestException as e:
+                        _run_request_hooks(method, url, None, e, time.perf_counter() - started, attempt, stream)
+                        raise
+                    _run_request_hooks(method, url, response, None, time.perf_counter() - started, attempt, stream)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                if not idempotent and response.status_code != 429:
+                    return response
+                # Retrying before the server's Retry-After is pointless; a
+                # wait longer than backoff_max is not worth blocking the run.
+                retry_after = self._retry_after(response)
+                if retry_after is not None and retry_after > self.host_setting(host, "backoff_max"):
+                    logger.warning(
+                        f"Giving up on {method} {redact_url(url)}: HTTP {response.status_code} "
+                        f"with Retry-After {retry_after:.0f}s"
+                    )
+                    return response
+                reason = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                replay_safe = idempotent or isinstance(e, requests.ConnectTimeout)
+                if attempt >= retries or not replay_safe:
+                    raise
+                reason = redact_text(str(e))
+
+            delay = self._backoff(host, attempt, response)
+            # Pause every caller of the limiter; acquire() then waits it out.
+            throttled = limiter is not None and response is not None and response.status_code == 429
+            if throttled:
+                limiter.throttle(delay)
+            attempt += 1
+            with self._lock:
+                self._retry_counts[host] = self._retry_counts.get(host, 0) + 1
+            logger.info(f"Retrying {method} {redact_url(url)} in {delay:.1f}s ({reason}), attempt {attempt + 1}/{retries + 1}")
+            if response is not None:
+                response.close()
+            if not throttled:
+                time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def connection_stats(self) -> dict[str, dict]:
+        """Per-host request, new-connection and reused-connection counts."""
+        stats = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            entry = stats.setdefault(host, {"requests": 0, "connections": 0, "reused": 0, "retries": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+        with self._lock:
+            for host, count in self._retry_counts.items():
+                entry = stats.setdefault(host, {"requests": 0, "connections": 0, "reused": 0, "retries": 0})
+                entry["retries"] += count
+        for entry in stats.values():
+            entry["reused"] = max(entry["requests"] - entry["connections"], 0)
+        return stats
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Process-wide client configured from the `http` section of settings."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from src.fetch_kinoprogramm import get_setting
+            _client = HttpClient(get_setting("http"))
+        return _client
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_client().post(url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    return get_client().head(url, **kwargs)
+
+
+def connection_stats() -> dict[str, dict]:
+    if _client is None:
+        return {}
+    return _client.connection_stats()
+
+
+def rate_limit_stats() -> dict[str, dict]:
+    if _client is None:
+        return {}
+    return _client.rate_limit_stats()
+
+
+def log_connection_stats() -> None:
+    for host, entry in sorted(connection_stats().items()):
+        logger.info(
+            f"HTTP {host}: {entry['requests']} requests over {entry['connections']} connections "
+            f"({entry['reused']} reused, {entry['retries']} retries)"
+        )
+    for prefix, entry in sorted(rate_limit_stats().items()):
+        logger.info(
+            f"Rate limit {prefix}: {entry['requests']} requests, {entry['throttles']} throttled, "
+            f"waited {entry['wait_seconds']:.1f}s (max {entry['max_wait_seconds']:.1f}s, "
+            f"queue up to {entry['max_queue_depth']})"
+        )
@@ -0,0 +1,216 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+from src.http_client import BOT_TOKEN_RE, redact_text
+
+logger = logging.getLogger(__name__)
+
+
+class RunReport:
+    """
+    Timings and counters of one run: pipeline stages, every outbound HTTP
+    attempt (host, status, bytes, latency) and cache hits/misses.
+
+    Recording is cheap and thread-safe, so it is always on; `--report`
+    only decides whether the result is written to disk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages: list[dict] = []
+        self.requests: list[dict] = []
+        self.caches: dict[str, dict[str, int]] = {}
+
+    @contextmanager
+    def stage(self, name: str, cinema: Optional[str] = None) -> Iterator[None]:
+        """Time the body of the `with` block as one run of stage `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                "stage": name,
+                "offset": round(started - self._started, 4),
+                "seconds": round(time.perf_counter() - started, 4),
+            }
+            if cinema:
+                record["cinema"] = cinema
+            with self._lock:
+                self.stages.append(record)
+
+    def record_request(
+        self,
+        method: str,
+        url: str,
+        status: Optional[int],
+        nbytes: Optional[int],
+        seconds: float,
+        attempt: int = 0,
+        error: Optional[str] = None,
+    ) -> dict:
+        parsed = urlparse(url)
+        record = {
+            "method": method,
+            "host": parsed.netloc,
+            # The report may be shared: no bot token, no query (api_key).
+            "path": BOT_TOKEN_RE.sub("/bot***/", parsed.path),
+            "status": status,
+            "bytes": nbytes,
+            "seconds": round(seconds, 4),
+            "attempt": attempt,
+        }
+        if status == 304:
+            record["cache"] = "revalidated"
+        if error:
+            record["error"] = redact_text(error)
+        with self._lock:
+            self.requests.append(record)
+        return record
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        with self._lock:
+            counts = self.caches.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def stage_totals(self) -> dict[str, dict]:
+        totals: dict[str, dict] = {}
+        with self._lock:
+            stages = list(self.stages)
+        for record in stages:
+            entry = totals.setdefault(record["stage"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] = round(entry["seconds"] + record["seconds"], 4)
+            entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+        return totals
+
+    def host_totals(self) -> dict[str, dict]:
+        totals: dict[str, dict] = {}
+        with self._lock:
+            requests = list(self.requests)
+        for record in requests:
+            entry = totals.setdefault(
+                record["host"],
+                {"requests": 0, "errors": 0, "bytes": 0, "seconds": 0.0, "max_seconds": 0.0, "statuses": {}},
+            )
+            entry["requests"] += 1
+            entry["bytes"] += record["bytes"] or 0
+            entry["seconds"] = round(entry["seconds"] + record["seconds"], 4)
+            entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+            if record.get("error"):
+                entry["errors"] += 1
+            else:
+                status = str(record["status"])
+                entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+        return totals
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = list(self.stages)
+            requests = list(self.requests)
+            caches = {name: dict(counts) for name, counts in self.caches.items()}
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "duration_seconds": round(time.perf_counter() - self._started, 4),
+            "stage_totals": self.stage_totals(),
+            "hosts": self.host_totals(),
+            "caches": caches,
+            "stages": stages,
+            "requests": requests,
+        }
+
+    def write(self, path: str, extra: Optional[dict] = None) -> None:
+        report = self.to_dict()
+        if extra:
+            report.update(extra)
+        target = Path(path)
+        if target.parent != Path("."):
+            target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info(f"Run report written to {target}")
+
+    def log_summary(self) -> None:
+        totals = self.stage_totals()
+        if totals:
+            parts = [f"{name} {entry['seconds']:.2f}s" for name, entry in totals.items()]
+            logger.info(f"Stage timings: {', '.join(parts)}")
+        for cache, counts in sorted(self.caches.items()):
+            logger.info(f"Cache {cache}: {counts['hits']} hits, {counts['misses']} misses")
+
+
+_report = RunReport()
+
+
+def get_report() -> RunReport:
+    return _report
+
+
+def reset_report() -> RunReport:
+    """Start a fresh report (tests, or several runs in one process)."""
+    global _report
+    _report = RunReport()
+    return _report
+
+
+def stage(name: str, cinema: Optional[str] = None):
+    return _report.stage(name, cinema)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    _report.record_cache(cache, hit)
+
+
+def record_request(
+    method: str,
+    url: str,
+    response,
+    error: Optional[BaseException],
+    seconds: float,
+    attempt: int,
+    stream: bool = False,
+) -> None:
+    """http_client request hook: one call per attempt."""
+    status = nbytes = None
+    if response is not None:
+        status = response.status_code
+        # Reading a streamed body here would defeat streaming; its bytes
+        # are counted when the caller closes the response.
+        if not stream:
+            nbytes = len(response.content)
+    record = _report.record_request(
+        method, url, status, nbytes, seconds, attempt,
+        error=f"{type(error).__name__}: {error}" if error is not None else None,
+    )
+    if stream and response is not None:
+        _count_streamed_bytes(response, record)
+
+
+def _count_streamed_bytes(response, record: dict) -> None:
+    """Set record["bytes"] to what was actually read off the wire once `response` is closed."""
+    raw = getattr(response, "raw", None)
+    close = getattr(response, "close", None)
+    if raw is None or close is None or not hasattr(raw, "tell"):
+        return
+
+    def counting_close():
+        try:
+            record["bytes"] = raw.tell()
+        except Exception:
+            pass
+        close()
+
+    response.close = counting_close
+
+
+def install() -> None:
+    """Record every request made through src.http_client."""
+    from src import http_client
+    http_client.add_request_hook(record_request)
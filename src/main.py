@@ -1,6 +1,9 @@
 import argparse
+import atexit
 import logging
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -9,43 +12,346 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# How many cinemas are processed at the same time (settings: cinema_workers).
+DEFAULT_CINEMA_WORKERS = 4
+# Later cinema weeks evaluated in lookahead mode (settings: lookahead_max_weeks).
+DEFAULT_LOOKAHEAD_MAX_WEEKS = 2
+
+
+class CinemaLogger(logging.LoggerAdapter):
+    """Prefixes log lines with the cinema id; cinemas run in parallel."""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['cinema']}] {msg}", kwargs
+
+
 def main():
+    from src.checkpoints import STAGES
     parser = argparse.ArgumentParser(description="CineStar Konstanz OV Tracker")
     parser.add_argument("--dry-run", action="store_true", help="Print message instead of sending")
     parser.add_argument("--send", action="store_true", help="Send telegram message")
     parser.add_argument("--dump-missing", action="store_true", help="Print missing TMDb matches")
-    parser.add_argument("--force", action="store_true", help="Force send even if week/hash matches (requires --send)")
+    parser.add_argument("--force", action="store_true", help="Force send even if week/hash matches or enrichment is incomplete (requires --send)")
+    parser.add_argument("--stream", action="store_true", help="Parse the schedule page while it downloads (also: stream_parse in settings)")
+    parser.add_argument("--cinema", action="append", metavar="ID", help="Only run this cinema id from settings (repeatable)")
+    parser.add_argument("--lookahead", action="store_true", help="Also send later cinema weeks the page already covers completely (also: lookahead in settings)")
+    parser.add_argument("--from-stage", choices=STAGES, help="Redo this stage and the ones after it; earlier stages come from the last run's checkpoints (no fetch unless 'fetch')")
+    parser.add_argument("--report", metavar="PATH", help="Write stage timings, requests and cache stats as JSON")
+    parser.add_argument("--settings", metavar="PATH", help="Settings file (default: config/settings.yaml, or $CINESTAR_SETTINGS)")
     
     args = parser.parse_args()
+    if args.settings:
+        # Through the environment so every module's load_settings() sees it.
+        os.environ["CINESTAR_SETTINGS"] = args.settings
 
     logger.info("Starting CineStar Tracker...")
-    
-    # --- PIPELINE START ---
-    
-    # 1. Fetch
-    from src.fetch_kinoprogramm import fetch_schedule_html, load_settings
-    html = fetch_schedule_html()
-    if not html:
-        logger.error("Failed to fetch HTML.")
-        sys.exit(1)
-        
-    # 2. Parse
-    from src.parse_schedule import parse_schedule
+
+    from src import http_client, instrumentation
+    from src.state import get_session
+    instrumentation.install()
+    atexit.register(http_client.log_connection_stats)
+    atexit.register(_finish_report, args.report)
+    # Caches filled during enrichment are written once, when the process
+    # exits (including the early "nothing to send" returns below).
+    get_session()
+
+    from src.cinemas import load_cinemas
+    from src.enrich import TmdbLookups
+    from src.fetch_kinoprogramm import load_settings
     settings = load_settings()
+    cinemas = load_cinemas(settings)
+    if args.cinema:
+        unknown = set(args.cinema) - {c.id for c in cinemas}
+        if unknown:
+            logger.error(f"Unknown cinema id(s): {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        cinemas = [c for c in cinemas if c.id in args.cinema]
+
+    # One TMDb memo for the whole run: a film playing in several cinemas is
+    # looked up once. Each cinema's fetch/parse/enrich runs on its own thread.
+    tmdb_lookups = TmdbLookups()
+    if len(cinemas) == 1:
+        results = [_run_cinema_safely(cinemas[0], args, settings, tmdb_lookups)]
+    else:
+        workers = max(1, min(len(cinemas), settings.get("cinema_workers", DEFAULT_CINEMA_WORKERS)))
+        logger.info(f"Running {len(cinemas)} cinemas with {workers} workers.")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cinema") as pool:
+            results = list(pool.map(
+                lambda cinema: _run_cinema_safely(cinema, args, settings, tmdb_lookups),
+                cinemas,
+            ))
+
+    if not all(results):
+        failed = [c.id for c, ok in zip(cinemas, results) if not ok]
+        logger.error(f"Failed cinemas: {', '.join(failed)}")
+        sys.exit(1)
+
+
+def _finish_report(path) -> None:
+    # Runs at exit, so early returns and background TMDb refreshes (joined
+    # before atexit handlers) are included.
+    from src import http_client, instrumentation
+    report = instrumentation.get_report()
+    report.log_summary()
+    if path:
+        report.write(path, extra={
+            "argv": sys.argv[1:],
+            "connections": http_client.connection_stats(),
+            "rate_limits": http_client.rate_limit_stats(),
+        })
+
+
+def _run_cinema_safely(cinema, args, settings: dict, tmdb_lookups) -> bool:
+    try:
+        return run_cinema(cinema, args, settings, tmdb_lookups)
+    except Exception:
+        logger.exception(f"[{cinema.id}] Pipeline failed.")
+        return False
+
+
+def run_cinema(cinema, args, settings: dict, tmdb_lookups) -> bool:
+    """Fetch, filter, enrich and send one cinema. False means the run failed."""
+    log = CinemaLogger(logger, {"cinema": cinema.id})
     
-    sessions = parse_schedule(html, settings.get("timezone", "Europe/Berlin"))
-    logger.info(f"Found {len(sessions)} total sessions.")
+    # --- PIPELINE START ---
     
-    # 3. Filter Week Window
-    from src.week_interval import compute_week_window, filter_by_week
+    from src.checkpoints import (
+        DEFAULT_MAX_AGE_HOURS,
+        CheckpointMissing,
+        CinemaCheckpoints,
+        config_fingerprint,
+        decode_sessions,
+        encode_sessions,
+    )
+    from src.instrumentation import record_cache, stage
+    from src.ov_filter import filter_ov_sessions
+    from src.week_interval import SessionIndex, compute_week_window, filter_by_week
     from datetime import datetime, timedelta
+    timezone_str = cinema.timezone
+    ov_markers = cinema.ov_markers
+
+    # The week window only depends on the clock, so it is known before the
+    # page arrives and streaming mode can filter sessions as they are parsed.
     now = datetime.now()
     week_start, week_end = compute_week_window(now)
     week_start_str = week_start.strftime("%Y-%m-%d")
-    logger.info(f"Week Window: {week_start.date()} to {week_end.date()}")
-    
-    sessions_in_window = filter_by_week(sessions, week_start, week_end)
-    logger.info(f"Found {len(sessions_in_window)} sessions in window.")
+    log.info(f"Week Window: {week_start.date()} to {week_end.date()}")
+
+    # Schedule page validators from the last fetch. When this week was
+    # already sent, a send run would skip anyway unless the page changed,
+    # so ask kinoprogramm whether it did and stop right here if not.
+    from src.state import (
+        cinema_state,
+        cinema_state_dirty_keys,
+        get_session,
+        was_week_already_sent,
+    )
+    lookahead = bool(args.lookahead or settings.get("lookahead", False))
+    # With lookahead, an unchanged page may still hold a next week that was
+    # incomplete last time; only skip once that one went out too.
+    skip_weeks = [week_start]
+    if lookahead:
+        skip_weeks.append(week_start + timedelta(days=7))
+    session = get_session()
+    with session.lock:
+        history = cinema_state(session.data, cinema.state_key)
+        previous_validators = history.get("schedule_validators")
+        week_already_sent = all(
+            was_week_already_sent(history, ws.strftime("%Y-%m-%d"), None) for ws in skip_weeks
+        )
+    # Every stage is checkpointed per schedule page. --from-stage (other
+    # than fetch) resumes the last page's checkpoints without fetching.
+    checkpoints = CinemaCheckpoints(
+        cinema.id,
+        from_stage=args.from_stage,
+        max_age_hours=settings.get("checkpoint_max_age_hours", DEFAULT_MAX_AGE_HOURS),
+        fingerprint=config_fingerprint(settings, cinema),
+    )
+    resume = args.from_stage not in (None, "fetch")
+    revalidate = bool(
+        args.send and not args.force and not resume and week_already_sent and previous_validators
+    )
+
+    def store_validators(validators: dict) -> None:
+        with session.lock:
+            history = cinema_state(session.data, cinema.state_key)
+            if history.get("schedule_validators") == validators:
+                return  # keep state.json (committed by CI) untouched
+            history["schedule_validators"] = validators
+            session.mark_dirty(*cinema_state_dirty_keys(cinema.state_key, ("schedule_validators",)))
+
+    ov_sessions = None
+    html = None
+    if resume:
+        try:
+            page, html = checkpoints.latest()
+        except CheckpointMissing as e:
+            log.error(f"Cannot resume from stage {args.from_stage}: {e}.")
+            return False
+        log.info(f"Resuming from stage {args.from_stage} with schedule page {page.html_sha256[:12]}.")
+    elif (args.stream or settings.get("stream_parse", False)) and not revalidate:
+        # 1+2+3. Fetch, parse and window-filter incrementally
+        from src.fetch_kinoprogramm import open_schedule_stream
+        from src.parse_schedule import iter_sessions
+        with stage("fetch_parse_stream", cinema.id):
+            chunks = open_schedule_stream(cinema.kinoprogramm_url, on_validators=store_validators)
+            if chunks is None:
+                log.error("Failed to fetch HTML.")
+                return False
+
+            sessions, sessions_in_window, ov_sessions = [], [], []
+            # The page goes to its fetch checkpoint chunk by chunk.
+            fetch_checkpoint = checkpoints.begin_stream(cinema.kinoprogramm_url)
+            try:
+                for s in iter_sessions(_tee(chunks, fetch_checkpoint), timezone_str):
+                    sessions.append(s)
+                    if filter_by_week([s], week_start, week_end):
+                        sessions_in_window.append(s)
+                        ov_sessions.extend(filter_ov_sessions([s], ov_markers))
+            except BaseException:
+                fetch_checkpoint.abort()
+                raise
+        log.info(f"Found {len(sessions)} total sessions.")
+        index = SessionIndex(sessions)
+        # Parse, window and filter already ran; checkpoint them for reruns.
+        page = fetch_checkpoint.finish()
+        page.set_sessions(sessions)
+        page.record("parse", encode_sessions(sessions))
+        page.record("window", page.positions(sessions_in_window), week=week_start_str)
+        page.record("filter", page.positions(ov_sessions), week=week_start_str)
+    else:
+        # 1. Fetch (conditionally when revalidating; buffered, since the
+        # page is most likely unchanged and never parsed)
+        from src.fetch_kinoprogramm import fetch_schedule
+        with stage("fetch", cinema.id):
+            fetched = fetch_schedule(
+                cinema.kinoprogramm_url,
+                previous=previous_validators if revalidate else None,
+            )
+        if fetched is None:
+            log.error("Failed to fetch HTML.")
+            return False
+        store_validators(fetched.validators)
+        if revalidate:
+            record_cache("schedule_page", bool(fetched.unchanged_reason))
+        if fetched.unchanged_reason:
+            log.info(
+                f"Schedule page unchanged ({fetched.unchanged_reason}) and week{'s' if len(skip_weeks) > 1 else ''} "
+                f"{', '.join(ws.strftime('%Y-%m-%d') for ws in skip_weeks)} already sent. "
+                f"Skipping parse and enrichment."
+            )
+            return True
+        html = fetched.html
+        if not html:
+            log.error("Failed to fetch HTML.")
+            return False
+        page = checkpoints.begin(html, cinema.kinoprogramm_url)
+
+    def window(w_start, w_end) -> list:
+        return page.stage(
+            "window", lambda: filter_by_week(index, w_start, w_end),
+            page.positions, page.pick, week=w_start.strftime("%Y-%m-%d"),
+        )
+
+    if ov_sessions is None:
+        # 2. Parse
+        from src.parse_schedule import parse_schedule
+        with stage("parse", cinema.id):
+            sessions = page.stage(
+                "parse", lambda: parse_schedule(html, timezone_str),
+                encode_sessions, lambda payload: decode_sessions(payload, timezone_str),
+            )
+        page.set_sessions(sessions)
+        log.info(f"Found {len(sessions)} total sessions.")
+
+        # 3. Filter Week Window (over a time-sorted index, which also
+        # answers the completeness and lookahead queries below)
+        with stage("filter_week", cinema.id):
+            index = SessionIndex(sessions)
+            sessions_in_window = window(week_start, week_end)
+
+    # 3a. Weeks to evaluate: the current one, plus (lookahead) every later
+    # cinema week the page has sessions for.
+    weeks = [(week_start, week_end, sessions_in_window, ov_sessions)]
+    if lookahead:
+        max_weeks = settings.get("lookahead_max_weeks", DEFAULT_LOOKAHEAD_MAX_WEEKS)
+        for offset in range(1, max_weeks + 1):
+            next_start, next_end = compute_week_window(now + timedelta(days=7 * offset))
+            if not index.count_between(next_start, next_end):
+                break
+            weeks.append((next_start, next_end, None, None))
+        log.info(f"Lookahead: page covers {len(weeks)} cinema week(s).")
+
+    ok = True
+    for position, (w_start, w_end, w_sessions, w_ov_sessions) in enumerate(weeks):
+        if w_sessions is None:
+            w_sessions = window(w_start, w_end)
+        ok = _run_week(
+            cinema, args, settings, tmdb_lookups, log, index, page,
+            w_start, w_end, w_sessions, w_ov_sessions,
+            current=position == 0,
+        ) and ok
+    return ok
+
+
+def _tee(chunks, fetch_checkpoint):
+    """Pass streamed chunks through, writing each to the fetch checkpoint."""
+    for chunk in chunks:
+        fetch_checkpoint.write(chunk)
+        yield chunk
+
+
+def _encode_enrichment(page, result) -> dict:
+    items, missing_titles = result
+    return {
+        "items": [
+            {
+                **{k: v for k, v in item.items() if k not in ("session", "sessions")},
+                "session": page.positions([item["session"]])[0],
+                "sessions": page.positions(item["sessions"]),
+            }
+            for item in items
+        ],
+        "missing": missing_titles,
+    }
+
+
+def _decode_enrichment(page, payload: dict):
+    items = [
+        {**item, "session": page.sessions[item["session"]], "sessions": page.pick(item["sessions"])}
+        for item in payload["items"]
+    ]
+    return items, payload["missing"]
+
+
+def _run_week(
+    cinema,
+    args,
+    settings: dict,
+    tmdb_lookups,
+    log,
+    index,
+    page,
+    week_start,
+    week_end,
+    sessions_in_window: list,
+    ov_sessions,
+    current: bool = True,
+) -> bool:
+    """
+    Completeness gate, OV filter, enrichment, message and send for one
+    cinema week. Filter, enrich and format go through `page`'s checkpoints.
+    """
+    from datetime import timedelta
+    from src.instrumentation import stage
+    from src.ov_filter import filter_ov_sessions
+    from src.state import cinema_state, cinema_state_dirty_keys, get_session, was_week_already_sent
+    session = get_session()
+    ov_markers = cinema.ov_markers
+    week_start_str = week_start.strftime("%Y-%m-%d")
+    if not current:
+        log.info(f"Week Window: {week_start.date()} to {week_end.date()}")
+    log.info(f"Found {len(sessions_in_window)} sessions in window.")
 
     # 3b. Completeness Gate
     from src.week_completeness import is_week_complete
@@ -56,148 +362,165 @@ def main():
     # However, if sessions_in_window is empty (early Monday), max() fails. 
     # Let's use `sessions` (all parsed) to determine horizon, but compare against week_end.
     
-    is_complete = is_week_complete(sessions, week_start, week_end)
+    is_complete = is_week_complete(index, week_start, week_end)
     
-    max_dt = max(s.dt_local for s in sessions) if sessions else "None"
+    max_dt = index.max_dt
     required_wed = week_end - timedelta(days=1)
     
-    logger.info(f"Completeness check: max_dt={max_dt}, required>={required_wed}. Complete={is_complete}")
+    log.info(f"Completeness check: max_dt={max_dt}, required>={required_wed}. Complete={is_complete}")
     
-    if not is_complete and not args.dry_run:
-        logger.info("Week schedule incomplete (horizon too short). Skipping.")
-        return
+    if not is_complete and not (args.dry_run and current):
+        log.info(f"Week {week_start_str} schedule incomplete (horizon too short). Skipping.")
+        return True
+
+    # Nothing below changes the outcome for a week that already went out
+    # (only --force resends), so don't enrich it again.
+    if args.send and not args.force and not args.dry_run:
+        with session.lock:
+            already_sent = was_week_already_sent(cinema_state(session.data, cinema.state_key), week_start_str, None)
+        if already_sent:
+            log.info(f"Week {week_start_str} already sent. Skipping.")
+            return True
 
     # 4. Filter OV
-    from src.ov_filter import filter_ov_sessions
-    ov_sessions = filter_ov_sessions(sessions_in_window, settings.get("ov_markers", []))
-    logger.info(f"Found {len(ov_sessions)} OV sessions in window.")
+    if ov_sessions is None:
+        with stage("filter_ov", cinema.id):
+            ov_sessions = page.stage(
+                "filter", lambda: filter_ov_sessions(sessions_in_window, ov_markers),
+                page.positions, page.pick, week=week_start_str,
+            )
+    log.info(f"Found {len(ov_sessions)} OV sessions in window.")
     
     # If NO OV sessions, we abort (do NOT update state used for weekly tracking)
     # UNLESS specifically debugging? No, rule is "Don't confirm empty week".
     if not ov_sessions and not args.dry_run:
-        logger.info("No OV sessions found. Skipping update/send.")
-        return
+        log.info("No OV sessions found. Skipping update/send.")
+        return True
 
     # 5. Prepare Data (TMDb, CineStar Link, Selection)
-    from src.tmdb_match import (
-        get_tmdb_original_title,
-        get_tmdb_release_year,
-        normalize_title,
-        resolve_tmdb_id,
+    from src.tmdb_match import normalize_title
+    from src.enrich import (
+        DEFAULT_DEADLINE_SECONDS,
+        DEFAULT_MAX_WORKERS,
+        INCOMPLETE_REASONS,
+        enrich_films,
     )
-    from src.cinestar_link import resolve_cinestar_url
-    
-    grouped = {}
-    missing_titles = {}
     
-    # Group
-    for s in ov_sessions:
-        norm = normalize_title(s.title)
-        if norm not in grouped:
-            grouped[norm] = []
-        grouped[norm].append(s)
-        
-    final_items = []
-    
-    for norm_title, sessions_list in grouped.items():
-        sessions_list.sort(key=lambda x: x.dt_local)
-        earliest_session = sessions_list[0]
-        
-        # TMDb
-        tmdb_id, reason = resolve_tmdb_id(norm_title)
-        tmdb_original_title = get_tmdb_original_title(tmdb_id) if tmdb_id else None
-        tmdb_year = get_tmdb_release_year(tmdb_id) if tmdb_id else None
-        if not tmdb_id:
-             missing_titles[norm_title] = reason
-
-        # Link — pass the TMDb year so we reject CineStar pages whose
-        # Produktionsjahr doesn't match (zombie detail pages for unrelated
-        # older films with the same title slug).
-        c_url = resolve_cinestar_url(
-            norm_title,
-            earliest_session.film_url,
-            tmdb_original_title,
-            expected_year=tmdb_year,
-        )
-        
-        final_items.append({
-            'title': norm_title,
-            'session': earliest_session,
-            'sessions': list(sessions_list),
-            'tmdb_id': tmdb_id,
-            'cinestar_url': c_url
-        })
-    
-    final_items.sort(key=lambda x: x['session'].dt_local)
+    def enrich():
+        grouped = {}
+
+        # Group
+        with stage("normalize", cinema.id):
+            for s in ov_sessions:
+                norm = normalize_title(s.title)
+                if norm not in grouped:
+                    grouped[norm] = []
+                grouped[norm].append(s)
+
+        with stage("enrich", cinema.id):
+            return enrich_films(
+                grouped,
+                max_workers=settings.get("enrich_workers", DEFAULT_MAX_WORKERS),
+                deadline_seconds=settings.get("enrich_deadline", DEFAULT_DEADLINE_SECONDS),
+                cinestar_base_url=cinema.cinestar_base_url,
+                tmdb_lookups=tmdb_lookups,
+            )
+
+    # Films cut off by the deadline or TMDb throttling are retried by the
+    # next run rather than resumed from the checkpoint.
+    final_items, missing_titles = page.stage(
+        "enrich", enrich,
+        lambda result: _encode_enrichment(page, result),
+        lambda payload: _decode_enrichment(page, payload),
+        week=week_start_str,
+        keep=lambda result: not INCOMPLETE_REASONS & set(result[1].values()),
+    )
     
     # Format Message
     from src.format_message_ru import format_message
-    msg_text = format_message(week_start, week_end, final_items)
+    with stage("format", cinema.id):
+        msg_text = page.stage(
+            "format",
+            lambda: format_message(week_start, week_end, final_items, cinema_name=cinema.name),
+            week=week_start_str,
+        )
     
     # --- PIPELINE END ---
 
     # Dry-run output
     if args.dry_run:
-        print("\n--- Final Message Preview ---")
-        print(msg_text)
-        print("-----------------------------\n")
+        # One print per cinema so parallel cinemas don't interleave lines.
+        preview = ["\n--- Final Message Preview ---", msg_text, "-----------------------------\n"]
         
         if args.dump_missing:
-            print("--- Missing Overrides Candidates (YAML) ---")
+            preview.append("--- Missing Overrides Candidates (YAML) ---")
             for t in sorted(missing_titles):
                 reason = missing_titles[t]
-                print(f'"{t}": # TODO_ID ({reason})')
-            print("-------------------------------------------\n")
+                preview.append(f'"{t}": # TODO_ID ({reason})')
+            preview.append("-------------------------------------------\n")
+        print("\n".join(preview))
 
     
     if args.send:
-        logger.info("Send mode active.")
+        log.info("Send mode active.")
         
         # Load state and compare against both the latest send marker and per-week hash history.
-        from src.state import (
-            STATE_PATH,
-            compute_content_hash,
-            load_state as load_app_state,
-            record_sent_week,
-            save_state as save_app_state,
-            was_week_already_sent,
-        )
-        import os
+        from src.state import compute_content_hash, record_sent_week
         
-        state = load_app_state()
+        with session.lock:
+            state = cinema_state(session.data, cinema.state_key)
         last_hash = state.get("last_hash")
         sent_hashes_by_week = state.get("sent_hashes_by_week")
         week_hash = sent_hashes_by_week.get(week_start_str) if isinstance(sent_hashes_by_week, dict) else None
         current_hash = compute_content_hash(final_items)
         
-        logger.info(f"STATE_PATH={STATE_PATH}")
-        logger.info(
+        log.info(f"STATE_PATH={session.backend.location()} ({session.backend.name})")
+        log.info(
             f"week_start_str={week_start_str} last_sent={state.get('last_sent_week_start')} "
             f"last_hash={last_hash} week_hash={week_hash} current_hash={current_hash}"
         )
 
+        # A film cut off by the deadline, an error or TMDb throttling would
+        # be posted without its TMDb link, and the week then counts as sent.
+        incomplete = sorted(t for t, reason in missing_titles.items() if reason in INCOMPLETE_REASONS)
+        if incomplete and not args.force:
+            # Not a failure: the week simply isn't ready, so the run stays green.
+            log.warning(
+                f"Enrichment incomplete for {len(incomplete)} film(s) ({', '.join(incomplete)}). "
+                f"Not sending week {week_start_str}; the next run retries (--force sends anyway)."
+            )
+            return True
+
         if was_week_already_sent(state, week_start_str, current_hash) and not args.force:
-            logger.info(f"Week {week_start_str} already sent or matched prior content hash. Skipping.")
-            return
+            log.info(f"Week {week_start_str} already sent or matched prior content hash. Skipping.")
+            return True
 
         # Prepare to send
         token = os.environ.get("TELEGRAM_BOT_TOKEN")
-        chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+        chat_id = cinema.resolve_chat_id()
         
         if not token or not chat_id:
-            logger.error("TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID missing.")
-            sys.exit(1)
+            log.error(f"TELEGRAM_BOT_TOKEN or chat id ({cinema.chat_id_env}) missing.")
+            return False
             
         from src.telegram_send import send_message
-        success = send_message(token, chat_id, msg_text)
+        with stage("send", cinema.id):
+            success = send_message(token, chat_id, msg_text)
         
         if success:
-            record_sent_week(state, week_start_str, current_hash)
-            save_app_state(state)
-            logger.info(f"State updated: Week {week_start_str} sent.")
+            with session.lock:
+                record_sent_week(state, week_start_str, current_hash)
+                session.mark_dirty(*cinema_state_dirty_keys(cinema.state_key))
+            session.flush()
+            # For the record only: state.json decides what was sent.
+            page.save("send", {"content_hash": current_hash}, week=week_start_str)
+            log.info(f"State updated: Week {week_start_str} sent.")
         else:
-            logger.error("Failed to send message. State NOT updated.")
-            sys.exit(1)
+            log.error("Failed to send message. State NOT updated.")
+            return False
+
+    return True
+
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,53 @@
+import re
+import threading
+from functools import lru_cache
+from typing import Optional
+
 from .parse_schedule import Session
 
+
+class OvMatcher:
+    """
+    Word-boundary matcher for a fixed set of OV markers.
+
+    All markers are compiled into one case-insensitive regex, so "OV" matches
+    "Michael (OV)" but not "Movie" or "Novum". Results are cached per
+    (title, tags): a film is checked once, however many showtimes it has.
+    """
+
+    def __init__(self, markers: tuple[str, ...]):
+        # Longest first, so "OmeU" is preferred over a shorter prefix marker.
+        alternatives = sorted({m for m in markers if m}, key=len, reverse=True)
+        self.regex: Optional[re.Pattern] = None
+        if alternatives:
+            pattern = "|".join(re.escape(m) for m in alternatives)
+            self.regex = re.compile(rf"(?<!\w)(?:{pattern})(?!\w)", re.IGNORECASE)
+        self._cache: dict[tuple[str, Optional[str]], bool] = {}
+        self._lock = threading.Lock()
+
+    def matches(self, title: str, tags: Optional[str] = None) -> bool:
+        key = (title, tags)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._search(title, tags)
+            with self._lock:
+                self._cache[key] = result
+        return result
+
+    def _search(self, title: str, tags: Optional[str]) -> bool:
+        if self.regex is None:
+            return False
+        if self.regex.search(title):
+            return True
+        # tags currently repeat the title; don't scan the same text twice.
+        return bool(tags) and tags != title and bool(self.regex.search(tags))
+
+
+@lru_cache(maxsize=16)
+def get_ov_matcher(markers: tuple[str, ...]) -> OvMatcher:
+    return OvMatcher(markers)
+
+
 def filter_ov_sessions(sessions: list[Session], markers: list[str]) -> list[Session]:
-    filtered = []
-    markers_lower = [m.lower() for m in markers]
-    
-    for s in sessions:
-        # Check title and tags (tags currently = title_raw)
-        # Search anywhere in the string
-        text_to_search = (s.title + " " + (s.tags or "")).lower()
-        
-        is_ov = any(m in text_to_search for m in markers_lower)
-        
-        if is_ov:
-            filtered.append(s)
-            
-    return filtered
+    matcher = get_ov_matcher(tuple(markers))
+    return [s for s in sessions if matcher.matches(s.title, s.tags)]
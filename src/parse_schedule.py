@@ -1,25 +1,197 @@
 import logging
 import re
+import sys
+import threading
+import time
+import weakref
+from html.parser import HTMLParser
 from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
 import bs4
 from bs4 import BeautifulSoup
 import pytz
 
+try:  # Optional C-based backend; html.parser is used when it is missing.
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
 logger = logging.getLogger(__name__)
 
+BACKEND_LXML = "lxml"
+BACKEND_HTML_PARSER = "html.parser"
+DATE_IN_HEADER_REGEX = re.compile(r'\d{2}\.\d{2}\.(\d{4})')
+TIME_REGEX = re.compile(r'\d{1,2}:\d{2}')
+# Cumulative parse timings per backend: {"runs", "seconds", "sessions"}.
+PARSE_STATS: dict[str, dict] = {}
+
+class Film:
+    """One distinct (title, film_url, tags) triple, shared by all its showtimes."""
+    __slots__ = ("title", "film_url", "tags", "__weakref__")
+
+    def __init__(self, title, film_url, tags):
+        self.title = title
+        self.film_url = film_url
+        self.tags = tags
+
+    def __repr__(self):
+        return f"<Film {self.title}>"
+
+
+# Film table: every Session of the same film points at one Film object.
+# Weak values, so films disappear with the last session that uses them.
+_FILMS: "weakref.WeakValueDictionary[tuple, Film]" = weakref.WeakValueDictionary()
+_FILMS_LOCK = threading.Lock()
+
+
+def _intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def intern_film(title_raw, film_url, tags_raw) -> Film:
+    key = (title_raw, film_url, tags_raw)
+    with _FILMS_LOCK:
+        film = _FILMS.get(key)
+        if film is None:
+            title = _intern_str(title_raw)
+            # tags currently repeat the title; keep a single string for both.
+            tags = title if tags_raw == title_raw else _intern_str(tags_raw)
+            film = Film(title, _intern_str(film_url), tags)
+            _FILMS[key] = film
+        return film
+
+
 class Session:
+    """
+    One showtime. Stored compactly: a shared Film, the start time as an
+    epoch int and its tzinfo. `title`, `film_url`, `tags` and `dt_local`
+    are rebuilt on access, so callers see the same attributes as before.
+    """
+    __slots__ = ("film", "epoch", "tzinfo")
+
     def __init__(self, title_raw, dt_local, film_url, tags_raw):
-        self.title = title_raw
-        self.dt_local = dt_local
-        self.film_url = film_url
-        self.tags = tags_raw
+        self.film = intern_film(title_raw, film_url, tags_raw)
+        # Showtimes are minute-precise, whole seconds are enough.
+        self.epoch = int(dt_local.timestamp())
+        self.tzinfo = dt_local.tzinfo
+
+    @property
+    def title(self):
+        return self.film.title
+
+    @property
+    def film_url(self):
+        return self.film.film_url
+
+    @property
+    def tags(self):
+        return self.film.tags
+
+    @property
+    def dt_local(self) -> datetime:
+        # pytz zones implement fromutc(), so this yields the same offset
+        # that tz.localize() produced when the session was created.
+        if self.tzinfo is None:
+            return datetime.fromtimestamp(self.epoch)
+        return datetime.fromtimestamp(self.epoch, self.tzinfo)
 
     def __repr__(self):
         return f"<Session {self.title} @ {self.dt_local}>"
 
-def parse_schedule(html_content: str, timezone_str: str = "Europe/Berlin") -> list[Session]:
-    soup = BeautifulSoup(html_content, 'html.parser')
+
+def available_backends() -> list[str]:
+    """Parser backends usable in this environment, fastest first."""
+    backends = [BACKEND_HTML_PARSER]
+    if lxml is not None:
+        backends.insert(0, BACKEND_LXML)
+    return backends
+
+
+def parse_schedule(
+    html_content: str,
+    timezone_str: str = "Europe/Berlin",
+    backend: Optional[str] = None,
+) -> list[Session]:
+    """
+    Parse the kinoprogramm cinema page into a flat list of sessions.
+
+    `backend` picks the HTML parser: "lxml" (C-based, used by default when
+    installed) or "html.parser" (BeautifulSoup, always available). Both
+    return identical sessions; the lxml path just walks the tree once with
+    precompiled XPath instead of repeated find_all() calls.
+    """
+    if backend is None:
+        backend = available_backends()[0]
+    if backend == BACKEND_LXML and lxml is None:
+        raise ValueError("lxml backend requested but lxml is not installed")
+    if backend not in (BACKEND_LXML, BACKEND_HTML_PARSER):
+        raise ValueError(f"Unknown parser backend: {backend}")
+
     tz = pytz.timezone(timezone_str)
+    started = time.perf_counter()
+    if backend == BACKEND_LXML:
+        try:
+            sessions = _parse_schedule_lxml(html_content, tz)
+        except (ValueError, etree.ParserError) as e:
+            # e.g. an empty body or a str with an XML encoding declaration
+            logger.warning(f"lxml could not parse the page ({e}); falling back to html.parser")
+            backend = BACKEND_HTML_PARSER
+            sessions = _parse_schedule_html_parser(html_content, tz)
+    else:
+        sessions = _parse_schedule_html_parser(html_content, tz)
+    elapsed = time.perf_counter() - started
+
+    stats = PARSE_STATS.setdefault(backend, {"runs": 0, "seconds": 0.0, "sessions": 0})
+    stats["runs"] += 1
+    stats["seconds"] += elapsed
+    stats["sessions"] += len(sessions)
+    logger.info(f"Parsed {len(sessions)} sessions with {backend} in {elapsed * 1000:.1f} ms")
+    return sessions
+
+
+def _append_sessions(sessions: list, tz, year: int, title_raw: str, film_url, day_str: str, time_strs) -> None:
+    """Turn one schedule day ("19.01." plus its times) into sessions."""
+    for time_str in time_strs:
+        if not TIME_REGEX.match(time_str):
+            continue
+        
+        # Parse datetime
+        try:
+            # day_str "19.01."
+            day, month = map(int, day_str.strip('.').split('.'))
+            
+            # Handle year rollover if needed (if we didn't find year in header)
+            # But we trust the header year mostly. 
+            # If parsing near December/January, be careful? 
+            # MVP: Trust header year.
+            
+            dt_naive = datetime(year, month, day, 
+                              int(time_str.split(':')[0]), 
+                              int(time_str.split(':')[1]))
+            dt_local = tz.localize(dt_naive)
+            
+            sessions.append(Session(
+                title_raw=title_raw,
+                dt_local=dt_local,
+                film_url=film_url,
+                tags_raw=title_raw # Using title as tags source for now
+            ))
+        except ValueError:
+            logger.warning(f"Failed to parse date/time: {day_str} {time_str}")
+
+
+def _absolute_film_url(href):
+    if not href:
+        return None
+    # Ensure absolute URL
+    if href.startswith('/'):
+        return f"https://www.kinoprogramm.com{href}"
+    return href
+
+
+def _parse_schedule_html_parser(html_content: str, tz) -> list[Session]:
+    soup = BeautifulSoup(html_content, 'html.parser')
     sessions = []
 
     # Find the current year from the header if possible, else default to now
@@ -28,7 +200,7 @@ def parse_schedule(html_content: str, timezone_str: str = "Europe/Berlin") -> li
     header_date = soup.find('div', class_='today')
     if header_date:
         date_text = header_date.get_text()
-        match = re.search(r'\d{2}\.\d{2}\.(\d{4})', date_text)
+        match = DATE_IN_HEADER_REGEX.search(date_text)
         if match:
             year = int(match.group(1))
 
@@ -50,13 +222,7 @@ def parse_schedule(html_content: str, timezone_str: str = "Europe/Berlin") -> li
         
         if link_tag:
             title_raw = link_tag.get_text(strip=True)
-            href = link_tag.get('href')
-            if href:
-                # Ensure absolute URL
-                if href.startswith('/'):
-                    film_url = f"https://www.kinoprogramm.com{href}"
-                else:
-                    film_url = href
+            film_url = _absolute_film_url(link_tag.get('href'))
 
         # Find schedule container for this movie
         # It seems the schedule is in a subsequent row or inside?
@@ -88,33 +254,237 @@ def parse_schedule(html_content: str, timezone_str: str = "Europe/Berlin") -> li
             # Filter ps that are NOT bold
             time_ps = [p for p in item.find_all('p') if 'fw-bold' not in p.get('class', [])]
             
-            for tp in time_ps:
-                time_str = tp.get_text(strip=True)
-                if not re.match(r'\d{1,2}:\d{2}', time_str):
-                    continue
-                
-                # Parse datetime
-                try:
-                    # day_str "19.01."
-                    day, month = map(int, day_str.strip('.').split('.'))
-                    
-                    # Handle year rollover if needed (if we didn't find year in header)
-                    # But we trust the header year mostly. 
-                    # If parsing near December/January, be careful? 
-                    # MVP: Trust header year.
-                    
-                    dt_naive = datetime(year, month, day, 
-                                      int(time_str.split(':')[0]), 
-                                      int(time_str.split(':')[1]))
-                    dt_local = tz.localize(dt_naive)
-                    
-                    sessions.append(Session(
-                        title_raw=title_raw,
-                        dt_local=dt_local,
-                        film_url=film_url,
-                        tags_raw=title_raw # Using title as tags source for now
-                    ))
-                except ValueError:
-                    logger.warning(f"Failed to parse date/time: {day_str} {time_str}")
+            _append_sessions(
+                sessions, tz, year, title_raw, film_url, day_str,
+                (tp.get_text(strip=True) for tp in time_ps),
+            )
 
     return sessions
+
+
+def _has_class_xpath(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if lxml is not None:
+    _XP_TODAY = etree.XPath(f"(//div[{_has_class_xpath('today')}])[1]")
+    _XP_ROWS = etree.XPath(f"//div[{_has_class_xpath('row')}]")
+    _XP_TITLE_DIV = etree.XPath(f"(.//div[{_has_class_xpath('city_filmtitel')}])[1]")
+    _XP_TITLE_LINK = etree.XPath("(.//a[starts-with(@title, 'Kinofilm')])[1]")
+    _XP_NEXT_ROW = etree.XPath(f"following-sibling::div[{_has_class_xpath('row')}][1]")
+    _XP_TIMES = etree.XPath(f"(.//div[{_has_class_xpath('owl-movie-times')}])[1]")
+    _XP_ITEMS = etree.XPath(f".//div[{_has_class_xpath('item')}]")
+    _XP_PARAGRAPHS = etree.XPath(".//p")
+
+
+def _text_stripped(element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    return "".join(t.strip() for t in element.itertext() if t.strip())
+
+
+def _parse_schedule_lxml(html_content: str, tz) -> list[Session]:
+    root = lxml.html.document_fromstring(html_content)
+    sessions = []
+
+    year = datetime.now().year
+    header_date = _XP_TODAY(root)
+    if header_date:
+        match = DATE_IN_HEADER_REGEX.search(header_date[0].text_content())
+        if match:
+            year = int(match.group(1))
+
+    for row in _XP_ROWS(root):
+        title_div = _XP_TITLE_DIV(row)
+        if not title_div:
+            continue
+
+        title_raw = "Unknown"
+        film_url = None
+        link_tag = _XP_TITLE_LINK(title_div[0])
+        if link_tag:
+            title_raw = _text_stripped(link_tag[0])
+            film_url = _absolute_film_url(link_tag[0].get('href'))
+
+        schedule_row = _XP_NEXT_ROW(row)
+        if not schedule_row:
+            continue
+        times_container = _XP_TIMES(schedule_row[0])
+        if not times_container:
+            continue
+
+        for item in _XP_ITEMS(times_container[0]):
+            # One pass over the day's <p>s: bold ones are weekday/date,
+            # the rest are showtimes.
+            bold, plain = [], []
+            for p in _XP_PARAGRAPHS(item):
+                (bold if 'fw-bold' in (p.get('class') or '').split() else plain).append(p)
+            if len(bold) < 2:
+                continue
+            _append_sessions(
+                sessions, tz, year, title_raw, film_url, _text_stripped(bold[1]),
+                (_text_stripped(p) for p in plain),
+            )
+
+    return sessions
+
+
+class _StreamingScheduleParser(HTMLParser):
+    """
+    Incremental counterpart of parse_schedule() for use with feed().
+
+    Tracks just enough of the open-element stack to follow the page layout:
+    the `div.today` header (year), each `div.city_filmtitel` (title and
+    link) and the `div.owl-movie-times` block that follows it. Sessions of
+    a film become available as soon as its times block is closed.
+    """
+
+    def __init__(self, tz):
+        super().__init__(convert_charrefs=True)
+        self.tz = tz
+        self.year = datetime.now().year
+        self.ready: list[Session] = []
+
+        self._divs: list[str] = []  # role of each open <div>, "" if none
+        self._text_node: list[str] = []
+        self._seen_today = False
+        self._today_text: Optional[list[str]] = None
+
+        self._film: Optional[tuple[str, Optional[str]]] = None
+        self._link_text: Optional[list[str]] = None
+        self._link_href = None
+        self._link_seen = False
+        self._in_title = False
+        self._in_times = False
+        self._film_sessions: list[Session] = []
+
+        self._item: Optional[tuple[list[str], list[str]]] = None
+        self._p: Optional[tuple[bool, list[str]]] = None
+
+    # -- text handling: mirror get_text(strip=True) per text node ---------
+
+    def _flush_text_node(self) -> None:
+        if not self._text_node:
+            return
+        node = "".join(self._text_node)
+        self._text_node = []
+        if self._today_text is not None:
+            self._today_text.append(node)
+        stripped = node.strip()
+        if not stripped:
+            return
+        if self._link_text is not None:
+            self._link_text.append(stripped)
+        if self._p is not None:
+            self._p[1].append(stripped)
+
+    def handle_data(self, data):
+        self._text_node.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text_node()
+
+    # -- structure --------------------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text_node()
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+
+        if tag == "div":
+            role = ""
+            if "today" in classes and not self._seen_today:
+                role = "today"
+                self._seen_today = True
+                self._today_text = []
+            elif "city_filmtitel" in classes and not self._in_title:
+                role = "title"
+                self._in_title = True
+                self._film = ("Unknown", None)
+                self._link_text = None
+                self._link_seen = False
+            elif "owl-movie-times" in classes and self._film and not self._in_times:
+                role = "times"
+                self._in_times = True
+            elif "item" in classes and self._in_times and self._item is None:
+                role = "item"
+                self._item = ([], [])
+            self._divs.append(role)
+        elif tag == "a" and self._in_title and not self._link_seen:
+            if (attrs.get("title") or "").startswith("Kinofilm"):
+                self._link_seen = True
+                self._link_text = []
+                self._link_href = attrs.get("href")
+        elif tag == "p" and self._item is not None:
+            self._close_p()
+            self._p = ("fw-bold" in classes, [])
+
+    def handle_endtag(self, tag):
+        self._flush_text_node()
+        if tag == "a" and self._link_text is not None:
+            self._film = ("".join(self._link_text), _absolute_film_url(self._link_href))
+            self._link_text = None
+        elif tag == "p":
+            self._close_p()
+        elif tag == "div" and self._divs:
+            role = self._divs.pop()
+            if role == "today":
+                match = DATE_IN_HEADER_REGEX.search("".join(self._today_text))
+                if match:
+                    self.year = int(match.group(1))
+                self._today_text = None
+            elif role == "title":
+                self._in_title = False
+                if self._link_text is not None:
+                    self._film = ("".join(self._link_text), _absolute_film_url(self._link_href))
+                    self._link_text = None
+            elif role == "item":
+                self._close_item()
+            elif role == "times":
+                self._in_times = False
+                self._film = None
+                self.ready.extend(self._film_sessions)
+                self._film_sessions = []
+
+    def _close_p(self) -> None:
+        if self._p is None:
+            return
+        is_bold, pieces = self._p
+        self._p = None
+        if self._item is not None:
+            self._item[0 if is_bold else 1].append("".join(pieces))
+
+    def _close_item(self) -> None:
+        self._close_p()
+        bold, plain = self._item
+        self._item = None
+        if len(bold) < 2:
+            return
+        title_raw, film_url = self._film
+        _append_sessions(self._film_sessions, self.tz, self.year, title_raw, film_url, bold[1], plain)
+
+    def pop_ready(self) -> list[Session]:
+        ready, self.ready = self.ready, []
+        return ready
+
+
+def iter_sessions(chunks: Iterable[str], timezone_str: str = "Europe/Berlin") -> Iterator[Session]:
+    """
+    Parse the schedule page incrementally from an iterable of text chunks.
+
+    Sessions are yielded film by film while the page is still downloading,
+    so the full HTML never has to be held in memory. Produces the same
+    sessions as parse_schedule() for the kinoprogramm layout.
+    """
+    parser = _StreamingScheduleParser(pytz.timezone(timezone_str))
+    started = time.perf_counter()
+    count = 0
+    for chunk in chunks:
+        parser.feed(chunk)
+        for session in parser.pop_ready():
+            count += 1
+            yield session
+    parser.close()
+    for session in parser.pop_ready():
+        count += 1
+        yield session
+    logger.info(f"Stream-parsed {count} sessions in {(time.perf_counter() - started) * 1000:.1f} ms")
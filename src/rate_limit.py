@@ -0,0 +1,97 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional
+
+# Lower runs first. TMDb searches block a film's enrichment, /movie/{id}
+# details are needed afterwards (or only refresh a stale cache entry).
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class TokenBucket:
+    """
+    Token-bucket scheduler for one upstream API.
+
+    `rate` tokens per second refill a bucket holding at most `burst`; every
+    request takes one. Waiting callers are served strictly by priority, then
+    in arrival order. throttle() (a 429 with Retry-After) empties the bucket
+    and pauses everyone until the server's deadline.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, name: str = ""):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.name = name
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._requests = 0
+        self._throttles = 0
+        self._max_queue_depth = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _delay(self, now: float) -> float:
+        """Seconds until the head of the queue may go (0 = now)."""
+        delay = max(0.0, self._paused_until - now)
+        if self._tokens < 1:
+            # rate 0 means no limit apart from throttle().
+            delay = max(delay, (1 - self._tokens) / self.rate if self.rate > 0 else 0.0)
+        return delay
+
+    def acquire(self, priority: int = PRIORITY_NORMAL) -> float:
+        """Block until this caller may send a request. Returns the seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._waiting))
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiting[0] == ticket:
+                    delay = self._delay(now)
+                    if delay <= 0:
+                        heapq.heappop(self._waiting)
+                        self._tokens = max(0.0, self._tokens - 1) if self.rate > 0 else self._tokens
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            self._requests += 1
+            waited = time.monotonic() - started
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            # The next caller in line re-checks its own delay.
+            self._cond.notify_all()
+        return waited
+
+    def throttle(self, seconds: float) -> None:
+        """The server rate-limited us: send nothing for `seconds`."""
+        with self._cond:
+            self._throttles += 1
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "requests": self._requests,
+                "throttles": self._throttles,
+                "queue_depth": len(self._waiting),
+                "max_queue_depth": self._max_queue_depth,
+                "wait_seconds": round(self._wait_seconds, 4),
+                "max_wait_seconds": round(self._max_wait_seconds, 4),
+            }
@@ -1,48 +1,390 @@
+import atexit
+import copy
 import json
 import os
 import hashlib
+import sqlite3
 import tempfile
+import threading
+import time
 import logging
+from contextlib import closing
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
-STATE_PATH = REPO_ROOT / "state" / "state.json"
+# CINESTAR_STATE points runs against a throwaway state file (e.g. with
+# src.fake_upstream) so they don't touch the committed one.
+STATE_PATH = Path(os.environ.get("CINESTAR_STATE") or REPO_ROOT / "state" / "state.json")
+# Same for the SQLite backend (settings: state_backend: sqlite).
+STATE_DB_PATH = Path(os.environ.get("CINESTAR_STATE_DB") or REPO_ROOT / "state" / "state.sqlite3")
+BACKEND_JSON = "json"
+BACKEND_SQLITE = "sqlite"
 
 DEFAULT_STATE = {
     "last_sent_week_start": None,
     "last_hash": None,
     "sent_hashes_by_week": {},
     "tmdb_cache": {},
-    "cinestar_cache": {}
+    "tmdb_details": {},
+    "tmdb_search_cache": {},
+    "cinestar_cache": {},
+    "cache_access": {},
+    "cinemas": {}
 }
 
+# Top-level keys that are per-entry caches. The SQLite backend keeps them
+# one row per entry; every other key is stored as a single JSON value.
+CACHE_KEYS = ("tmdb_cache", "tmdb_details", "tmdb_search_cache", "cinestar_cache")
+# cache -> entry key -> ISO day of last access (see src/caches.py). SQLite
+# keeps these in the entries' `accessed` column instead.
+ACCESS_KEY = "cache_access"
+
 MAX_SENT_HASH_HISTORY = 16
+# Per-cinema send history; for the legacy single cinema these live at the
+# top level of the state, otherwise under state["cinemas"][<id>].
+SENT_HISTORY_KEYS = ("last_sent_week_start", "last_hash", "sent_hashes_by_week")
+
+
+def _default_state() -> dict:
+    # Deep copy: callers mutate the nested cache dicts in place.
+    return copy.deepcopy(DEFAULT_STATE)
 
 
-def load_state() -> dict:
-    if not STATE_PATH.exists():
-        return dict(DEFAULT_STATE)
+def load_state(path: Optional[Path] = None) -> dict:
+    path = path or STATE_PATH
+    if not path.exists():
+        return _default_state()
     try:
-        data = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+        data = json.loads(path.read_text(encoding="utf-8"))
         if not isinstance(data, dict):
-            logger.warning(f"State file at {STATE_PATH} is not a dict. Using default state.")
-            return dict(DEFAULT_STATE)
-        merged = dict(DEFAULT_STATE)
+            logger.warning(f"State file at {path} is not a dict. Using default state.")
+            return _default_state()
+        merged = _default_state()
         merged.update(data)
         return merged
     except Exception as e:
-        logger.warning(f"Failed to load state from {STATE_PATH}: {e}. Using default state.")
-        return dict(DEFAULT_STATE)
+        logger.warning(f"Failed to load state from {path}: {e}. Using default state.")
+        return _default_state()
 
-def save_state(state: dict):
-    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+def save_state(state: dict, path: Optional[Path] = None):
+    path = path or STATE_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
     payload = json.dumps(state, ensure_ascii=False, indent=2, sort_keys=True)
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=str(STATE_PATH.parent), encoding="utf-8") as f:
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=str(path.parent), encoding="utf-8") as f:
         f.write(payload)
         tmp = f.name
-    os.replace(tmp, STATE_PATH)
+    os.replace(tmp, path)
+
+
+class StateBackend:
+    """
+    Storage behind StateSession. save() gets the whole state plus what
+    changed: `dirty_keys` (top-level keys replaced or edited in place) and
+    `dirty_entries` (cache -> entry keys set or deleted via cache_set /
+    cache_delete); backends may write just those.
+    """
+
+    name = ""
+
+    def load(self) -> dict:
+        raise NotImplementedError
+
+    def save(self, data: dict, dirty_keys: set[str], dirty_entries: dict[str, set[str]]) -> None:
+        raise NotImplementedError
+
+    def location(self) -> Path:
+        raise NotImplementedError
+
+
+class JsonStateBackend(StateBackend):
+    """state.json, rewritten in full on every save (the default)."""
+
+    name = BACKEND_JSON
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path
+
+    def location(self) -> Path:
+        return self._path or STATE_PATH
+
+    # Without an explicit path these defer to the module-level functions
+    # and STATE_PATH at call time, so patching either (tests) still works.
+    def load(self) -> dict:
+        return load_state(self._path) if self._path else load_state()
+
+    def save(self, data: dict, dirty_keys: set[str], dirty_entries: dict[str, set[str]]) -> None:
+        if self._path:
+            save_state(data, self._path)
+        else:
+            save_state(data)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    accessed TEXT,
+    PRIMARY KEY (cache, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_updated_at ON cache_entries (cache, updated_at);
+"""
+SQLITE_UPSERT_ENTRY = (
+    "INSERT INTO cache_entries (cache, key, value, updated_at, accessed) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (cache, key) DO UPDATE SET value = excluded.value, "
+    "updated_at = excluded.updated_at, accessed = excluded.accessed"
+)
+SQLITE_UPSERT_META = (
+    "INSERT INTO meta (key, value) VALUES (?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+)
+
+
+class SqliteStateBackend(StateBackend):
+    """
+    SQLite database in WAL mode: send history and validators as JSON values
+    in `meta`, caches one row per entry in `cache_entries` (with their last
+    access day). A save upserts or deletes only the changed entries in one
+    transaction; a cache marked dirty as a whole (edited in place) is
+    rewritten.
+    """
+
+    name = BACKEND_SQLITE
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path
+
+    def location(self) -> Path:
+        return self._path or STATE_DB_PATH
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.location()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SQLITE_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")}
+        if "accessed" not in columns:
+            # Databases from before access tracking.
+            conn.execute("ALTER TABLE cache_entries ADD COLUMN accessed TEXT")
+        return conn
+
+    def load(self) -> dict:
+        data = _default_state()
+        if not self.location().exists():
+            return data
+        try:
+            with closing(self._connect()) as conn:
+                for key, value in conn.execute("SELECT key, value FROM meta"):
+                    data[key] = json.loads(value)
+                access = data[ACCESS_KEY]
+                for cache, key, value, accessed in conn.execute(
+                    "SELECT cache, key, value, accessed FROM cache_entries"
+                ):
+                    data.setdefault(cache, {})[key] = json.loads(value)
+                    if accessed:
+                        access.setdefault(cache, {})[key] = accessed
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Failed to load state from {self.location()}: {e}. Using default state.")
+            return _default_state()
+        return data
+
+    def save(self, data: dict, dirty_keys: set[str], dirty_entries: dict[str, set[str]]) -> None:
+        now = int(time.time())
+        access = data.get(ACCESS_KEY) or {}
+
+        def row(cache: str, entry_key: str, value) -> tuple:
+            accessed = (access.get(cache) or {}).get(entry_key)
+            return cache, entry_key, json.dumps(value, ensure_ascii=False), now, accessed
+
+        with closing(self._connect()) as conn, conn:
+            for key in dirty_keys:
+                if key in CACHE_KEYS:
+                    conn.execute("DELETE FROM cache_entries WHERE cache = ?", (key,))
+                    conn.executemany(SQLITE_UPSERT_ENTRY, [
+                        row(key, entry_key, value) for entry_key, value in (data.get(key) or {}).items()
+                    ])
+                elif key == ACCESS_KEY:
+                    for cache, days in access.items():
+                        conn.executemany(
+                            "UPDATE cache_entries SET accessed = ? WHERE cache = ? AND key = ?",
+                            [(day, cache, entry_key) for entry_key, day in days.items()],
+                        )
+                elif key in data:
+                    conn.execute(SQLITE_UPSERT_META, (key, json.dumps(data[key], ensure_ascii=False, sort_keys=True)))
+                else:
+                    conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+            for cache, entry_keys in dirty_entries.items():
+                if cache in dirty_keys:
+                    continue
+                entries = data.get(cache) or {}
+                for entry_key in entry_keys:
+                    if entry_key in entries:
+                        conn.execute(SQLITE_UPSERT_ENTRY, row(cache, entry_key, entries[entry_key]))
+                    else:
+                        conn.execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (cache, entry_key))
+
+
+BACKENDS = {BACKEND_JSON: JsonStateBackend, BACKEND_SQLITE: SqliteStateBackend}
+
+
+def get_backend(name: Optional[str] = None) -> StateBackend:
+    """Backend `name`, by default the one set as `state_backend` in settings."""
+    if name is None:
+        from src.fetch_kinoprogramm import get_setting
+        name = get_setting("state_backend", BACKEND_JSON)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown state backend: {name}")
+    return BACKENDS[name]()
+
+
+class StateSession:
+    """
+    Process-wide view of the state: loaded once, written once.
+
+    Modules read and update the state through the session instead of
+    calling load_state()/save_state() themselves. Every change marks its
+    top-level key dirty (cache_set/cache_delete just the entry); flush()
+    hands the changes to the backend only when something changed. All
+    access goes through one re-entrant lock, so enrichment workers can
+    update caches concurrently.
+    """
+
+    def __init__(self, backend: Optional[StateBackend] = None):
+        self.lock = threading.RLock()
+        self._backend = backend
+        self._data: Optional[dict] = None
+        self._dirty: set[str] = set()
+        self._dirty_entries: dict[str, set[str]] = {}
+
+    @property
+    def backend(self) -> StateBackend:
+        with self.lock:
+            if self._backend is None:
+                self._backend = get_backend()
+            return self._backend
+
+    @property
+    def data(self) -> dict:
+        with self.lock:
+            if self._data is None:
+                self._data = self.backend.load()
+            return self._data
+
+    @property
+    def dirty_keys(self) -> set[str]:
+        with self.lock:
+            return self._dirty | set(self._dirty_entries)
+
+    def get(self, key: str, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        with self.lock:
+            self.data[key] = value
+            self._dirty.add(key)
+
+    def mark_dirty(self, *keys: str) -> None:
+        """Whole keys changed in place (a cache marked here is rewritten)."""
+        with self.lock:
+            self._dirty.update(keys)
+
+    def cache(self, name: str) -> dict:
+        """Live dict for a cache key; hold `lock` while iterating it."""
+        with self.lock:
+            cache = self.data.get(name)
+            if not isinstance(cache, dict):
+                cache = {}
+                self.data[name] = cache
+            return cache
+
+    def cache_get(self, name: str, key: str, default=None):
+        with self.lock:
+            return self.cache(name).get(key, default)
+
+    def cache_set(self, name: str, key: str, value) -> None:
+        with self.lock:
+            self.cache(name)[key] = value
+            self._dirty_entries.setdefault(name, set()).add(key)
+
+    def cache_delete(self, name: str, key: str) -> None:
+        with self.lock:
+            self.cache_access(name).pop(key, None)
+            if self.cache(name).pop(key, None) is not None:
+                self._dirty_entries.setdefault(name, set()).add(key)
+
+    def cache_access(self, name: str) -> dict:
+        """Live entry key -> last access day map of cache `name`."""
+        with self.lock:
+            access = self.cache(ACCESS_KEY)
+            days = access.get(name)
+            if not isinstance(days, dict):
+                days = {}
+                access[name] = days
+            return days
+
+    def cache_touch(self, name: str, key: str, day: str) -> None:
+        """Record an access to an entry; a no-op when already recorded for `day`."""
+        with self.lock:
+            days = self.cache_access(name)
+            if days.get(key) != day:
+                days[key] = day
+                self._dirty_entries.setdefault(name, set()).add(key)
+
+    def flush(self) -> bool:
+        """Save the state if anything changed. Returns True if written."""
+        with self.lock:
+            if self._data is None or not (self._dirty or self._dirty_entries):
+                return False
+            changed = self.dirty_keys
+            self.backend.save(self._data, set(self._dirty), {k: set(v) for k, v in self._dirty_entries.items()})
+            logger.info(f"State saved ({', '.join(sorted(changed))} changed).")
+            self._dirty.clear()
+            self._dirty_entries.clear()
+            return True
+
+
+_session: Optional[StateSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> StateSession:
+    """Return the process-wide state session, flushed automatically at exit."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = StateSession()
+            atexit.register(_session.flush)
+        return _session
+
+
+def cinema_state(state: dict, state_key: Optional[str]) -> dict:
+    """Send-history dict of one cinema (the state itself for the legacy one)."""
+    if state_key is None:
+        return state
+    cinemas = state.get("cinemas")
+    if not isinstance(cinemas, dict):
+        cinemas = {}
+        state["cinemas"] = cinemas
+    return cinemas.setdefault(state_key, {})
+
+
+def cinema_state_dirty_keys(
+    state_key: Optional[str],
+    keys: tuple[str, ...] = SENT_HISTORY_KEYS,
+) -> tuple[str, ...]:
+    """Top-level state keys to mark dirty after updating `keys` of `cinema_state`."""
+    return tuple(keys) if state_key is None else ("cinemas",)
 
 
 def was_week_already_sent(state: dict, week_start_str: str, current_hash: str) -> bool:
@@ -104,3 +446,35 @@ def compute_content_hash(items: list[dict]) -> str:
     dump_str = json.dumps(stable_list, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
     
     return hashlib.sha256(dump_str.encode('utf-8')).hexdigest()
+
+
+def migrate(source: StateBackend, target: StateBackend) -> dict:
+    """Copy the whole state from `source` to `target`. Returns the copied state."""
+    data = source.load()
+    target.save(data, set(data), {})
+    return data
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="State storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate", help="Copy the state into another backend")
+    migrate_parser.add_argument("--to", choices=sorted(BACKENDS), default=BACKEND_SQLITE, help="Target backend (default: sqlite)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    source = get_backend(BACKEND_JSON if args.to == BACKEND_SQLITE else BACKEND_SQLITE)
+    target = get_backend(args.to)
+    if not source.location().exists():
+        print(f"Nothing to migrate: {source.location()} does not exist")
+        return
+    data = migrate(source, target)
+    entries = sum(len(data.get(key) or {}) for key in CACHE_KEYS)
+    print(f"Copied {len(data)} keys ({entries} cache entries) from {source.location()} to {target.location()}")
+    print(f"Set `state_backend: {target.name}` in settings to use it.")
+
+
+if __name__ == "__main__":
+    main()
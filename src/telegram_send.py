@@ -1,14 +1,26 @@
-import requests
+from functools import lru_cache
+
+from src import http_client
+
+# Overridable with telegram_api_base in settings (e.g. for src.fake_upstream).
+TELEGRAM_API_BASE = "https://api.telegram.org"
+
+
+@lru_cache(maxsize=1)
+def _telegram_api_base() -> str:
+    from src.fetch_kinoprogramm import get_setting
+    return get_setting("telegram_api_base", TELEGRAM_API_BASE).rstrip("/")
+
 
 def send_message(token: str, chat_id: str, text: str) -> None:
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{_telegram_api_base()}/bot{token}/sendMessage"
     payload = {
         "chat_id": chat_id,
         "text": text,
         "parse_mode": "HTML",
         "disable_web_page_preview": True,
     }
-    r = requests.post(url, data=payload, timeout=20)
+    r = http_client.post(url, data=payload)
     r.raise_for_status()
     data = r.json()
     if not data.get("ok"):
@@ -1,43 +1,76 @@
 import re
 import logging
 import os
-import requests
+import threading
+import time
 import yaml
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import lru_cache
 from typing import Optional
 
-from src.state import load_state, save_state
+from src import http_client
+from src.instrumentation import record_cache
+from src.rate_limit import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, TokenBucket
+from src.caches import get_cache
 
 logger = logging.getLogger(__name__)
 
-# Markers to strip from title
+# Markers to strip from title (matched as whole words, case-insensitive)
 STRIP_MARKERS = [
-    r'\bOV\b', r'\bOmU\b', r'\bOmeU\b', r'\bOriginalfassung\b', r'\bOriginalversion\b',
-    r'\b3D\b', r'\b2D\b', r'\bIMAX\b', r'\bDolby\b', r'\bAtmos\b'
+    'OV', 'OmU', 'OmeU', 'Originalfassung', 'Originalversion',
+    '3D', '2D', 'IMAX', 'Dolby', 'Atmos'
 ]
-STRIP_REGEX = re.compile('|'.join(STRIP_MARKERS), re.IGNORECASE)
 GERMAN_HINT_REGEX = re.compile(
     r"[äöüß]|\b(der|die|das|und|oder|wenn|sie|ein|eine|im|am|vom|zum|zur|mit|ohne|für|ueber|über)\b",
     re.IGNORECASE
 )
-QUOTE_CHARS_REGEX = re.compile(r'["“”„«»]')
+QUOTE_CHARS = '"“”„«»'
+_STRIP_QUOTES = str.maketrans("", "", QUOTE_CHARS)
+_MARKER = rf"\b(?:{'|'.join(STRIP_MARKERS)})\b"
+# Brackets left empty once markers and quotes are gone, e.g. "(OV)" or
+# '[„OmU“]'. Square brackets may also hold such an empty "( )": the old
+# paren-then-square substitutions removed both.
+_STRIPPABLE = rf"(?:\s|[{QUOTE_CHARS}]|{_MARKER})"
+_EMPTY_PARENS = rf"\({_STRIPPABLE}*\)"
+STRIP_REGEX = re.compile(
+    rf"{_EMPTY_PARENS}|\[(?:{_STRIPPABLE}|{_EMPTY_PARENS})*\]|{_MARKER}",
+    re.IGNORECASE,
+)
 TITLE_SEPARATOR_REGEX = re.compile(r"\s[-–—]\s")
-
+# Titles repeat for every showtime and every run of the pipeline; these
+# bound the memo of normalize_title / build_search_variants.
+TITLE_CACHE_SIZE = 4096
+# Overridable with tmdb_api_base in settings (e.g. for src.fake_upstream).
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+
+# /movie/{id} fields we keep in state["tmdb_details"]. Details hardly ever
+# change, so entries are served from disk and refreshed in the background
+# once older than `tmdb_details_ttl_days` (settings.yaml).
+TMDB_DETAIL_FIELDS = ("title", "original_title", "release_date", "runtime", "vote_average", "poster_path")
+DEFAULT_TMDB_DETAILS_TTL_DAYS = 30
+
+# Raw /search/movie responses are kept in state["tmdb_search_cache"] keyed
+# by "query|language|year", trimmed to these fields, so failed lookups are
+# not repeated every run and scoring changes can be replayed offline
+# (python -m src.tmdb_match rescore). Empty responses expire sooner: a
+# film missing from TMDb today may be added tomorrow.
+TMDB_SEARCH_FIELDS = ("id", "title", "original_title", "release_date", "vote_count", "popularity", "original_language")
+DEFAULT_TMDB_SEARCH_TTL_DAYS = 7
+DEFAULT_TMDB_SEARCH_NEGATIVE_TTL_DAYS = 1
+# TMDb allows roughly 50 requests/s per IP; stay below it (tmdb_rate_limit
+# in settings.yaml). Searches are scheduled before /movie/{id} details.
+DEFAULT_TMDB_RATE = 40
+DEFAULT_TMDB_BURST = 20
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
 def normalize_title(title_raw: str) -> str:
-    # 1. Strip markers
-    cleaned = STRIP_REGEX.sub(' ', title_raw)
-    # 1b. Remove decorative double quotes commonly used around EN title
-    cleaned = QUOTE_CHARS_REGEX.sub('', cleaned)
-    
-    # 2. Clean empty brackets like () or [] caused by removal
-    # Replaces ( ) with space, or () with empty
-    cleaned = re.sub(r'\(\s*\)', ' ', cleaned)
-    cleaned = re.sub(r'\[\s*\]', ' ', cleaned)
-    
-    # 3. Collapse whitespace and strip
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    return cleaned
+    """
+    Strip OV/format markers, the brackets they leave empty and decorative
+    quotes, then collapse whitespace: 'Michael (OV)' -> 'Michael'.
+    One regex pass; quotes and whitespace are handled by str methods.
+    """
+    cleaned = STRIP_REGEX.sub(" ", title_raw).translate(_STRIP_QUOTES)
+    return " ".join(cleaned.split())
 
 def build_search_variants(title_norm: str) -> list[str]:
     """
@@ -45,10 +78,16 @@ def build_search_variants(title_norm: str) -> list[str]:
     Primary title is always first. For localized "DE - EN" / "EN - DE"
     patterns we also try the likely original-language half.
     """
+    # Copy, so callers can't modify the memoized list.
+    return list(_search_variants(title_norm))
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def _search_variants(title_norm: str) -> tuple[str, ...]:
     variants = []
 
     def add_variant(v: str):
-        v = re.sub(r'\s+', ' ', v).strip()
+        v = " ".join(v.split())
         if v and v not in variants:
             variants.append(v)
 
@@ -71,7 +110,7 @@ def build_search_variants(title_norm: str) -> list[str]:
                 add_variant(right)
                 add_variant(left)
 
-    return variants
+    return tuple(variants)
 
 @lru_cache(maxsize=1)
 def load_overrides(path: str = "config/overrides.yaml") -> dict:
@@ -80,15 +119,157 @@ def load_overrides(path: str = "config/overrides.yaml") -> dict:
     with open(path, "r") as f:
         return yaml.safe_load(f) or {}
 
-def tmdb_search(title_norm: str, year: int = None, api_key: str = None) -> tuple[Optional[int], str]:
-    if not api_key:
-        return None, "no_api_key"
+# Languages queried for every search variant, in merge priority order.
+SEARCH_LANGUAGES = ["de-DE", "en-US"]
+SEARCH_THRESHOLD = 80  # High threshold as requested
+# Search requests of all titles share this pool; the per-host cap in
+# http_client still limits how many reach TMDb at once.
+TMDB_SEARCH_WORKERS = 8
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=TMDB_SEARCH_WORKERS, thread_name_prefix="tmdb-search")
+        return _search_executor
+
+
+def _search_cache_key(query: str, lang: str, year: Optional[int]) -> str:
+    return f"{query}|{lang}|{year or ''}"
+
+
+@lru_cache(maxsize=1)
+def _search_ttl_seconds() -> tuple[float, float]:
+    """(positive, negative) TTL of tmdb_search_cache entries in seconds."""
+    from src.fetch_kinoprogramm import get_setting
+    positive = get_setting("tmdb_search_ttl_days", DEFAULT_TMDB_SEARCH_TTL_DAYS)
+    negative = get_setting("tmdb_search_negative_ttl_days", DEFAULT_TMDB_SEARCH_NEGATIVE_TTL_DAYS)
+    return float(positive) * 24 * 3600, float(negative) * 24 * 3600
+
+
+def _cached_search(query: str, lang: str, year: Optional[int], offline: bool = False) -> Optional[list[dict]]:
+    """Cached results of one search, or None if absent or expired (never expired when offline)."""
+    cache = get_cache("tmdb_search_cache")
+    key = _search_cache_key(query, lang, year)
+    # Offline rescoring only looks; it doesn't keep entries alive.
+    entry = cache.peek(key) if offline else cache.get(key)
+    if not isinstance(entry, dict) or not isinstance(entry.get("results"), list):
+        return None
+    if not offline:
+        positive_ttl, negative_ttl = _search_ttl_seconds()
+        ttl = positive_ttl if entry["results"] else negative_ttl
+        if time.time() - entry.get("fetched_at", 0) > ttl:
+            return None
+    return entry["results"]
+
 
-    url = "https://api.themoviedb.org/3/search/movie"
+def _store_search(query: str, lang: str, year: Optional[int], results: list[dict]) -> None:
+    trimmed = [{field: r.get(field) for field in TMDB_SEARCH_FIELDS if field in r} for r in results]
+    get_cache("tmdb_search_cache").set(
+        _search_cache_key(query, lang, year),
+        {"results": trimmed, "fetched_at": int(time.time())},
+    )
+
+
+def _search_request(query: str, lang: str, year: Optional[int], api_key: str) -> tuple[list[dict], bool]:
+    """(results, rate_limited) of one /search/movie call; results are empty on any failure.
+
+    Successful responses (including empty ones) are stored in
+    tmdb_search_cache; errors are not, so they are retried next run.
+    """
+    params = {
+        "api_key": api_key,
+        "query": query,
+        "language": lang
+    }
+    if year:
+        params["year"] = year
+
+    try:
+        resp = _tmdb_get(f"{_tmdb_api_base()}/search/movie", params, PRIORITY_HIGH)
+        if resp.status_code == 200:
+            results = resp.json().get("results", [])
+            _store_search(query, lang, year, results)
+            return results, False
+        if resp.status_code == 429:
+            logger.warning(f"TMDb search rate-limited for {query} ({lang})")
+            return [], True
+    except Exception as e:
+        logger.warning(f"TMDb search failed for {query} ({lang}): {e}")
+    return [], False
+
+
+def _cand_year(cand: dict) -> Optional[int]:
+    rd = cand.get("release_date") or ""
+    if len(rd) >= 4 and rd[:4].isdigit():
+        return int(rd[:4])
+    return None
+
+
+def _score_candidate(cand: dict, query_lower: str, year: Optional[int], current_year: int) -> float:
+    score = 0
+    cand_title = cand.get("title", "").lower()
+    cand_orig = cand.get("original_title", "").lower()
+
+    # Exact match
+    if query_lower == cand_title or query_lower == cand_orig:
+        score += 100
+    # Substring
+    elif query_lower in cand_title or query_lower in cand_orig:
+        score += 30
+
+    cand_year = _cand_year(cand)
+
+    if year:
+        # Explicit year comparison (strict; unchanged behavior).
+        if cand_year is not None and cand_year == year:
+            score += 20
+    else:
+        # No input year: prefer recent releases, since the film is
+        # actually playing in a multiplex right now. Older entries
+        # (especially 30+ years) with the same exact title are almost
+        # always wrong.
+        if cand_year is not None:
+            age = current_year - cand_year
+            if age <= 3:
+                score += 25
+            elif age <= 10:
+                score += 0
+            elif age <= 30:
+                score -= 10
+            else:
+                score -= 20
+
+    # Tie breaker: vote count kept as a *weak* signal only, so it
+    # cannot overpower the recency bias above.
+    score += min(cand.get("vote_count", 0) / 2000, 5)
+    return score
+
+
+def tmdb_search(
+    title_norm: str,
+    year: int = None,
+    api_key: str = None,
+    offline: bool = False,
+) -> tuple[Optional[int], str]:
+    """
+    Search TMDb for the primary variant in every language at once; only
+    if it misses, search all other variants at once. Variants are scored
+    in priority order exactly as a sequential search would: the first
+    variant scoring >= SEARCH_THRESHOLD wins and the requests still
+    queued for later variants are cancelled.
+
+    Fresh tmdb_search_cache entries are used instead of requests. With
+    `offline=True` only the cache is consulted (whatever its age) and
+    uncached searches count as empty.
+    """
+    if not api_key and not offline:
+        return None, "no_api_key"
 
-    # Strategy: First de-DE, then en-US
-    languages = ["de-DE", "en-US"]
-    THRESHOLD = 80 # High threshold as requested
     best_overall_score = -1
     # Cinema schedules are near-real-time, so without an explicit year we
     # bias toward recent releases instead of simply picking the most popular
@@ -97,106 +278,90 @@ def tmdb_search(title_norm: str, year: int = None, api_key: str = None) -> tuple
     import datetime as _dt
     current_year = _dt.datetime.now().year
 
-    def _cand_year(cand: dict) -> Optional[int]:
-        rd = cand.get("release_date") or ""
-        if len(rd) >= 4 and rd[:4].isdigit():
-            return int(rd[:4])
-        return None
-
-    for query in build_search_variants(title_norm):
-        candidates = []
-        seen_ids = set()
-        # Query both languages and merge: a recent local-language release
-        # (e.g. an Indian "Michael" 2025) may only show up in en-US while
-        # an older German/Austrian film dominates de-DE. Deduplicate by id.
-        for lang in languages:
-            params = {
-                "api_key": api_key,
-                "query": query,
-                "language": lang
-            }
-            if year:
-                params["year"] = year
-
-            try:
-                resp = requests.get(url, params=params, timeout=5)
-                if resp.status_code == 200:
-                    results = resp.json().get("results", [])
-                    for r in results:
-                        rid = r.get("id")
-                        if rid is None or rid in seen_ids:
-                            continue
-                        seen_ids.add(rid)
-                        candidates.append(r)
-            except Exception as e:
-                logger.warning(f"TMDb search failed for {query} ({lang}): {e}")
-
-        if not candidates:
-            continue
-
-        best_candidate = None
-        best_score = -1
-        query_lower = query.lower()
-
-        for cand in candidates:
-            score = 0
-            cand_title = cand.get("title", "").lower()
-            cand_orig = cand.get("original_title", "").lower()
-
-            # Exact match
-            if query_lower == cand_title or query_lower == cand_orig:
-                score += 100
-            # Substring
-            elif query_lower in cand_title or query_lower in cand_orig:
-                score += 30
-
-            cand_year = _cand_year(cand)
-
-            if year:
-                # Explicit year comparison (strict; unchanged behavior).
-                if cand_year is not None and cand_year == year:
-                    score += 20
-            else:
-                # No input year: prefer recent releases, since the film is
-                # actually playing in a multiplex right now. Older entries
-                # (especially 30+ years) with the same exact title are almost
-                # always wrong.
-                if cand_year is not None:
-                    age = current_year - cand_year
-                    if age <= 3:
-                        score += 25
-                    elif age <= 10:
-                        score += 0
-                    elif age <= 30:
-                        score -= 10
-                    else:
-                        score -= 20
-
-            # Tie breaker: vote count kept as a *weak* signal only, so it
-            # cannot overpower the recency bias above.
-            score += min(cand.get("vote_count", 0) / 2000, 5)
-
-            if score > best_score:
-                best_score = score
-                best_candidate = cand
-
-        if best_score > best_overall_score:
-            best_overall_score = best_score
-
-        if best_candidate and best_score >= THRESHOLD:
-            # Safety net: when we don't know the input year, refuse to return
-            # a match that's more than ~15 years old. CineStar plays current
-            # releases; a decade-old "Michael" (1996 or 2011) almost certainly
-            # isn't the film actually on screen, and a missing Letterboxd
-            # link is strictly better than one pointing at the wrong film.
-            if not year:
-                best_year = _cand_year(best_candidate)
-                if best_year is not None and (current_year - best_year) > 15:
-                    return None, f"best_too_old_{best_year}"
-            if query == title_norm:
-                return best_candidate["id"], "match"
-            return best_candidate["id"], f"match_variant:{query}"
-
+    executor = _get_search_executor()
+    variants = build_search_variants(title_norm)
+    futures = {}
+
+    def submit(queries: list[str]) -> None:
+        for query in queries:
+            for lang in SEARCH_LANGUAGES:
+                cached = _cached_search(query, lang, year, offline=offline)
+                if not offline:
+                    record_cache("tmdb_search", cached is not None)
+                if cached is not None or offline:
+                    future = Future()
+                    future.set_result((cached or [], False))
+                    futures[(query, lang)] = future
+                else:
+                    futures[(query, lang)] = executor.submit(_search_request, query, lang, year, api_key)
+
+    # Two phases on purpose: most titles match on the primary variant, so
+    # firing every variant up front mostly sent requests whose answers were
+    # thrown away (and could not be cancelled once in flight). The price is
+    # latency on a miss: two TMDb round-trips back to back instead of one.
+    # Films are enriched in parallel, so this lengthens the slowest film,
+    # not the sum.
+    submit(variants[:1])
+
+    rate_limited = False
+    try:
+        for position, query in enumerate(variants):
+            if position == 1:
+                submit(variants[1:])
+            candidates = []
+            seen_ids = set()
+            # Query both languages and merge: a recent local-language release
+            # (e.g. an Indian "Michael" 2025) may only show up in en-US while
+            # an older German/Austrian film dominates de-DE. Deduplicate by id.
+            for lang in SEARCH_LANGUAGES:
+                results, limited = futures[(query, lang)].result()
+                rate_limited = rate_limited or limited
+                for r in results:
+                    rid = r.get("id")
+                    if rid is None or rid in seen_ids:
+                        continue
+                    seen_ids.add(rid)
+                    candidates.append(r)
+
+            if not candidates:
+                continue
+
+            best_candidate = None
+            best_score = -1
+            query_lower = query.lower()
+
+            for cand in candidates:
+                score = _score_candidate(cand, query_lower, year, current_year)
+                if score > best_score:
+                    best_score = score
+                    best_candidate = cand
+
+            if best_score > best_overall_score:
+                best_overall_score = best_score
+
+            if best_candidate and best_score >= SEARCH_THRESHOLD:
+                # Safety net: when we don't know the input year, refuse to return
+                # a match that's more than ~15 years old. CineStar plays current
+                # releases; a decade-old "Michael" (1996 or 2011) almost certainly
+                # isn't the film actually on screen, and a missing Letterboxd
+                # link is strictly better than one pointing at the wrong film.
+                if not year:
+                    best_year = _cand_year(best_candidate)
+                    if best_year is not None and (current_year - best_year) > 15:
+                        return None, f"best_too_old_{best_year}"
+                if query == title_norm:
+                    return best_candidate["id"], "match"
+                return best_candidate["id"], f"match_variant:{query}"
+    finally:
+        # Requests already on the wire finish in the background; their
+        # results are ignored.
+        for future in futures.values():
+            future.cancel()
+
+    # Without a match, a throttled search means we simply don't know yet;
+    # the result is not cached, so the next run tries again.
+    if rate_limited:
+        return None, "rate_limited"
     if best_overall_score < 0:
         return None, "no_results"
     return None, f"low_score_{best_overall_score:.1f}"
@@ -208,10 +373,11 @@ def resolve_tmdb_id(title_norm: str, year: int = None) -> tuple[Optional[int], s
         return overrides[title_norm], "override"
 
     # 2. Cache
-    state = load_state()
-    cache = state.get("tmdb_cache", {})
-    if title_norm in cache:
-        return cache[title_norm], "cache"
+    tmdb_cache = get_cache("tmdb_cache")
+    cached_id = tmdb_cache.get(title_norm)
+    record_cache("tmdb_cache", cached_id is not None)
+    if cached_id is not None:
+        return cached_id, "cache"
 
     # 3. Search
     api_key = os.environ.get("TMDB_API_KEY")
@@ -221,34 +387,138 @@ def resolve_tmdb_id(title_norm: str, year: int = None) -> tuple[Optional[int], s
     tmdb_id, reason = tmdb_search(title_norm, year, api_key)
     
     if tmdb_id:
-        # Update Cache
-        cache[title_norm] = tmdb_id
-        state["tmdb_cache"] = cache # ensure key exists
-        save_state(state)
+        # Update Cache (written to disk once, when the session is flushed)
+        tmdb_cache.set(title_norm, tmdb_id)
         return tmdb_id, reason # 'match'
 
     return None, reason
 
-@lru_cache(maxsize=256)
-def _get_tmdb_details(tmdb_id: int, api_key: str = None) -> Optional[dict]:
-    """Fetch /movie/{id} once and cache; helpers below read fields from it."""
-    if not api_key:
-        api_key = os.environ.get("TMDB_API_KEY")
-    if not api_key or not tmdb_id:
-        return None
+_details_memo: dict[int, Optional[dict]] = {}
+_details_lock = threading.Lock()
+_refreshing: set[int] = set()
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+
+
+@lru_cache(maxsize=1)
+def _details_ttl_seconds() -> float:
+    from src.fetch_kinoprogramm import get_setting
+    days = get_setting("tmdb_details_ttl_days", DEFAULT_TMDB_DETAILS_TTL_DAYS)
+    return float(days) * 24 * 3600
+
+
+@lru_cache(maxsize=1)
+def _tmdb_api_base() -> str:
+    from src.fetch_kinoprogramm import get_setting
+    return get_setting("tmdb_api_base", TMDB_API_BASE).rstrip("/")
+
 
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}"
+@lru_cache(maxsize=1)
+def _tmdb_rate_limiter() -> TokenBucket:
+    """Token bucket shared by every request to the TMDb API in this process."""
+    from src.fetch_kinoprogramm import get_setting
+    config = get_setting("tmdb_rate_limit") or {}
+    limiter = TokenBucket(
+        rate=config.get("rate", DEFAULT_TMDB_RATE),
+        burst=config.get("burst", DEFAULT_TMDB_BURST),
+        name="tmdb",
+    )
+    http_client.get_client().set_rate_limiter(f"{_tmdb_api_base()}/", limiter)
+    return limiter
+
+
+def _tmdb_get(url: str, params: dict, priority: int):
+    """GET a TMDb API URL through the shared rate limiter."""
+    _tmdb_rate_limiter()
+    return http_client.get(url, params=params, priority=priority)
+
+
+def _fetch_tmdb_details(tmdb_id: int, api_key: str, priority: int = PRIORITY_NORMAL) -> Optional[dict]:
+    url = f"{_tmdb_api_base()}/movie/{tmdb_id}"
     params = {"api_key": api_key}
 
     try:
-        resp = requests.get(url, params=params, timeout=5)
+        resp = _tmdb_get(url, params, priority)
         if resp.status_code != 200:
             return None
-        return resp.json()
+        data = resp.json()
     except Exception as e:
         logger.warning(f"TMDb movie details failed for {tmdb_id}: {e}")
         return None
 
+    entry = {field: data.get(field) for field in TMDB_DETAIL_FIELDS}
+    entry["fetched_at"] = int(time.time())
+    return entry
+
+
+def _store_tmdb_details(tmdb_id: int, entry: dict) -> None:
+    get_cache("tmdb_details").set(str(tmdb_id), entry)
+
+
+def _refresh_tmdb_details(tmdb_id: int, api_key: str) -> None:
+    try:
+        # A stale copy is already in use; don't hold up searches.
+        entry = _fetch_tmdb_details(tmdb_id, api_key, PRIORITY_LOW)
+        if entry:
+            _store_tmdb_details(tmdb_id, entry)
+            with _details_lock:
+                _details_memo[tmdb_id] = entry
+    finally:
+        with _details_lock:
+            _refreshing.discard(tmdb_id)
+
+
+def _schedule_details_refresh(tmdb_id: int, api_key: str) -> None:
+    """Re-fetch a stale entry without blocking the caller.
+
+    Worker threads are joined at interpreter exit, before the state session
+    is flushed, so the refreshed entry still reaches state.json.
+    """
+    global _refresh_executor
+    with _details_lock:
+        if tmdb_id in _refreshing:
+            return
+        _refreshing.add(tmdb_id)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tmdb-refresh")
+        executor = _refresh_executor
+    executor.submit(_refresh_tmdb_details, tmdb_id, api_key)
+
+
+def _get_tmdb_details(tmdb_id: int, api_key: str = None) -> Optional[dict]:
+    """
+    Return the cached /movie/{id} fields, fetching them on first use.
+
+    Lookup order: in-process memo, then state["tmdb_details"] (stale
+    entries are returned as-is and refreshed in the background), then the
+    TMDb API.
+    """
+    if not tmdb_id:
+        return None
+    with _details_lock:
+        if tmdb_id in _details_memo:
+            record_cache("tmdb_details", True)
+            return _details_memo[tmdb_id]
+
+    if not api_key:
+        api_key = os.environ.get("TMDB_API_KEY")
+
+    entry = get_cache("tmdb_details").get(str(tmdb_id))
+    record_cache("tmdb_details", isinstance(entry, dict))
+    if isinstance(entry, dict):
+        age = time.time() - entry.get("fetched_at", 0)
+        if age > _details_ttl_seconds() and api_key:
+            _schedule_details_refresh(tmdb_id, api_key)
+    elif api_key:
+        entry = _fetch_tmdb_details(tmdb_id, api_key)
+        if entry:
+            _store_tmdb_details(tmdb_id, entry)
+    else:
+        entry = None
+
+    with _details_lock:
+        _details_memo[tmdb_id] = entry
+    return entry
+
 
 def get_tmdb_original_title(tmdb_id: int, api_key: str = None) -> Optional[str]:
     data = _get_tmdb_details(tmdb_id, api_key)
@@ -267,3 +537,52 @@ def get_tmdb_release_year(tmdb_id: int, api_key: str = None) -> Optional[int]:
     if len(rd) >= 4 and rd[:4].isdigit():
         return int(rd[:4])
     return None
+
+
+def _cached_titles() -> list[str]:
+    """Titles with cached search data: tmdb_cache keys plus searched titles that aren't just variants of another."""
+    queries = {key.split("|", 1)[0] for key in get_cache("tmdb_search_cache").keys()}
+    matched = get_cache("tmdb_cache").keys()
+    variants = {v for q in queries for v in build_search_variants(q)[1:]}
+    return sorted(set(matched) | (queries - variants))
+
+
+def rescore_cached(titles: Optional[list[str]] = None) -> list[tuple[str, Optional[int], Optional[int], str]]:
+    """
+    Re-run matching against tmdb_search_cache without network access.
+
+    Returns (title, cached_id, new_id, reason) per title, where cached_id is
+    the current tmdb_cache entry. Nothing in the state is changed.
+    """
+    tmdb_cache = get_cache("tmdb_cache")
+    rows = []
+    for title in titles or _cached_titles():
+        new_id, reason = tmdb_search(title, offline=True)
+        rows.append((title, tmdb_cache.peek(title), new_id, reason))
+    return rows
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TMDb matching tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rescore = sub.add_parser("rescore", help="Re-score cached TMDb search results offline")
+    rescore.add_argument("titles", nargs="*", help="Normalized titles (default: every cached title)")
+    rescore.add_argument("--changed", action="store_true", help="Only print titles whose match changed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    rows = rescore_cached(args.titles)
+    changed = 0
+    for title, cached_id, new_id, reason in rows:
+        differs = cached_id != new_id
+        changed += differs
+        if differs or not args.changed:
+            marker = "  <-- changed" if differs else ""
+            print(f"{title}: {cached_id} -> {new_id} ({reason}){marker}")
+    print(f"{len(rows)} titles re-scored, {changed} changed")
+
+
+if __name__ == "__main__":
+    main()
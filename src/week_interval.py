@@ -1,4 +1,6 @@
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta, date
+from typing import Iterable, Optional
 
 def compute_week_window(now: datetime) -> tuple[datetime, datetime]:
     """
@@ -28,30 +30,86 @@ def compute_week_window(now: datetime) -> tuple[datetime, datetime]:
     
     return start_dt, end_dt
 
-def filter_by_week(sessions: list, week_start: datetime, week_end: datetime) -> list:
+def local_epoch(dt: datetime, tzinfo=None) -> float:
     """
-    Filters sessions that fall within [week_start, week_end] inclusive.
-    Assumes session.dt_local is timezone-aware and comparable if week_start is too.
-    However, compute_week_window returns native datetimes. 
-    We should normalize.
+    Epoch seconds of `dt`. A naive `dt` is local wall-clock time in
+    `tzinfo` (the sessions' zone), matching how sessions are compared.
     """
-    filtered = []
-    # Make naive for comparison or localize window?
-    # Session dt is timezone aware (Europe/Berlin).
-    # Let's make window timezone aware if possible, or strip tz from session.
-    # Given we work in specific timezone, simpler to strip TZ from session for comparison 
-    # OR assume input is correct.
-    
-    # Ideally, week_start/end should be localized to the same timezone as sessions.
-    # But for MVP, simple comparison:
-    
-    for s in sessions:
-        # s.dt_local is aware.
-        # week_start is naive (from compute_week_window).
-        # Localize week_start/end to session's tokenizer or naive-ify session
-        
-        s_dt = s.dt_local.replace(tzinfo=None) # naive in local time
-        if week_start <= s_dt <= week_end:
-            filtered.append(s)
-            
-    return filtered
+    if dt.tzinfo is not None:
+        return dt.timestamp()
+    if tzinfo is None:
+        return dt.timestamp()
+    if hasattr(tzinfo, "localize"):  # pytz
+        return tzinfo.localize(dt).timestamp()
+    return dt.replace(tzinfo=tzinfo).timestamp()
+
+
+class SessionIndex:
+    """
+    Sessions sorted by start time (Session.epoch) for O(log n) range
+    queries: week windows, the schedule horizon and lookahead weeks are
+    answered by bisecting instead of scanning every showtime.
+
+    Range queries return sessions in their original (page) order, so
+    results are the same as filtering the plain list.
+    """
+
+    def __init__(self, sessions: Iterable):
+        sessions = list(sessions)
+        order = sorted(range(len(sessions)), key=lambda i: sessions[i].epoch)
+        self.sessions = [sessions[i] for i in order]
+        self.epochs = [s.epoch for s in self.sessions]
+        self._positions = order
+        self.tzinfo = self.sessions[0].tzinfo if self.sessions else None
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __iter__(self):
+        return iter(self.sessions)
+
+    @property
+    def min_dt(self) -> Optional[datetime]:
+        return self.sessions[0].dt_local if self.sessions else None
+
+    @property
+    def max_dt(self) -> Optional[datetime]:
+        return self.sessions[-1].dt_local if self.sessions else None
+
+    def _bounds(self, start: datetime, end: datetime) -> tuple[int, int]:
+        lo = bisect_left(self.epochs, local_epoch(start, self.tzinfo))
+        hi = bisect_right(self.epochs, local_epoch(end, self.tzinfo))
+        return lo, max(lo, hi)
+
+    def between(self, start: datetime, end: datetime) -> list:
+        """Sessions starting within [start, end] inclusive, in input order."""
+        lo, hi = self._bounds(start, end)
+        picked = sorted(range(lo, hi), key=self._positions.__getitem__)
+        return [self.sessions[i] for i in picked]
+
+    def count_between(self, start: datetime, end: datetime) -> int:
+        lo, hi = self._bounds(start, end)
+        return hi - lo
+
+    def reaches(self, dt: datetime) -> bool:
+        """True if the latest session starts at or after `dt`."""
+        return bool(self.epochs) and self.epochs[-1] >= local_epoch(dt, self.tzinfo)
+
+
+def filter_by_week(sessions, week_start: datetime, week_end: datetime) -> list:
+    """
+    Sessions that fall within [week_start, week_end] inclusive, in input
+    order. The window is compared in the sessions' local time (naive
+    bounds from compute_week_window are taken as wall-clock time there).
+
+    Pass a SessionIndex to bisect instead of scanning the list.
+    """
+    if isinstance(sessions, SessionIndex):
+        return sessions.between(week_start, week_end)
+    if not sessions:
+        return []
+    # Compare integer epochs instead of building a datetime per session.
+    tzinfo = sessions[0].tzinfo
+    start = local_epoch(week_start, tzinfo)
+    end = local_epoch(week_end, tzinfo)
+    return [s for s in sessions if start <= s.epoch <= end]
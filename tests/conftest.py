@@ -0,0 +1,18 @@
+import pytest
+
+import src.checkpoints
+import src.state
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Keep tests from reading or rewriting the real state/state.json (or checkpoints)."""
+    state_path = tmp_path / "state.json"
+    monkeypatch.setattr("src.state.STATE_PATH", state_path)
+    monkeypatch.setattr("src.checkpoints.CHECKPOINT_DIR", tmp_path / "checkpoints")
+    monkeypatch.setattr("src.state._session", None)
+    yield state_path
+    # Flush while STATE_PATH still points at tmp_path; otherwise the atexit
+    # hook writes this test's session into the real state file.
+    if src.state._session is not None:
+        src.state._session.flush()
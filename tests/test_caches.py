@@ -0,0 +1,91 @@
+from src.caches import BoundedCache, get_cache
+from src.state import get_session
+
+
+DAY = 24 * 3600
+# 2026-05-28 12:00 UTC: the same calendar day in any usual local timezone.
+NOON = 1_779_969_600.0
+
+
+def test_get_and_set_track_the_day_of_last_access(monkeypatch):
+    now = [NOON]
+    monkeypatch.setattr("src.caches.time.time", lambda: now[0])
+    session = get_session()
+    cache = BoundedCache("tmdb_cache", max_entries=10, max_idle_days=30, session=session)
+
+    cache.set("Hamnet", 858024)
+    session.flush()
+    # Read again the same day: nothing to write.
+    assert cache.get("Hamnet") == 858024
+    assert session.flush() is False
+
+    now[0] += DAY
+    assert cache.get("Hamnet") == 858024
+    assert session.dirty_keys == {"tmdb_cache"}
+    assert cache.get("Bugonia") is None
+    assert session.data["cache_access"]["tmdb_cache"] == {"Hamnet": "2026-05-29"}
+
+
+def test_idle_entries_are_evicted_then_least_recently_used_beyond_the_cap(monkeypatch):
+    now = [NOON]
+    monkeypatch.setattr("src.caches.time.time", lambda: now[0])
+    session = get_session()
+    # Written before access tracking existed: counts as used on first run.
+    session.cache_set("cinestar_cache", "legacy", {"url": None})
+    cache = BoundedCache("cinestar_cache", max_entries=3, max_idle_days=30, session=session)
+
+    cache.set("a", 1)
+    now[0] += 10 * DAY
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert sorted(cache.keys()) == ["a", "b", "c"]  # "legacy" was least recently used
+
+    # "a" was last used 35 days ago, "b" and "c" 25 days ago.
+    now[0] += 25 * DAY
+    assert cache.evict() == 1
+    assert sorted(cache.keys()) == ["b", "c"]
+    assert set(session.data["cache_access"]["cinestar_cache"]) == {"b", "c"}
+
+
+def test_an_entry_read_every_day_survives_eviction(monkeypatch):
+    now = [NOON]
+    monkeypatch.setattr("src.caches.time.time", lambda: now[0])
+    session = get_session()
+    cache = BoundedCache("tmdb_search_cache", max_entries=2, max_idle_days=30, session=session)
+
+    cache.set("hot", 1)
+    cache.set("cold", 2)
+    for _ in range(40):
+        now[0] += DAY
+        assert cache.get("hot") == 1
+    cache.set("new", 3)
+
+    # Written 40 days ago but read daily: neither idle nor least recently used.
+    assert cache.evict() == 0
+    assert sorted(cache.keys()) == ["hot", "new"]
+
+
+def test_get_cache_reads_limits_from_settings(monkeypatch):
+    monkeypatch.setattr(
+        "src.fetch_kinoprogramm.get_setting",
+        lambda key, default=None: {"tmdb_cache": {"max_entries": 2}} if key == "caches" else default,
+    )
+
+    cache = get_cache("tmdb_cache")
+
+    assert (cache.max_entries, cache.max_idle_days) == (2, 365)
+    assert get_cache("tmdb_cache") is cache
+
+
+def test_access_days_survive_the_sqlite_backend(tmp_path, monkeypatch):
+    from src.state import SqliteStateBackend, StateSession
+
+    monkeypatch.setattr("src.caches.time.time", lambda: NOON)
+    backend = SqliteStateBackend(tmp_path / "state.sqlite3")
+    session = StateSession(backend)
+    BoundedCache("tmdb_cache", max_entries=10, max_idle_days=30, session=session).set("Hamnet", 858024)
+    session.flush()
+
+    data = backend.load()
+    assert data["tmdb_cache"] == {"Hamnet": 858024}
+    assert data["cache_access"] == {"tmdb_cache": {"Hamnet": "2026-05-28"}}
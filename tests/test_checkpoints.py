@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from src.checkpoints import (
+    KEEP_PAGES,
+    CheckpointMissing,
+    CinemaCheckpoints,
+    config_fingerprint,
+    decode_sessions,
+    encode_sessions,
+    html_sha256,
+)
+from src.parse_schedule import Session
+
+
+def _sessions() -> list[Session]:
+    tz = pytz.timezone("Europe/Berlin")
+    return [
+        Session("Movie A (OV)", tz.localize(datetime(2026, 3, 28, 20, 0)), "https://example.com/a", "Movie A (OV)"),
+        Session("Movie B", tz.localize(datetime(2026, 3, 29, 17, 0)), "https://example.com/b", "OmU"),
+        Session("Movie A (OV)", tz.localize(datetime(2026, 3, 30, 18, 0)), "https://example.com/a", "Movie A (OV)"),
+    ]
+
+
+def test_sessions_round_trip_through_a_checkpoint():
+    sessions = _sessions()
+    payload = encode_sessions(sessions)
+
+    assert len(payload["films"]) == 2
+    decoded = decode_sessions(payload, "Europe/Berlin")
+    assert [(s.title, s.film_url, s.tags, s.dt_local) for s in decoded] == [
+        (s.title, s.film_url, s.tags, s.dt_local) for s in sessions
+    ]
+    # CEST after the switch to summer time survives the round trip.
+    assert decoded[1].dt_local.utcoffset().total_seconds() == 2 * 3600
+
+
+def test_rerun_on_the_same_page_resumes_completed_stages():
+    calls = []
+
+    def run(html, max_age_hours=24):
+        page = CinemaCheckpoints("konstanz", max_age_hours=max_age_hours).begin(html, "https://kino.test")
+        parsed = page.stage("parse", lambda: calls.append("parse") or ["a", "b"])
+        enriched = page.stage("enrich", lambda: calls.append("enrich") or "partial", keep=lambda v: v != "partial")
+        return parsed, enriched
+
+    assert run("<html>1</html>") == (["a", "b"], "partial")
+    assert run("<html>1</html>") == (["a", "b"], "partial")
+    # parse resumed; the incomplete enrichment was not checkpointed.
+    assert calls == ["parse", "enrich", "enrich"]
+
+    run("<html>2</html>")
+    run("<html>1</html>", max_age_hours=0)
+    assert calls[3:] == ["parse", "enrich", "parse", "enrich"]
+
+
+def test_stages_after_a_recomputed_or_unsaved_stage_are_not_reused():
+    def run(enrichment):
+        page = CinemaCheckpoints("konstanz").begin("<html>1</html>", "https://kino.test")
+        page.stage("parse", lambda: ["a"])
+        enriched = page.stage("enrich", lambda: enrichment, week="w", keep=lambda v: v != "partial")
+        return page.stage("format", lambda: f"message from {enriched}", week="w")
+
+    assert run("partial") == "message from partial"
+    # The partial enrichment was not saved, so neither was its message.
+    assert run("complete") == "message from complete"
+    assert run("changed") == "message from complete"
+
+
+def test_a_config_change_recomputes_the_stages_of_the_same_page(tmp_path):
+    overrides = tmp_path / "overrides.yaml"
+    overrides.write_text('"Michael": 1\n')
+    cinema = type("Cinema", (), {})()
+    cinema.ov_markers = ["OV"]
+
+    def run(settings, compute):
+        fingerprint = config_fingerprint(settings, cinema, overrides_path=str(overrides))
+        page = CinemaCheckpoints("konstanz", fingerprint=fingerprint).begin("<html>1</html>", "https://kino.test")
+        return page.stage("parse", compute)
+
+    assert run({"lookahead": False}, lambda: "first") == "first"
+    assert run({"lookahead": False}, lambda: "second") == "first"
+    assert run({"lookahead": True}, lambda: "third") == "third"
+    overrides.write_text('"Michael": 2\n')
+    assert run({"lookahead": True}, lambda: "fourth") == "fourth"
+    cinema.ov_markers = ["OV", "OmU"]
+    assert run({"lookahead": True}, lambda: "fifth") == "fifth"
+
+    # --from-stage still finds the page itself under the new config.
+    fingerprint = config_fingerprint({}, cinema, overrides_path=str(overrides))
+    assert CinemaCheckpoints("konstanz", from_stage="parse", fingerprint=fingerprint).latest()[1] == "<html>1</html>"
+
+
+def test_from_stage_reuses_earlier_stages_of_the_latest_page():
+    with pytest.raises(CheckpointMissing):
+        CinemaCheckpoints("konstanz", from_stage="format").latest()
+
+    page = CinemaCheckpoints("konstanz").begin("<html>1</html>", "https://kino.test")
+    page.save("enrich", "enriched", week="2026-03-26")
+    page.save("format", "old message", week="2026-03-26")
+
+    page, html = CinemaCheckpoints("konstanz", from_stage="format").latest()
+    assert html == "<html>1</html>"
+    assert page.stage("enrich", lambda: "recomputed", week="2026-03-26") == "enriched"
+    assert page.stage("format", lambda: "new message", week="2026-03-26") == "new message"
+
+    with pytest.raises(ValueError):
+        CinemaCheckpoints("konstanz", from_stage="deploy")
+
+
+def test_only_the_latest_pages_are_kept(tmp_path):
+    checkpoints = CinemaCheckpoints("konstanz", root=tmp_path)
+    for n in range(KEEP_PAGES + 2):
+        checkpoints.begin(f"<html>{n}</html>", "https://kino.test")
+
+    assert len([p for p in (tmp_path / "konstanz").iterdir() if p.is_dir()]) == KEEP_PAGES
+    assert checkpoints.latest()[1] == f"<html>{KEEP_PAGES + 1}</html>"
+
+
+def test_a_streamed_fetch_is_written_chunk_by_chunk(tmp_path):
+    checkpoints = CinemaCheckpoints("konstanz", root=tmp_path)
+    chunks = ['<html lang="de">', "\\ Für \"immer\"\n", "</html>"]
+
+    aborted = checkpoints.begin_stream("https://kino.test")
+    aborted.write(chunks[0])
+    aborted.abort()
+    assert list((tmp_path / "konstanz").iterdir()) == []
+
+    fetch = checkpoints.begin_stream("https://kino.test")
+    for chunk in chunks:
+        fetch.write(chunk)
+    page = fetch.finish()
+
+    assert page.html_sha256 == html_sha256("".join(chunks))
+    assert checkpoints.latest()[1] == "".join(chunks)
+    assert not list((tmp_path / "konstanz").glob("*.part"))
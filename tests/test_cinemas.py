@@ -0,0 +1,56 @@
+import pytest
+
+from src.cinemas import load_cinemas
+from src.cinestar_link import CINESTAR_BASE_URL
+from src.state import cinema_state, cinema_state_dirty_keys, record_sent_week
+
+
+def test_load_cinemas_without_list_is_legacy_konstanz():
+    cinemas = load_cinemas({"kinoprogramm_url": "https://example.com/k", "ov_markers": ["OV"]})
+
+    assert len(cinemas) == 1
+    cinema = cinemas[0]
+    assert cinema.id == "konstanz"
+    assert cinema.kinoprogramm_url == "https://example.com/k"
+    assert cinema.ov_markers == ["OV"]
+    assert cinema.cinestar_base_url == CINESTAR_BASE_URL
+    assert cinema.state_key is None
+
+
+def test_load_cinemas_list_inherits_defaults(monkeypatch):
+    monkeypatch.setenv("CHAT_B", "-100")
+    cinemas = load_cinemas({
+        "timezone": "Europe/Zurich",
+        "ov_markers": ["OmU"],
+        "cinemas": [
+            {"id": "a", "kinoprogramm_url": "https://example.com/a", "legacy_state": True},
+            {"id": "b", "kinoprogramm_url": "https://example.com/b", "chat_id_env": "CHAT_B"},
+        ],
+    })
+
+    a, b = cinemas
+    assert (a.state_key, b.state_key) == (None, "b")
+    assert b.timezone == "Europe/Zurich"
+    assert b.ov_markers == ["OmU"]
+    assert b.cinestar_base_url is None
+    assert b.resolve_chat_id() == "-100"
+
+
+def test_load_cinemas_rejects_duplicate_ids():
+    with pytest.raises(ValueError):
+        load_cinemas({"cinemas": [
+            {"id": "a", "kinoprogramm_url": "https://example.com/a"},
+            {"id": "a", "kinoprogramm_url": "https://example.com/a2"},
+        ]})
+
+
+def test_cinema_state_keeps_histories_apart():
+    state = {"cinemas": {}}
+
+    record_sent_week(cinema_state(state, None), "2026-03-19", "h1")
+    record_sent_week(cinema_state(state, "b"), "2026-03-19", "h2")
+
+    assert state["last_hash"] == "h1"
+    assert state["cinemas"]["b"]["last_hash"] == "h2"
+    assert cinema_state_dirty_keys("b") == ("cinemas",)
+    assert "last_hash" in cinema_state_dirty_keys(None)
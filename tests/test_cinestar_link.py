@@ -1,6 +1,16 @@
 import datetime
 
-from src.cinestar_link import build_cinestar_slug_candidates, resolve_cinestar_url
+import pytest
+
+from src.cinestar_link import (
+    CINESTAR_BASE_URL,
+    CINESTAR_CACHE_MISS_TTL,
+    CINESTAR_PAGE_BYTE_BUDGET,
+    CINESTAR_PAGE_CHUNK_SIZE,
+    CinestarIndex,
+    build_cinestar_slug_candidates,
+    resolve_cinestar_url,
+)
 
 
 _RECENT_YEAR = datetime.datetime.now().year
@@ -19,6 +29,38 @@ class _FakeResponse:
     def __init__(self, status_code: int, text: str = ""):
         self.status_code = status_code
         self.text = text
+        self.chunks_read = 0
+
+    def iter_content(self, chunk_size):
+        body = self.text.encode("utf-8")
+        for start in range(0, len(body), chunk_size):
+            self.chunks_read += 1
+            yield body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_programme_index(monkeypatch):
+    """Slug-probing tests run as if the programme page had no film list."""
+    monkeypatch.setattr("src.cinestar_link._indexes", {CINESTAR_BASE_URL: None})
+
+
+@pytest.fixture(autouse=True)
+def head_ok(monkeypatch):
+    """HEAD passes every slug, so the GET decides unless a test says otherwise."""
+    monkeypatch.setattr("src.cinestar_link.http_client.head", lambda url, **kwargs: _FakeResponse(200))
+
+
+PROGRAMME_HTML = """
+<div class="film"><a href="/kino-konstanz/film/michael-2025"><h2>Michael</h2></a>
+  <b>Produktionsjahr</b><span>2025</span></div>
+<div class="film"><a href="https://www.cinestar.de/kino-konstanz/film/hamnet">Hamnet</a></div>
+<div class="film"><a href="/kino-konstanz/film/fuer-immer-ein-teil-von-dir">F&uuml;r immer ein Teil von dir</a>
+  <b>Produktionsjahr</b><span>2026</span></div>
+<a href="/kino-berlin/film/other">Elsewhere</a>
+"""
 
 
 def test_build_cinestar_slug_candidates_tries_full_then_title_parts():
@@ -45,13 +87,13 @@ def test_build_cinestar_slug_candidates_adds_original_title_and_loose_umlaut_var
 def test_resolve_cinestar_url_uses_matching_title_part_before_fallback(monkeypatch):
     requested_urls = []
 
-    def fake_get(url, headers, timeout, allow_redirects):
+    def fake_get(url, headers, allow_redirects, **kwargs):
         requested_urls.append(url)
         if url.endswith("/der-astronaut"):
             return _FakeResponse(200, _page_html(_RECENT_YEAR))
         return _FakeResponse(404)
 
-    monkeypatch.setattr("src.cinestar_link.requests.get", fake_get)
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
 
     resolved = resolve_cinestar_url(
         "Der Astronaut - Project Hail Mary",
@@ -68,13 +110,13 @@ def test_resolve_cinestar_url_uses_matching_title_part_before_fallback(monkeypat
 def test_resolve_cinestar_url_uses_original_title_combo_and_loose_slug(monkeypatch):
     requested_urls = []
 
-    def fake_get(url, headers, timeout, allow_redirects):
+    def fake_get(url, headers, allow_redirects, **kwargs):
         requested_urls.append(url)
         if url.endswith("/fur-immer-ein-teil-von-dir-reminders-of-him"):
             return _FakeResponse(200, _page_html(_RECENT_YEAR))
         return _FakeResponse(404)
 
-    monkeypatch.setattr("src.cinestar_link.requests.get", fake_get)
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
 
     resolved = resolve_cinestar_url(
         "Für immer ein Teil von dir",
@@ -98,12 +140,12 @@ def test_resolve_cinestar_url_rejects_zombie_page_when_year_mismatches(monkeypat
     the kinoprogramm URL."""
     requested_urls = []
 
-    def fake_get(url, headers, timeout, allow_redirects):
+    def fake_get(url, headers, allow_redirects, **kwargs):
         requested_urls.append(url)
         # Every candidate returns 200, but the page is the zombie 2011 page.
         return _FakeResponse(200, _page_html(2011))
 
-    monkeypatch.setattr("src.cinestar_link.requests.get", fake_get)
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
 
     resolved = resolve_cinestar_url(
         "Michael",
@@ -121,10 +163,10 @@ def test_resolve_cinestar_url_rejects_old_page_without_expected_year(monkeypatch
     """Without an expected year, a page whose Produktionsjahr is clearly
     old (more than ~4 years) is rejected to avoid zombie collisions."""
 
-    def fake_get(url, headers, timeout, allow_redirects):
+    def fake_get(url, headers, allow_redirects, **kwargs):
         return _FakeResponse(200, _page_html(2011))
 
-    monkeypatch.setattr("src.cinestar_link.requests.get", fake_get)
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
 
     resolved = resolve_cinestar_url(
         "Michael",
@@ -132,3 +174,166 @@ def test_resolve_cinestar_url_rejects_old_page_without_expected_year(monkeypatch
     )
 
     assert resolved == "https://www.kinoprogramm.com/fallback"
+
+
+def test_resolve_cinestar_url_caches_hit_per_title_and_year(monkeypatch):
+    requested_urls = []
+
+    def fake_get(url, headers, allow_redirects, **kwargs):
+        requested_urls.append(url)
+        return _FakeResponse(200, _page_html(_RECENT_YEAR))
+
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
+
+    first = resolve_cinestar_url("Hamnet", "https://www.kinoprogramm.com/fallback", expected_year=_RECENT_YEAR)
+    second = resolve_cinestar_url("Hamnet", "https://www.kinoprogramm.com/fallback", expected_year=_RECENT_YEAR)
+
+    assert first == second == "https://www.cinestar.de/kino-konstanz/film/hamnet"
+    assert len(requested_urls) == 1
+
+
+def test_resolve_cinestar_url_caches_404_miss_but_not_transient_errors(monkeypatch):
+    requested_urls = []
+    status = {"code": 503}
+
+    def fake_get(url, headers, allow_redirects, **kwargs):
+        requested_urls.append(url)
+        return _FakeResponse(status["code"])
+
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
+
+    fallback = "https://www.kinoprogramm.com/fallback"
+    assert resolve_cinestar_url("Backrooms", fallback) == fallback
+    status["code"] = 404
+    assert resolve_cinestar_url("Backrooms", fallback) == fallback
+    assert resolve_cinestar_url("Backrooms", fallback) == fallback
+
+    # 503 run is not cached, the 404 run is; the third call hits the cache.
+    assert len(requested_urls) == 2
+
+
+def test_resolve_cinestar_url_refetches_expired_miss(monkeypatch):
+    requested_urls = []
+
+    def fake_get(url, headers, allow_redirects, **kwargs):
+        requested_urls.append(url)
+        return _FakeResponse(404)
+
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
+
+    now = [1_000_000.0]
+    monkeypatch.setattr("src.cinestar_link.time.time", lambda: now[0])
+
+    resolve_cinestar_url("Backrooms", None)
+    now[0] += CINESTAR_CACHE_MISS_TTL + 1
+    resolve_cinestar_url("Backrooms", None)
+
+    assert len(requested_urls) == 2
+
+
+def test_cinestar_index_parses_programme_links_titles_and_years():
+    index = CinestarIndex.parse(PROGRAMME_HTML, "/kino-konstanz/film")
+
+    assert index.films == {
+        "michael-2025": {"title": "Michael", "year": 2025},
+        "hamnet": {"title": "Hamnet", "year": None},
+        "fuer-immer-ein-teil-von-dir": {"title": "Für immer ein Teil von dir", "year": 2026},
+    }
+    # By listed title when the slug differs from ours.
+    assert index.lookup(build_cinestar_slug_candidates("Michael")) == ["michael-2025"]
+
+
+def test_resolve_cinestar_url_uses_programme_index_instead_of_probing(monkeypatch):
+    requested_urls = []
+
+    def fake_get(url, headers, allow_redirects, **kwargs):
+        requested_urls.append(url)
+        if url.endswith("/programm"):
+            return _FakeResponse(200, PROGRAMME_HTML)
+        if url.endswith("/hamnet"):
+            return _FakeResponse(200, _page_html(2025))
+        return _FakeResponse(404)
+
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
+    monkeypatch.setattr("src.cinestar_link._indexes", {})
+    fallback = "https://www.kinoprogramm.com/fallback"
+
+    # Listed with a matching year: no film page request at all.
+    assert resolve_cinestar_url("Michael", fallback, expected_year=2025) == f"{CINESTAR_BASE_URL}/michael-2025"
+    # Listed with a wrong year: rejected without probing other slugs.
+    assert resolve_cinestar_url("Für immer ein Teil von dir", fallback, expected_year=2019) == fallback
+    # Listed without a year: only that page is fetched to confirm it.
+    assert resolve_cinestar_url("Hamnet", fallback, expected_year=2025) == f"{CINESTAR_BASE_URL}/hamnet"
+
+    assert requested_urls == [
+        "https://www.cinestar.de/kino-konstanz/programm",
+        f"{CINESTAR_BASE_URL}/hamnet",
+    ]
+
+
+def test_resolve_cinestar_url_probes_films_missing_from_index(monkeypatch):
+    requested_urls = []
+
+    def fake_get(url, headers, allow_redirects, **kwargs):
+        requested_urls.append(url)
+        if url.endswith("/programm"):
+            return _FakeResponse(200, PROGRAMME_HTML)
+        return _FakeResponse(404)
+
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
+    monkeypatch.setattr("src.cinestar_link._indexes", {})
+
+    assert resolve_cinestar_url("Backrooms", None) is None
+    assert resolve_cinestar_url("Zoomania 2", None) is None
+
+    # The programme page is fetched once for both films.
+    assert requested_urls == [
+        "https://www.cinestar.de/kino-konstanz/programm",
+        f"{CINESTAR_BASE_URL}/backrooms",
+        f"{CINESTAR_BASE_URL}/zoomania-2",
+    ]
+
+
+def test_resolve_cinestar_url_skips_get_only_for_slugs_whose_head_is_404(monkeypatch):
+    requests_made = []
+
+    def fake_head(url, **kwargs):
+        requests_made.append(("HEAD", url))
+        # A CDN refusing HEAD (403) is no answer; the GET decides.
+        return _FakeResponse(404 if url.endswith("/michael") else 403)
+
+    def fake_get(url, headers, allow_redirects, **kwargs):
+        requests_made.append(("GET", url))
+        assert kwargs.get("stream") is True
+        assert headers["Range"] == f"bytes=0-{CINESTAR_PAGE_BYTE_BUDGET - 1}"
+        return _FakeResponse(206, _page_html(2025))
+
+    monkeypatch.setattr("src.cinestar_link.http_client.head", fake_head)
+    monkeypatch.setattr("src.cinestar_link.http_client.get", fake_get)
+
+    resolved = resolve_cinestar_url("Michael", None, original_title="Michael 2025", expected_year=2025)
+
+    assert resolved == "https://www.cinestar.de/kino-konstanz/film/michael-michael-2025"
+    assert requests_made == [
+        ("HEAD", "https://www.cinestar.de/kino-konstanz/film/michael"),
+        ("HEAD", "https://www.cinestar.de/kino-konstanz/film/michael-michael-2025"),
+        ("GET", "https://www.cinestar.de/kino-konstanz/film/michael-michael-2025"),
+    ]
+
+
+def test_resolve_cinestar_url_stops_reading_at_produktionsjahr_or_budget(monkeypatch):
+    # The block straddles the first two chunks; the tail is never read.
+    padding = "x" * (CINESTAR_PAGE_CHUNK_SIZE - 20)
+    found = _FakeResponse(200, padding + _page_html(2025) + "y" * (CINESTAR_PAGE_BYTE_BUDGET * 2))
+    monkeypatch.setattr("src.cinestar_link.http_client.get", lambda url, **kwargs: found)
+
+    assert resolve_cinestar_url("Hamnet", None, expected_year=2025) == "https://www.cinestar.de/kino-konstanz/film/hamnet"
+    assert found.chunks_read == 2
+
+    # Past the byte budget the page counts as having no Produktionsjahr.
+    too_late = _FakeResponse(200, "x" * CINESTAR_PAGE_BYTE_BUDGET + _page_html(2025))
+    monkeypatch.setattr("src.cinestar_link.http_client.get", lambda url, **kwargs: too_late)
+
+    fallback = "https://www.kinoprogramm.com/fallback"
+    assert resolve_cinestar_url("Bugonia", fallback, expected_year=2025) == fallback
+    assert too_late.chunks_read == CINESTAR_PAGE_BYTE_BUDGET // CINESTAR_PAGE_CHUNK_SIZE
@@ -53,3 +53,19 @@ def test_week_complete_far_horizon():
     ]
     
     assert is_week_complete(sessions, week_start, week_end) is True
+
+def test_week_complete_accepts_session_index():
+    from src.week_interval import SessionIndex
+
+    tz = pytz.timezone("Europe/Berlin")
+    week_start = datetime(2026, 1, 15)  # naive, as from compute_week_window
+    week_end = datetime(2026, 1, 22)
+
+    sessions = [
+        Session("Movie 1", tz.localize(datetime(2026, 1, 21, 20, 0)), "url", "tag"),
+        Session("Movie 2", tz.localize(datetime(2026, 1, 16, 20, 0)), "url", "tag"),
+    ]
+
+    assert is_week_complete(SessionIndex(sessions), week_start, week_end) is True
+    assert is_week_complete(SessionIndex(sessions[1:]), week_start, week_end) is False
+    assert is_week_complete(sessions, week_start, week_end) is True
@@ -0,0 +1,77 @@
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from src.enrich import enrich_films
+from src.parse_schedule import Session
+from src.state import compute_content_hash
+
+
+def _grouped() -> dict:
+    tz = pytz.timezone("Europe/Berlin")
+    return {
+        "Movie B": [
+            Session("Movie B (OV)", tz.localize(datetime(2026, 3, 21, 20, 0)), "https://example.com/b", "OV"),
+            Session("Movie B (OV)", tz.localize(datetime(2026, 3, 20, 18, 0)), "https://example.com/b", "OV"),
+        ],
+        "Movie A": [
+            Session("Movie A (OV)", tz.localize(datetime(2026, 3, 19, 17, 0)), "https://example.com/a", "OV"),
+        ],
+        "Movie C": [
+            Session("Movie C (OV)", tz.localize(datetime(2026, 3, 22, 21, 0)), "https://example.com/c", "OV"),
+        ],
+    }
+
+
+def _patch_lookups(monkeypatch, delays: dict, ids: dict):
+    def fake_resolve(title_norm, year=None):
+        time.sleep(delays.get(title_norm, 0))
+        tmdb_id = ids.get(title_norm)
+        return tmdb_id, "match" if tmdb_id else "no_results"
+
+    monkeypatch.setattr("src.enrich.resolve_tmdb_id", fake_resolve)
+    monkeypatch.setattr("src.enrich.get_tmdb_original_title", lambda tmdb_id: None)
+    monkeypatch.setattr("src.enrich.get_tmdb_release_year", lambda tmdb_id: None)
+    monkeypatch.setattr(
+        "src.enrich.resolve_cinestar_url",
+        lambda title_norm, film_url, original_title=None, expected_year=None, base_url=None: f"https://cinestar.test/{title_norm}",
+    )
+
+
+def test_enrich_films_matches_serial_order_and_hash(monkeypatch):
+    # The earliest film finishes last; output must not depend on that.
+    _patch_lookups(monkeypatch, {"Movie A": 0.05, "Movie B": 0.0}, {"Movie A": 1, "Movie B": 2})
+
+    items, missing = enrich_films(_grouped(), max_workers=1)
+    parallel_items, parallel_missing = enrich_films(_grouped(), max_workers=4)
+
+    assert [item["title"] for item in parallel_items] == ["Movie A", "Movie B", "Movie C"]
+    assert [item["title"] for item in parallel_items] == [item["title"] for item in items]
+    assert compute_content_hash(parallel_items) == compute_content_hash(items)
+    assert parallel_missing == missing == {"Movie C": "no_results"}
+    assert parallel_items[1]["session"].dt_local.day == 20
+
+
+def test_enrich_films_falls_back_after_deadline(monkeypatch):
+    release = threading.Event()
+
+    def slow_resolve(title_norm, year=None):
+        if title_norm == "Movie C":
+            release.wait(2)
+        return 7, "match"
+
+    _patch_lookups(monkeypatch, {}, {})
+    monkeypatch.setattr("src.enrich.resolve_tmdb_id", slow_resolve)
+
+    try:
+        items, missing = enrich_films(_grouped(), max_workers=3, deadline_seconds=0.2)
+    finally:
+        release.set()
+
+    by_title = {item["title"]: item for item in items}
+    assert by_title["Movie A"]["tmdb_id"] == 7
+    assert by_title["Movie C"]["tmdb_id"] is None
+    assert by_title["Movie C"]["cinestar_url"] == "https://example.com/c"
+    assert missing == {"Movie C": "enrich_deadline"}
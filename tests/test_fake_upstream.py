@@ -0,0 +1,76 @@
+from datetime import date, datetime
+
+import requests
+
+from src.fake_upstream import FakeUpstream, FakeUpstreamConfig, build_schedule_html, fake_settings
+from src.ov_filter import filter_ov_sessions
+from src.parse_schedule import parse_schedule
+
+
+def test_generated_schedule_parses_with_ov_films():
+    html = build_schedule_html(date(2026, 3, 19), film_count=12)
+    sessions = parse_schedule(html, "Europe/Berlin")
+
+    assert len({s.title for s in sessions}) == 12
+    assert min(s.dt_local.date() for s in sessions) >= date(2026, 3, 19)
+    assert filter_ov_sessions(sessions, ["OV", "OmU"])
+
+
+def test_fake_tmdb_search_prefers_current_film(monkeypatch):
+    from src import tmdb_match
+
+    with FakeUpstream() as base_url:
+        monkeypatch.setattr(tmdb_match, "_tmdb_api_base", lambda: f"{base_url}/3")
+        query = next(t for t in ["Blue Hour", "Echo Valley", "Glass Orchard"] if tmdb_match.tmdb_search(t, api_key="k")[0])
+        tmdb_id, reason = tmdb_match.tmdb_search(query, api_key="k")
+        details = requests.get(f"{base_url}/3/movie/{tmdb_id}", params={"api_key": "k"}).json()
+
+    assert reason == "match"
+    assert details["release_date"].startswith(str(datetime.now().year))
+
+
+def test_fake_upstream_rate_limits_and_errors():
+    with FakeUpstream(FakeUpstreamConfig(rate_limit=2)) as base_url:
+        statuses = [requests.get(f"{base_url}/3/search/movie", params={"api_key": "k", "query": "x"}).status_code
+                    for _ in range(4)]
+        limited = requests.get(f"{base_url}/3/search/movie", params={"api_key": "k", "query": "x"})
+    assert statuses[:2] == [200, 200]
+    assert 429 in statuses
+    assert limited.headers.get("Retry-After") == "1"
+
+    with FakeUpstream(FakeUpstreamConfig(error_rate=1.0)) as base_url:
+        assert requests.get(f"{base_url}/kino/city/cinema").status_code == 503
+
+
+def test_fake_kinoprogramm_revalidates_and_telegram_records(monkeypatch):
+    from src import telegram_send
+
+    upstream = FakeUpstream()
+    with upstream as base_url:
+        first = requests.get(f"{base_url}/kino/city/cinema")
+        second = requests.get(f"{base_url}/kino/city/cinema", headers={"If-None-Match": first.headers["ETag"]})
+        monkeypatch.setattr(telegram_send, "_telegram_api_base", lambda: base_url)
+        assert telegram_send.send_message("token", "-100", "<b>hi</b>")
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert upstream.messages[0]["chat_id"] == "-100"
+
+
+def test_fake_settings_points_every_upstream_at_server():
+    settings = fake_settings({"kinoprogramm_url": "https://x", "cinemas": [{"id": "a"}]}, "http://h:1", cinemas=2)
+
+    assert settings["tmdb_api_base"] == "http://h:1/3"
+    assert settings["telegram_api_base"] == "http://h:1"
+    assert [c["kinoprogramm_url"].startswith("http://h:1/kino/") for c in settings["cinemas"]] == [True, True]
+
+
+def test_fake_cinestar_programme_lists_schedule_films():
+    from src.cinestar_link import CinestarIndex
+
+    with FakeUpstream(FakeUpstreamConfig(films=12, cinestar_miss_rate=0.0)) as base_url:
+        page = requests.get(f"{base_url}/kino-konstanz/programm").text
+
+    index = CinestarIndex.parse(page, "/kino-konstanz/film")
+    assert len(index) == 12
+    assert index.year("the-long-night") == datetime.now().year
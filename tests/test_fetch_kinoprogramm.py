@@ -0,0 +1,82 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.fetch_kinoprogramm import (
+    UNCHANGED_NOT_MODIFIED,
+    UNCHANGED_SAME_BODY,
+    fetch_schedule,
+    open_schedule_stream,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"<html>schedule</html>"
+    etag = '"v1"'
+    seen_headers: list = []
+
+    def do_GET(self):
+        self.seen_headers.append(dict(self.headers))
+        if self.etag and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.etag = '"v1"'
+    _Handler.seen_headers = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/kino/city/cinema"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_schedule_short_circuits_on_304(server):
+    first = fetch_schedule(server)
+    assert first.html == "<html>schedule</html>"
+    assert first.validators["etag"] == '"v1"'
+    assert "If-None-Match" not in _Handler.seen_headers[0]
+
+    second = fetch_schedule(server, previous=first.validators)
+
+    assert _Handler.seen_headers[1]["If-None-Match"] == '"v1"'
+    assert second.html is None
+    assert second.unchanged_reason == UNCHANGED_NOT_MODIFIED
+    assert second.validators["body_sha256"] == first.validators["body_sha256"]
+
+
+def test_fetch_schedule_short_circuits_on_same_body_without_etag(server):
+    _Handler.etag = None
+    first = fetch_schedule(server)
+
+    second = fetch_schedule(server, previous=first.validators)
+    assert second.unchanged_reason == UNCHANGED_SAME_BODY
+
+    changed = fetch_schedule(server, previous={**first.validators, "body_sha256": "old"})
+    assert changed.unchanged_reason is None
+    assert changed.html == "<html>schedule</html>"
+
+
+def test_open_schedule_stream_reports_validators_after_body(server):
+    seen = []
+    chunks = open_schedule_stream(server, on_validators=seen.append)
+
+    assert "".join(chunks) == "<html>schedule</html>"
+    assert seen == [fetch_schedule(server).validators]
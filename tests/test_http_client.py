@@ -0,0 +1,151 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.http_client import HttpClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Path -> list of status codes to return in order (last one repeats).
+    plan: dict = {}
+    hits: dict = {}
+    # Path -> Retry-After header sent with its 429s.
+    retry_after: dict = {}
+
+    def _respond(self):
+        self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        statuses = self.plan.get(self.path, [200])
+        status = statuses[min(self.hits[self.path], len(statuses)) - 1]
+        body = b"ok"
+        self.send_response(status)
+        if status == 429 and self.path in self.retry_after:
+            self.send_header("Retry-After", self.retry_after[self.path])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.plan = {}
+    _Handler.hits = {}
+    _Handler.retry_after = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_http_client_reuses_keep_alive_connection(server):
+    client = HttpClient({"timeout": 2})
+
+    for _ in range(3):
+        assert client.get(f"{server}/page").status_code == 200
+
+    host = server.split("//", 1)[1]
+    assert client.connection_stats()[host] == {
+        "requests": 3,
+        "connections": 1,
+        "reused": 2,
+        "retries": 0,
+    }
+
+
+def test_http_client_retries_transient_status_for_get(server):
+    _Handler.plan["/flaky"] = [503, 502, 200]
+    client = HttpClient({"timeout": 2, "retries": 2, "backoff_base": 0})
+
+    assert client.get(f"{server}/flaky").status_code == 200
+    assert _Handler.hits["/flaky"] == 3
+
+
+
+def test_http_client_retry_log_masks_the_bot_token(server, caplog):
+    _Handler.plan["/bot123:SECRET/sendMessage?chat_id=1"] = [429, 200]
+    client = HttpClient({"timeout": 2, "retries": 1, "backoff_base": 0})
+
+    with caplog.at_level("INFO", logger="src.http_client"):
+        assert client.post(f"{server}/bot123:SECRET/sendMessage?chat_id=1").status_code == 200
+
+    assert "Retrying POST 127.0.0.1" in caplog.text
+    assert "/bot***/sendMessage" in caplog.text
+    assert "SECRET" not in caplog.text and "chat_id" not in caplog.text
+
+def test_http_client_does_not_replay_post_on_server_error(server):
+    _Handler.plan["/send"] = [503, 200]
+    client = HttpClient({"timeout": 2, "retries": 2, "backoff_base": 0})
+
+    assert client.post(f"{server}/send", data={"x": "1"}).status_code == 503
+    assert _Handler.hits["/send"] == 1
+
+
+def test_http_client_reports_every_attempt_to_hooks(server, monkeypatch):
+    _Handler.plan["/flaky"] = [503, 200]
+    seen = []
+    monkeypatch.setattr("src.http_client._request_hooks", [])
+    from src.http_client import add_request_hook
+    add_request_hook(lambda method, url, response, error, seconds, attempt, stream: seen.append((response.status_code, attempt)))
+    client = HttpClient({"timeout": 2, "retries": 1, "backoff_base": 0})
+
+    client.get(f"{server}/flaky")
+
+    assert seen == [(503, 0), (200, 1)]
+
+
+def test_http_client_429_throttles_the_shared_rate_limiter(server):
+    from src.rate_limit import TokenBucket
+
+    _Handler.plan["/api/search"] = [429, 200]
+    client = HttpClient({"timeout": 2, "retries": 1, "backoff_base": 0})
+    limiter = TokenBucket(rate=100, burst=10)
+    client.set_rate_limiter(f"{server}/api/", limiter)
+
+    assert client.get(f"{server}/api/search").status_code == 200
+    assert client.get(f"{server}/other").status_code == 200
+
+    stats = client.rate_limit_stats()[f"{server}/api/"]
+    assert stats["requests"] == 2
+    assert stats["throttles"] == 1
+
+
+def test_http_client_gives_up_when_retry_after_exceeds_backoff_max(server, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("src.http_client.time.sleep", sleeps.append)
+    _Handler.plan["/slow"] = [429, 200]
+    _Handler.retry_after["/slow"] = "60"
+    _Handler.plan["/soon"] = [429, 200]
+    _Handler.retry_after["/soon"] = "3"
+    client = HttpClient({"timeout": 2, "retries": 2, "backoff_max": 8})
+
+    assert client.get(f"{server}/slow").status_code == 429
+    assert _Handler.hits["/slow"] == 1
+    # A Retry-After within backoff_max is waited out in full.
+    assert client.get(f"{server}/soon").status_code == 200
+    assert sleeps == [3.0]
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    from datetime import datetime, timedelta, timezone
+    from email.utils import format_datetime
+
+    def retry_after(value):
+        response = requests.Response()
+        response.headers["Retry-After"] = value
+        return HttpClient._retry_after(response)
+
+    assert retry_after("120") == 120.0
+    in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 <= retry_after(in_a_minute) <= 60
+    assert retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after("soon") is None
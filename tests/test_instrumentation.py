@@ -0,0 +1,100 @@
+import json
+
+from src.instrumentation import RunReport
+
+
+class _Response:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class _Raw:
+    """Stands in for urllib3's response: tell() is the bytes read so far."""
+
+    def __init__(self):
+        self.read_bytes = 0
+
+    def tell(self):
+        return self.read_bytes
+
+
+class _StreamedResponse(_Response):
+    def __init__(self, status_code, headers=None):
+        super().__init__(status_code, headers=headers)
+        self.raw = _Raw()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def content(self):
+        raise AssertionError("streamed body was read")
+
+    @content.setter
+    def content(self, value):
+        pass
+
+
+def test_run_report_aggregates_stages_requests_and_caches(tmp_path):
+    report = RunReport()
+    with report.stage("parse", cinema="konstanz"):
+        pass
+    with report.stage("parse", cinema="other"):
+        pass
+    report.record_request("GET", "https://api.example.com/3/search", 200, 120, 0.2)
+    report.record_request("GET", "https://api.example.com/3/movie/1", 429, 0, 0.1)
+    report.record_request("GET", "https://api.example.com/3/movie/1", None, None, 0.5, attempt=1, error="ReadTimeout")
+    report.record_cache("tmdb_cache", True)
+    report.record_cache("tmdb_cache", False)
+    report.record_cache("tmdb_cache", True)
+
+    path = tmp_path / "run.json"
+    report.write(str(path), extra={"argv": ["--dry-run"]})
+    data = json.loads(path.read_text())
+
+    assert data["stage_totals"]["parse"]["count"] == 2
+    assert {s["cinema"] for s in data["stages"]} == {"konstanz", "other"}
+    host = data["hosts"]["api.example.com"]
+    assert host["requests"] == 3
+    assert host["errors"] == 1
+    assert host["bytes"] == 120
+    assert host["statuses"] == {"200": 1, "429": 1}
+    assert data["caches"] == {"tmdb_cache": {"hits": 2, "misses": 1}}
+    assert data["argv"] == ["--dry-run"]
+
+
+def test_record_request_hook_counts_streamed_bytes_actually_read():
+    import src.instrumentation as instrumentation
+
+    report = instrumentation.reset_report()
+    streamed = _StreamedResponse(200, headers={"Content-Length": "262144"})
+
+    instrumentation.record_request("GET", "https://a.test/x", streamed, None, 0.01, 0, stream=True)
+    instrumentation.record_request("GET", "https://a.test/y", _Response(304), None, 0.01, 0)
+
+    first, second = report.requests
+    assert first["bytes"] is None
+    # The caller stops reading early; the header's length is not counted.
+    streamed.raw.read_bytes = 5697
+    streamed.close()
+    assert streamed.closed
+    assert first["bytes"] == 5697
+    assert second["cache"] == "revalidated"
+
+
+def test_report_masks_the_bot_token_in_paths_and_errors():
+    report = RunReport()
+    url = "https://api.telegram.org/bot123:SECRET/sendMessage"
+    report.record_request("POST", url, 200, 2, 0.1)
+    report.record_request(
+        "POST", url, None, None, 0.1, attempt=1,
+        error=f"ConnectionError: Max retries exceeded with url: /bot123:SECRET/sendMessage ({url}?chat_id=1)",
+    )
+
+    first, second = report.requests
+    assert first["path"] == "/bot***/sendMessage"
+    assert "SECRET" not in json.dumps(report.requests)
+    assert "chat_id" not in second["error"]
@@ -0,0 +1,166 @@
+import argparse
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.cinemas import Cinema
+from src.fake_upstream import build_schedule_html
+from src.fetch_kinoprogramm import ScheduleFetch
+from src.main import run_cinema
+from src.state import get_session
+from src.week_interval import compute_week_window
+
+
+def _args(**overrides) -> argparse.Namespace:
+    values = dict(dry_run=False, send=True, dump_missing=False, force=False, stream=False, lookahead=False, from_stage=None)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def _patch_pipeline(monkeypatch, html: str, sent: list):
+    monkeypatch.setattr(
+        "src.fetch_kinoprogramm.fetch_schedule",
+        lambda url, previous=None: ScheduleFetch(html, {"url": url, "etag": '"v1"'}),
+    )
+
+    def fake_enrich(grouped, **kwargs):
+        items = [
+            {"title": title, "session": s[0], "sessions": s, "tmdb_id": None, "cinestar_url": s[0].film_url}
+            for title, s in grouped.items()
+        ]
+        return items, {}
+
+    monkeypatch.setattr("src.enrich.enrich_films", fake_enrich)
+    monkeypatch.setattr("src.telegram_send.send_message", lambda token, chat_id, text: sent.append(text) or True)
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "token")
+
+
+def test_lookahead_sends_every_complete_week_the_page_covers(monkeypatch):
+    week_start, _ = compute_week_window(datetime.now())
+    # Two full cinema weeks plus the Thursday of a third, which is incomplete.
+    html = build_schedule_html(week_start.date(), film_count=12, days=15)
+    sent = []
+    _patch_pipeline(monkeypatch, html, sent)
+    cinema = Cinema("konstanz", "CineStar Konstanz", "https://kino.test/konstanz", ov_markers=["OV", "OmU"], chat_id="1")
+
+    assert run_cinema(cinema, _args(lookahead=True), {}, tmdb_lookups=None)
+
+    weeks = [week_start, week_start + timedelta(days=7)]
+    history = get_session().data["sent_hashes_by_week"]
+    assert sorted(history) == [w.strftime("%Y-%m-%d") for w in weeks]
+    assert len(sent) == 2
+    assert get_session().data["last_sent_week_start"] == weeks[-1].strftime("%Y-%m-%d")
+
+    # A second run finds both weeks sent and sends nothing.
+    assert run_cinema(cinema, _args(lookahead=True), {}, tmdb_lookups=None)
+    assert len(sent) == 2
+
+
+def test_without_lookahead_only_the_current_week_is_sent(monkeypatch):
+    week_start, _ = compute_week_window(datetime.now())
+    html = build_schedule_html(week_start.date(), film_count=12, days=14)
+    sent = []
+    _patch_pipeline(monkeypatch, html, sent)
+    cinema = Cinema("konstanz", "CineStar Konstanz", "https://kino.test/konstanz", ov_markers=["OV", "OmU"], chat_id="1")
+
+    assert run_cinema(cinema, _args(), {}, tmdb_lookups=None)
+
+    assert list(get_session().data["sent_hashes_by_week"]) == [week_start.strftime("%Y-%m-%d")]
+    assert len(sent) == 1
+
+
+def test_rerun_resumes_enrichment_and_from_stage_skips_the_fetch(monkeypatch):
+    week_start, _ = compute_week_window(datetime.now())
+    html = build_schedule_html(week_start.date(), film_count=12, days=14)
+    sent = []
+    _patch_pipeline(monkeypatch, html, sent)
+    enrich_calls = []
+    missing = {"reason": "enrich_deadline"}
+
+    def fake_enrich(grouped, **kwargs):
+        enrich_calls.append(len(grouped))
+        items = [
+            {"title": title, "session": s[0], "sessions": s, "tmdb_id": 7, "cinestar_url": s[0].film_url}
+            for title, s in grouped.items()
+        ]
+        return items, {title: missing["reason"] for title in list(grouped)[:1]}
+
+    monkeypatch.setattr("src.enrich.enrich_films", fake_enrich)
+    cinema = Cinema("konstanz", "CineStar Konstanz", "https://kino.test/konstanz", ov_markers=["OV", "OmU"], chat_id="1")
+
+    # Cut short by the deadline: not checkpointed, the dry rerun enriches again.
+    assert run_cinema(cinema, _args(send=False, dry_run=True), {}, tmdb_lookups=None)
+    missing["reason"] = "no_results"
+    assert run_cinema(cinema, _args(send=False, dry_run=True), {}, tmdb_lookups=None)
+    assert len(enrich_calls) == 2
+    assert run_cinema(cinema, _args(), {}, tmdb_lookups=None)
+    assert len(enrich_calls) == 2
+    assert len(sent) == 1
+
+    # Redo only format + send: no fetch, no enrichment, same message.
+    monkeypatch.setattr(
+        "src.fetch_kinoprogramm.fetch_schedule",
+        lambda url, previous=None: pytest.fail("fetched despite --from-stage format"),
+    )
+    assert run_cinema(cinema, _args(from_stage="format", force=True), {}, tmdb_lookups=None)
+    assert len(enrich_calls) == 2
+    assert sent == [sent[0], sent[0]]
+
+
+def test_incomplete_enrichment_is_not_sent_without_force(monkeypatch):
+    week_start, _ = compute_week_window(datetime.now())
+    html = build_schedule_html(week_start.date(), film_count=12, days=14)
+    sent = []
+    _patch_pipeline(monkeypatch, html, sent)
+
+    def fake_enrich(grouped, **kwargs):
+        items = [
+            {"title": title, "session": s[0], "sessions": s, "tmdb_id": None, "cinestar_url": s[0].film_url}
+            for title, s in grouped.items()
+        ]
+        return items, {title: "enrich_deadline" for title in grouped}
+
+    monkeypatch.setattr("src.enrich.enrich_films", fake_enrich)
+    cinema = Cinema("konstanz", "CineStar Konstanz", "https://kino.test/konstanz", ov_markers=["OV", "OmU"], chat_id="1")
+
+    assert run_cinema(cinema, _args(), {}, tmdb_lookups=None)
+    assert sent == []
+    assert get_session().data["sent_hashes_by_week"] == {}
+
+    assert run_cinema(cinema, _args(force=True), {}, tmdb_lookups=None)
+    assert len(sent) == 1
+
+
+def test_stream_mode_checkpoints_the_page_without_holding_all_of_it(monkeypatch):
+    import tracemalloc
+
+    from src.checkpoints import CinemaCheckpoints
+
+    week_start, _ = compute_week_window(datetime.now())
+    html = build_schedule_html(week_start.date(), film_count=12, days=14)
+    # ~10 MB of comments after the schedule: only the stream path keeps
+    # memory well below the page size.
+    padding = "<!-- " + "x" * 64_000 + " -->\n"
+
+    def open_schedule_stream(url, on_validators=None):
+        for start in range(0, len(html), 16 * 1024):
+            yield html[start:start + 16 * 1024]
+        for _ in range(160):
+            yield padding
+
+    sent = []
+    _patch_pipeline(monkeypatch, html, sent)
+    monkeypatch.setattr("src.fetch_kinoprogramm.open_schedule_stream", open_schedule_stream)
+    cinema = Cinema("konstanz", "CineStar Konstanz", "https://kino.test/konstanz", ov_markers=["OV", "OmU"], chat_id="1")
+
+    tracemalloc.start()
+    try:
+        assert run_cinema(cinema, _args(stream=True), {}, tmdb_lookups=None)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert len(sent) == 1
+    assert peak < 160 * len(padding) / 4
+    # The fetch checkpoint still holds the whole page, for --from-stage.
+    assert CinemaCheckpoints("konstanz", from_stage="format").latest()[1] == html + padding * 160
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytz
+
+from src.ov_filter import OvMatcher, filter_ov_sessions
+from src.parse_schedule import Session
+
+MARKERS = ["OV", "OmU", "Originalfassung", "Originalversion", "OmeU"]
+
+
+def _session(title: str, hour: int = 20) -> Session:
+    tz = pytz.timezone("Europe/Berlin")
+    return Session(title, tz.localize(datetime(2026, 3, 20, hour, 0)), "https://example.com/film", title)
+
+
+def test_filter_ov_sessions_matches_whole_markers_only():
+    sessions = [
+        _session("Michael (OV)"),
+        _session("Hamnet (OmU)"),
+        _session("Is This Thing On? OmeU"),
+        _session("Der Astronaut - Project Hail Mary [Originalfassung]"),
+        _session("Movie Night"),
+        _session("Novum"),
+        _session("Zoomania 2"),
+    ]
+
+    titles = [s.title for s in filter_ov_sessions(sessions, MARKERS)]
+
+    assert titles == [
+        "Michael (OV)",
+        "Hamnet (OmU)",
+        "Is This Thing On? OmeU",
+        "Der Astronaut - Project Hail Mary [Originalfassung]",
+    ]
+
+
+def test_filter_ov_sessions_keeps_every_showtime_of_an_ov_film():
+    sessions = [_session("Michael (OV)", hour) for hour in (14, 17, 20)] + [_session("Michael", 22)]
+
+    assert len(filter_ov_sessions(sessions, MARKERS)) == 3
+
+
+def test_ov_matcher_checks_each_title_once(monkeypatch):
+    matcher = OvMatcher(tuple(MARKERS))
+    searched = []
+    original = matcher._search
+    monkeypatch.setattr(matcher, "_search", lambda title, tags: searched.append(title) or original(title, tags))
+
+    for _ in range(5):
+        assert matcher.matches("Hamnet (OmU)", "Hamnet (OmU)")
+        assert not matcher.matches("Hamnet", "Hamnet")
+
+    assert searched == ["Hamnet (OmU)", "Hamnet"]
+
+
+def test_ov_matcher_searches_tags_that_differ_from_title():
+    matcher = OvMatcher(tuple(MARKERS))
+
+    assert matcher.matches("Hamnet", "omu")
+    assert not matcher.matches("Hamnet", None)
+    assert not OvMatcher(()).matches("Michael (OV)")
@@ -0,0 +1,92 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+import pytz
+
+from src.parse_schedule import (
+    BACKEND_HTML_PARSER,
+    BACKEND_LXML,
+    Session,
+    available_backends,
+    iter_sessions,
+    parse_schedule,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _golden_sessions() -> list:
+    return json.loads((FIXTURES / "kinoprogramm_konstanz.sessions.json").read_text(encoding="utf-8"))
+
+
+def _as_rows(sessions) -> list:
+    return [[s.title, s.dt_local.isoformat(), s.film_url, s.tags] for s in sessions]
+
+
+@pytest.mark.parametrize("backend", [BACKEND_HTML_PARSER, BACKEND_LXML])
+def test_parse_schedule_backends_match_golden_file(backend):
+    if backend not in available_backends():
+        pytest.skip(f"{backend} backend not installed")
+    html = (FIXTURES / "kinoprogramm_konstanz.html").read_text(encoding="utf-8")
+
+    assert _as_rows(parse_schedule(html, "Europe/Berlin", backend=backend)) == _golden_sessions()
+
+
+def test_parse_schedule_handles_empty_page_with_every_backend():
+    for backend in available_backends():
+        assert parse_schedule("", "Europe/Berlin", backend=backend) == []
+
+
+def test_iter_sessions_matches_golden_file_for_any_chunking():
+    html = (FIXTURES / "kinoprogramm_konstanz.html").read_text(encoding="utf-8")
+
+    for size in (7, 256, len(html)):
+        chunks = (html[i:i + size] for i in range(0, len(html), size))
+        assert _as_rows(iter_sessions(chunks, "Europe/Berlin")) == _golden_sessions()
+
+
+def test_iter_sessions_yields_films_before_the_stream_ends():
+    html = (FIXTURES / "kinoprogramm_konstanz.html").read_text(encoding="utf-8")
+    half = len(html) // 2
+    fed = []
+
+    def chunks():
+        fed.append(1)
+        yield html[:half]
+        fed.append(2)
+        yield html[half:]
+
+    first = next(iter_sessions(chunks(), "Europe/Berlin"))
+
+    assert first.title == "Der Astronaut - Project Hail Mary [Originalfassung]"
+    assert fed == [1]
+
+
+def test_sessions_share_one_film_record_and_keep_attribute_api():
+    tz = pytz.timezone("Europe/Berlin")
+    summer = tz.localize(datetime(2026, 7, 2, 20, 15))
+    winter = tz.localize(datetime(2026, 12, 3, 20, 15))
+
+    first = Session("Hamnet (OmU)", summer, "https://example.com/hamnet", "Hamnet (OmU)")
+    second = Session("Hamnet (OmU)", winter, "https://example.com/hamnet", "Hamnet (OmU)")
+
+    assert not hasattr(first, "__dict__")
+    assert first.film is second.film
+    assert first.tags is first.title
+    assert (first.title, first.film_url) == ("Hamnet (OmU)", "https://example.com/hamnet")
+    assert first.dt_local == summer and first.dt_local.isoformat() == summer.isoformat()
+    assert second.dt_local.isoformat() == winter.isoformat()
+
+
+def test_benchmark_scaled_page_parses_as_distinct_films():
+    from benchmarks.run import FIXTURE_PATH
+    from src.fake_upstream import scale_schedule_html
+
+    html = scale_schedule_html(FIXTURE_PATH.read_text(encoding="utf-8"), 3)
+    sessions = parse_schedule(html, "Europe/Berlin")
+
+    assert len(sessions) == 3 * 31
+    titles = {s.title for s in sessions if s.title != "Unknown"}
+    assert len(titles) == 3 * len({s.title for s in sessions[:31] if s.title != "Unknown"})
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from src.rate_limit import PRIORITY_HIGH, PRIORITY_LOW, TokenBucket
+
+
+def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(rate=20, burst=2)
+
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+
+    # Two tokens up front, then one every 50 ms.
+    assert time.monotonic() - started >= 0.09
+    assert bucket.stats()["requests"] == 4
+
+
+def test_token_bucket_serves_higher_priority_first():
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.acquire()  # empty the bucket so the next callers queue up
+    order = []
+
+    def worker(name, priority):
+        bucket.acquire(priority)
+        order.append(name)
+
+    low = threading.Thread(target=worker, args=("details", PRIORITY_LOW))
+    low.start()
+    while bucket.stats()["queue_depth"] < 1:
+        time.sleep(0.001)
+    high = threading.Thread(target=worker, args=("search", PRIORITY_HIGH))
+    high.start()
+    while bucket.stats()["queue_depth"] < 2:
+        time.sleep(0.001)
+    low.join(2)
+    high.join(2)
+
+    assert order == ["search", "details"]
+    assert bucket.stats()["max_queue_depth"] == 2
+
+
+def test_token_bucket_throttle_pauses_all_callers():
+    bucket = TokenBucket(rate=1000, burst=10)
+    bucket.throttle(0.2)
+
+    waited = bucket.acquire()
+
+    assert waited >= 0.15
+    stats = bucket.stats()
+    assert stats["throttles"] == 1
+    assert stats["wait_seconds"] >= 0.15
@@ -84,3 +84,93 @@ def test_compute_content_hash_changes_when_session_list_changes():
     }
 
     assert compute_content_hash([first]) != compute_content_hash([expanded])
+
+
+def test_state_session_loads_once_and_flushes_only_when_dirty(isolated_state, monkeypatch):
+    import src.state as state_module
+
+    loads = []
+    real_load_state = state_module.load_state
+    monkeypatch.setattr(state_module, "load_state", lambda: loads.append(1) or real_load_state())
+
+    session = state_module.StateSession()
+    assert session.flush() is False
+
+    session.cache_set("tmdb_cache", "Hamnet", 858024)
+    assert session.cache_get("tmdb_cache", "Hamnet") == 858024
+    assert session.dirty_keys == {"tmdb_cache"}
+    assert not isolated_state.exists()
+
+    assert session.flush() is True
+    assert session.flush() is False
+    assert len(loads) == 1
+    assert state_module.load_state()["tmdb_cache"] == {"Hamnet": 858024}
+
+
+def test_state_session_keeps_concurrent_cache_writes(isolated_state):
+    import threading
+
+    from src.state import StateSession, load_state
+
+    session = StateSession()
+    threads = [
+        threading.Thread(target=session.cache_set, args=("tmdb_cache", f"Movie {i}", i))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session.flush()
+
+    assert len(load_state()["tmdb_cache"]) == 20
+
+
+def test_sqlite_backend_writes_changed_entries_and_round_trips(tmp_path):
+    import sqlite3
+
+    from src.state import SqliteStateBackend, StateSession
+
+    backend = SqliteStateBackend(tmp_path / "state.sqlite3")
+    session = StateSession(backend)
+    session.cache_set("tmdb_cache", "Hamnet", 858024)
+    session.cache_set("cinestar_cache", "Hamnet|2025", {"url": "https://example.com/hamnet", "checked_at": 1})
+    with session.lock:
+        record_sent_week(session.data, "2026-03-19", "hash-1")
+        session.mark_dirty("last_sent_week_start", "last_hash", "sent_hashes_by_week")
+    assert session.flush() is True
+
+    with sqlite3.connect(backend.location()) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.execute("UPDATE cache_entries SET updated_at = 0")
+
+    # Only the touched entries are rewritten.
+    session = StateSession(backend)
+    session.cache_set("tmdb_cache", "Bugonia", 701387)
+    session.cache_delete("cinestar_cache", "Hamnet|2025")
+    session.flush()
+    with sqlite3.connect(backend.location()) as conn:
+        rows = conn.execute("SELECT cache, key, updated_at > 0 FROM cache_entries ORDER BY key").fetchall()
+    assert rows == [("tmdb_cache", "Bugonia", 1), ("tmdb_cache", "Hamnet", 0)]
+
+    data = backend.load()
+    assert data["tmdb_cache"] == {"Hamnet": 858024, "Bugonia": 701387}
+    assert data["cinestar_cache"] == {}
+    assert data["sent_hashes_by_week"] == {"2026-03-19": "hash-1"}
+    assert data["last_hash"] == "hash-1"
+
+
+def test_migrate_copies_json_state_into_sqlite(isolated_state, tmp_path):
+    from src.state import JsonStateBackend, SqliteStateBackend, migrate, save_state
+
+    save_state({
+        "last_sent_week_start": "2026-03-19",
+        "sent_hashes_by_week": {"2026-03-19": "hash-1"},
+        "tmdb_cache": {"Hamnet": 858024},
+        "cinemas": {"another": {"last_hash": "hash-2"}},
+    })
+    target = SqliteStateBackend(tmp_path / "state.sqlite3")
+
+    migrate(JsonStateBackend(), target)
+
+    assert target.load() == JsonStateBackend().load()
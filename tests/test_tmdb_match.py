@@ -1,4 +1,9 @@
-from src.tmdb_match import build_search_variants, normalize_title
+import threading
+import time
+
+import src.tmdb_match as tmdb_match
+from src.state import get_session
+from src.tmdb_match import build_search_variants, get_tmdb_release_year, normalize_title
 
 
 def test_build_search_variants_tries_english_half_for_german_then_english_title():
@@ -17,3 +22,187 @@ def test_build_search_variants_keeps_english_half_for_english_then_german_title(
         "The Housemaid - Wenn sie wüsste",
         "The Housemaid",
     ]
+
+
+def test_normalize_title_strips_markers_quotes_and_emptied_brackets():
+    assert normalize_title("Michael (OV)") == "Michael"
+    assert normalize_title('Hamnet [„OmU“] 3D') == "Hamnet"
+    assert normalize_title('Die Schule der magischen Tiere 4 - "School of Magical Animals"  ( OmeU )') == (
+        "Die Schule der magischen Tiere 4 - School of Magical Animals"
+    )
+    # Markers only count as whole words; non-empty brackets stay.
+    assert normalize_title("Dolby Overlord (Director's Cut)") == "Overlord (Director's Cut)"
+
+
+def test_build_search_variants_returns_a_fresh_list_per_call():
+    variants = build_search_variants("Der Astronaut - Project Hail Mary")
+    variants.append("mutated")
+
+    assert build_search_variants("Der Astronaut - Project Hail Mary") == [
+        "Der Astronaut - Project Hail Mary",
+        "Project Hail Mary",
+    ]
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+def _fake_details_get(requested_urls: list, release_date: str):
+    def fake_get(url, params, **kwargs):
+        requested_urls.append(url)
+        return _FakeResponse(200, {"original_title": "Hamnet", "release_date": release_date, "runtime": 126})
+
+    return fake_get
+
+
+def test_tmdb_details_are_served_from_state_on_repeat_runs(monkeypatch):
+    requested_urls = []
+    monkeypatch.setattr("src.tmdb_match.http_client.get", _fake_details_get(requested_urls, "2025-11-26"))
+    monkeypatch.setattr(tmdb_match, "_details_memo", {})
+
+    assert get_tmdb_release_year(858024, api_key="key") == 2025
+    assert get_session().flush() is True
+
+    # A fresh process only has the on-disk copy.
+    monkeypatch.setattr("src.state._session", None)
+    monkeypatch.setattr(tmdb_match, "_details_memo", {})
+    assert get_session().cache_get("tmdb_details", "858024")["runtime"] == 126
+    assert get_tmdb_release_year(858024, api_key="key") == 2025
+    assert len(requested_urls) == 1
+
+
+def test_stale_tmdb_details_are_refreshed_in_background(monkeypatch):
+    requested_urls = []
+    monkeypatch.setattr("src.tmdb_match.http_client.get", _fake_details_get(requested_urls, "2025-11-26"))
+    monkeypatch.setattr(tmdb_match, "_details_memo", {})
+    get_tmdb_release_year(858024, api_key="key")
+
+    monkeypatch.setattr("src.tmdb_match.http_client.get", _fake_details_get(requested_urls, "2026-01-01"))
+    monkeypatch.setattr(tmdb_match, "_details_memo", {})
+    monkeypatch.setattr(tmdb_match, "_details_ttl_seconds", lambda: -1)
+
+    # The stale value is returned immediately, the refresh lands on disk.
+    assert get_tmdb_release_year(858024, api_key="key") == 2025
+    for _ in range(100):
+        if get_session().cache_get("tmdb_details", "858024")["release_date"] == "2026-01-01":
+            break
+        time.sleep(0.01)
+    assert get_session().cache_get("tmdb_details", "858024")["release_date"] == "2026-01-01"
+    assert len(requested_urls) == 2
+
+
+def _fake_search_get(results_by_query: dict, calls: list):
+    def fake_get(url, params, **kwargs):
+        calls.append((params["query"], params["language"]))
+        return _FakeResponse(200, {"results": results_by_query.get((params["query"], params["language"]), [])})
+
+    return fake_get
+
+
+def test_tmdb_search_does_not_search_other_variants_after_a_primary_match(monkeypatch):
+    calls = []
+    results = {
+        ("Der Astronaut - Project Hail Mary", "de-DE"): [
+            {"id": 1, "title": "Der Astronaut - Project Hail Mary", "release_date": "2026-03-19", "vote_count": 10},
+        ],
+    }
+    monkeypatch.setattr("src.tmdb_match.http_client.get", _fake_search_get(results, calls))
+
+    assert tmdb_match.tmdb_search("Der Astronaut - Project Hail Mary", api_key="key") == (1, "match")
+    assert sorted(calls) == [
+        ("Der Astronaut - Project Hail Mary", "de-DE"),
+        ("Der Astronaut - Project Hail Mary", "en-US"),
+    ]
+
+
+def test_tmdb_search_sends_each_round_of_language_requests_concurrently(monkeypatch):
+    # Only passes if both languages of a variant are in flight at the same
+    # time, and the second variant is only searched once the first missed.
+    barrier = threading.Barrier(2, timeout=2)
+    calls = []
+
+    def fake_get(url, params, **kwargs):
+        calls.append(params["query"])
+        barrier.wait()
+        return _FakeResponse(200, {"results": []})
+
+    monkeypatch.setattr("src.tmdb_match.http_client.get", fake_get)
+
+    assert tmdb_match.tmdb_search("Der Astronaut - Project Hail Mary", api_key="key") == (None, "no_results")
+    assert not barrier.broken
+    assert calls == ["Der Astronaut - Project Hail Mary"] * 2 + ["Project Hail Mary"] * 2
+
+
+def test_tmdb_search_keeps_variant_priority_and_language_merge_order(monkeypatch):
+    calls = []
+    results = {
+        # The full title only finds an unrelated film...
+        ("The Housemaid - Wenn sie wüsste", "de-DE"): [{"id": 9, "title": "Something Else", "vote_count": 1}],
+        # ...the English half matches; de-DE wins the duplicate id.
+        ("The Housemaid", "de-DE"): [{"id": 5, "title": "The Housemaid", "release_date": "2025-12-18"}],
+        ("The Housemaid", "en-US"): [
+            {"id": 5, "title": "Ignored Duplicate", "release_date": "1960-01-01"},
+            {"id": 6, "title": "The Housemaid", "release_date": "1960-11-03", "vote_count": 9000},
+        ],
+    }
+    monkeypatch.setattr("src.tmdb_match.http_client.get", _fake_search_get(results, calls))
+
+    assert tmdb_match.tmdb_search("The Housemaid - Wenn sie wüsste", api_key="key") == (5, "match_variant:The Housemaid")
+
+
+def test_tmdb_search_responses_are_cached_including_empty_ones(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "src.tmdb_match.http_client.get",
+        _fake_search_get({("Michael", "de-DE"): [{"id": 1, "title": "Michael", "release_date": "1996-12-25", "overview": "..."}]}, calls),
+    )
+
+    first = tmdb_match.tmdb_search("Michael", api_key="key")
+    assert first == tmdb_match.tmdb_search("Michael", api_key="key")
+    assert first == (None, "best_too_old_1996")
+    assert len(calls) == 2  # de-DE and en-US, once each
+
+    entry = get_session().cache_get("tmdb_search_cache", "Michael|de-DE|")
+    assert entry["results"] == [{"id": 1, "title": "Michael", "release_date": "1996-12-25"}]
+
+
+def test_expired_empty_search_responses_are_refetched(monkeypatch):
+    calls = []
+    monkeypatch.setattr("src.tmdb_match.http_client.get", _fake_search_get({}, calls))
+    monkeypatch.setattr(tmdb_match, "_search_ttl_seconds", lambda: (3600, -1))
+
+    assert tmdb_match.tmdb_search("Unknown Film", api_key="key") == (None, "no_results")
+    assert tmdb_match.tmdb_search("Unknown Film", api_key="key") == (None, "no_results")
+    assert len(calls) == 4
+
+
+def test_rescore_cached_uses_only_cached_responses(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "src.tmdb_match.http_client.get",
+        _fake_search_get({("Project Hail Mary", "en-US"): [{"id": 687163, "title": "Project Hail Mary", "release_date": "2026-03-18"}]}, calls),
+    )
+    tmdb_match.tmdb_search("Der Astronaut - Project Hail Mary", api_key="key")
+    monkeypatch.setattr("src.tmdb_match.http_client.get", None)
+    monkeypatch.setattr(tmdb_match, "_search_ttl_seconds", lambda: (-1, -1))
+
+    assert tmdb_match.rescore_cached() == [
+        ("Der Astronaut - Project Hail Mary", None, 687163, "match_variant:Project Hail Mary"),
+    ]
+
+
+def test_tmdb_search_reports_rate_limited_instead_of_no_results(monkeypatch):
+    def throttled_get(url, params, **kwargs):
+        return _FakeResponse(429, {})
+
+    monkeypatch.setattr("src.tmdb_match.http_client.get", throttled_get)
+
+    assert tmdb_match.tmdb_search("Michael", api_key="key") == (None, "rate_limited")
+    # Not cached: the next run searches again.
+    assert get_session().cache_get("tmdb_search_cache", "Michael|de-DE|") is None
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from src.parse_schedule import Session
+from src.week_interval import SessionIndex, compute_week_window, filter_by_week
+
+
+def _sessions() -> list[Session]:
+    tz = pytz.timezone("Europe/Berlin")
+    # Page order: grouped by film, not by time. The week of 26.03.2026
+    # crosses the switch to summer time (29.03.).
+    times = [
+        ("Movie A", datetime(2026, 3, 25, 20, 0)),  # previous week
+        ("Movie A", datetime(2026, 3, 26, 0, 0)),   # first minute of the week
+        ("Movie A", datetime(2026, 4, 1, 23, 30)),  # last evening of the week
+        ("Movie B", datetime(2026, 3, 29, 17, 0)),  # CEST
+        ("Movie B", datetime(2026, 3, 27, 20, 0)),
+        ("Movie B", datetime(2026, 4, 2, 0, 0)),    # next week
+    ]
+    return [Session(title, tz.localize(dt), "https://example.com", title) for title, dt in times]
+
+
+def test_session_index_window_matches_list_filter_in_page_order():
+    sessions = _sessions()
+    week_start, week_end = compute_week_window(datetime(2026, 3, 28, 12, 0))
+    index = SessionIndex(sessions)
+
+    expected = filter_by_week(sessions, week_start, week_end)
+
+    assert filter_by_week(index, week_start, week_end) == expected
+    assert [s.dt_local.strftime("%d.%m. %H:%M") for s in expected] == [
+        "26.03. 00:00", "01.04. 23:30", "29.03. 17:00", "27.03. 20:00",
+    ]
+    assert index.count_between(week_start, week_end) == 4
+
+
+def test_session_index_horizon_queries():
+    index = SessionIndex(_sessions())
+    _, week_end = compute_week_window(datetime(2026, 3, 28, 12, 0))
+
+    assert index.min_dt.day == 25
+    assert index.max_dt.strftime("%d.%m. %H:%M") == "02.04. 00:00"
+    assert index.reaches(week_end - timedelta(days=1))
+    assert not index.reaches(week_end + timedelta(days=1))
+    assert SessionIndex([]).max_dt is None
+    assert not SessionIndex([]).reaches(week_end)